@@ -3,8 +3,8 @@
 
 import adsk, adsk.core, adsk.fusion, traceback
 import os
-from .utils import utils
-from .core import Link, Joint, Write
+from .utils import utils, mesh_export, mesh_formats, mesh_simplify, profiling, batch, tasks, cache
+from .core import Assembly, Link, Robot, Snapshot, Write, Xacro
 
 """
 # length unit is 'cm' and inertial unit is 'kg/cm^2'
@@ -17,69 +17,327 @@ from .core import Link, Joint, Write
 
 # I'm not sure how prismatic joint acts if there is no limit in fusion model
 
+# options of an export, the jobs of a job file can change any of them
+OPTIONS = {
+    'package_name': 'fusion2urdf',
+    # accuracy of the physical properties: 'low', 'medium', 'high' or 'very-high'.
+    # Properties already calculated at least as accurately are reused from the cache.
+    'accuracy': Snapshot.DEFAULT_ACCURACY,
+    # reuse the physical properties, meshes and urdf fragments of the 
+    # links that did not change since the last export into save_dir
+    'incremental': False,
+    # threads encoding and writing the STL files, 0 to write them in turn
+    'mesh_workers': mesh_export.DEFAULT_WORKERS,
+    # write the meshes in meters instead of mm, the urdf then needs no mesh scale
+    'meshes_in_meters': False,
+    # file format of the meshes: 'stl', 'glb' or 'dae', see utils/mesh_formats.py
+    'mesh_format': 'stl',
+    # gzip the mesh files, e.g. for transfer. ROS and pybullet do not read them.
+    'compress_meshes': False,
+    # 16-bit positions in the glb files, a third of their float positions
+    'quantize_meshes': False,
+    # tessellation of the meshes: 'low', 'normal', 'high' or 'very-high'
+    'mesh_refinement': mesh_export.DEFAULT_REFINEMENT,
+    # {link name: {'format': str, 'refinement': str}} of the links whose mesh
+    # differs from mesh_format and mesh_refinement
+    'link_meshes': {},
+    # triangle budget of the visual meshes, None to keep the exported meshes
+    'visual_triangles': None,
+    # use the convex hull of each mesh for collision instead of the mesh itself
+    'collision_hull': False,
+    # write each distinct mesh once, shared by the links of the same component, 
+    # see utils/mesh_export.py. All the meshes are then exported on each run.
+    'dedup_meshes': False,
+    # duplicate the bodies into new components with utils.copy_occs before the
+    # mesh export, like former versions. This modifies the design.
+    'copy_bodies': False,
+    # also write robot_name.urdf.xacro, the repeated sub-chains written once as
+    # macros, see core/Xacro.py. Needs dedup_meshes to find identical links.
+    'xacro': False,
+    # directory of the results cache shared by all the exports, e.g. on a
+    # network mount shared by the workstations, see utils/cache.py. The
+    # physical properties and meshes found there are not calculated again.
+    'cache_dir': None,
+    # size in bytes the least recently used results of cache_dir are evicted to
+    'cache_size': cache.DEFAULT_MAX_BYTES,
+    # write the timing of each stage and item next to the urdf, see utils/profiling.py
+    'profile': True,
+}
+
+# export the designs of this job file in turn instead of the active design,
+# see utils/batch.py. The log and the summary are written next to it.
+JOB_FILE = None
+
+
+def iter_export(design, output_dir, options=None, properties=None, write_mesh=None):
+    """
+    Generate the urdf, hello_bullet.py and meshes of a design into
+    "output_dir/robot_name", as steps (see utils/tasks.py): the Fusion API is
+    called between the steps, the xml generation and the file writes run in
+    the background
+
+
+    Parameters
+    ----------
+    design: adsk.fusion.Design
+    output_dir: str
+    options: dict
+        some of OPTIONS, the others keep their default
+    properties: dict
+        physical properties cache shared by the designs of a batch, see 
+        Snapshot.record_occurrence. The cache of save_dir is added to it
+        when incremental or cache_dir is set.
+    write_mesh: callable
+        write_mesh(link name, occurrence, file name, options) writes the mesh
+        of a link itself and returns True, or returns False to tessellate it,
+        e.g. the mesh files recorded with an offline design, see 
+        offline/__init__.py
+
+    Returns
+    ----------
+    save_dir: str or None on failure
+    msg: str
+        Tell the status
+    """
+    unknown = set(options or {}) - set(OPTIONS)
+    if unknown:
+        raise ValueError('unknown options: ' + ', '.join(sorted(unknown)))
+    options = dict(OPTIONS, **(options or {}))
+    incremental = options['incremental']
+    dedup_meshes = options['dedup_meshes']
+    copy_bodies = options['copy_bodies']
+    meshes_in_meters = options['meshes_in_meters']
+    mesh_quality = mesh_export.quality_of(options['mesh_refinement'])
+    mesh_scale = mesh_export.CM_TO_M if meshes_in_meters else mesh_export.CM_TO_MM
+    msg = 'Successfully create URDF file'
+
+    def mesh_settings(link):
+        mesh_format, refinement = mesh_export.mesh_settings(
+            link, options['mesh_format'], options['mesh_refinement'], options['link_meshes'])
+        return link + mesh_formats.extension(mesh_format, options['compress_meshes']), refinement
+
+    root = design.rootComponent  # root component 
+    components = design.allComponents
+    robot_name = root.name.split()[0]
+    save_dir = output_dir + '/' + robot_name
+    os.makedirs(save_dir, exist_ok=True)
+    
+    results = None
+    if options['cache_dir']:
+        try:
+            results = cache.DiskCache(options['cache_dir'], options['cache_size'])
+        except OSError as e:
+            msg += '\n\nCache disabled, {} is not writable: {}'.format(options['cache_dir'], e)
+
+    if options['profile']:
+        profiling.start(robot_name)
+    try:
+        # --------------------
+        # read the design once into a snapshot and the robot model
+        with profiling.span('record design'):
+            # links and joints of the sub-assemblies too
+            assembly = Assembly.Assembly(root)
+            previous = Snapshot.read_previous(save_dir) if incremental else None
+            if properties is None:
+                properties = {}
+            if incremental or results is not None:
+                # a full export reads the design again, whatever earlier exports calculated
+                for key, value in Snapshot.read_properties(save_dir).items():
+                    properties.setdefault(key, {}).update(value)
+            snapshot = yield from Snapshot.iter_record_design(design, previous, options['accuracy'], 
+                                                              properties, assembly, results)
+            Snapshot.record_mesh_settings(snapshot, assembly.names, mesh_settings, mesh_scale,
+                                          options['quantize_meshes'])
+            yield tasks.in_background(Snapshot.write_properties, save_dir, properties, snapshot)
+        with profiling.span('robot model'):
+            robot, msg = yield tasks.in_background(
+                lambda: Robot.make_robot(Snapshot.replay_design(snapshot), msg))
+        if robot is None:
+            return None, msg
+        
+        if meshes_in_meters:
+            robot.mesh_scale = Link.MESH_SCALE_M
+        robot.meshes = {link: mesh_settings(link)[0] for link in robot.meshes}
+        
+        if robot.renamed:
+            msg += '\n\nRenamed links, their names were taken by other links:\n' + \
+                '\n'.join('{} -> {}'.format(name, link) for name, link in robot.renamed.items())
+        
+        # the urdf is still written, but simulators may reject these links
+        invalid = Link.validate_inertial_dict(robot.inertial_dict)
+        if invalid:
+            msg += '\n\nPhysically invalid inertia:\n' + \
+                '\n'.join('{}: {}'.format(name, reason) for name, reason in invalid.items())
+        
+        # --------------------
+        # Generate the mesh files
+        skip = Snapshot.unchanged_meshes(snapshot, previous, save_dir) \
+            if incremental and not dedup_meshes else None
+        if copy_bodies:
+            with profiling.span('copy_occs'):
+                utils.copy_occs(root, skip)
+            occurrences = mesh_export.stl_occurrences(components)
+        else:
+            # the design is left untouched, the links left out of the robot need no mesh
+            occurrences = [(name, occ) for name, occ in
+                           mesh_export.link_occurrences(assembly.links, skip, assembly.names)
+                           if name in robot.meshes]
+        if write_mesh is not None:
+            os.makedirs(save_dir + '/meshes', exist_ok=True)
+            occurrences = [(name, occ) for name, occ in occurrences
+                           if not write_mesh(name, occ, save_dir + '/meshes/' + robot.meshes[name], options)]
+        with profiling.span('export meshes'):
+            mesh_report = yield from mesh_export.iter_export_meshes(
+                occurrences, save_dir + '/meshes', options['mesh_workers'], mesh_quality,
+                scale=mesh_scale,
+                in_place=not copy_bodies, transforms=assembly.transforms, dedup=dedup_meshes,
+                mesh_format=options['mesh_format'], compress=options['compress_meshes'],
+                quantize=options['quantize_meshes'], link_meshes=options['link_meshes'], cache=results,
+                fingerprints={o['name']: Snapshot.cache_identity(o) for o in snapshot['occurrences']})
+        for entry in mesh_report:
+            if 'mesh' in entry:
+                robot.meshes[entry['name']] = entry['mesh']
+                robot.mesh_placements[entry['name']] = entry['placement']
+        # the urdf is still written, these links point at missing mesh files
+        failed = [entry for entry in mesh_report if 'error' in entry]
+        if failed:
+            msg += '\n\nMesh export failed:\n' + \
+                '\n'.join('{}: {}'.format(entry['name'], entry['error']) for entry in failed)
+        # lighter visual and collision meshes, the urdf points at them
+        if options['visual_triangles'] is not None or options['collision_hull']:
+            with profiling.span('simplify meshes'):
+                yield tasks.in_background(mesh_simplify.simplify_meshes, robot, save_dir + '/meshes', 
+                                          options['visual_triangles'], options['collision_hull'],
+                                          options['quantize_meshes'])
+        
+        # --------------------
+        # Generate URDF
+        fragments = Snapshot.read_cache(save_dir, Snapshot.FRAGMENTS_FILE) if incremental else None
+        yield 'write urdf', 0, 1
+        yield tasks.in_background(Write.write_robot, robot, options['package_name'], save_dir, fragments)
+        if options['xacro']:
+            with profiling.span('write xacro'):
+                yield tasks.in_background(Xacro.write_xacro, robot, save_dir)
+        
+        # later regenerations can run from the snapshot, see offline/__init__.py
+        with profiling.span('write snapshot'):
+            yield tasks.in_background(Snapshot.write_snapshot, snapshot, save_dir)
+            yield tasks.in_background(Snapshot.write_cache, save_dir, Snapshot.MESH_REPORT_FILE, mesh_report)
+            if incremental:
+                yield tasks.in_background(Snapshot.write_cache, save_dir, Snapshot.FRAGMENTS_FILE, fragments)
+        if results is not None:
+            with profiling.span('evict cache'):
+                yield tasks.in_background(results.evict)
+        
+        if options['profile']:
+            profiling.stop().write(save_dir)
+    finally:
+        profiling.stop()
+    return save_dir, msg
+
+
+def export_design(design, output_dir, options=None, properties=None, write_mesh=None):
+    """
+    iter_export run to the end on the calling thread, see its parameters
+
+    Returns
+    ----------
+    save_dir: str or None on failure
+    msg: str
+        Tell the status
+    """
+    return tasks.run_steps(iter_export(design, output_dir, options, properties, write_mesh))
+
+
+def open_design(app, name):
+    """
+    Open the design of a job: a .f3d archive is imported, anything else is
+    looked up as a Fusion data file id
+
+    Returns
+    ----------
+    document: adsk.core.Document
+    design: adsk.fusion.Design
+    """
+    if os.path.isfile(name):
+        import_manager = app.importManager
+        document = import_manager.importToNewDocument(
+            import_manager.createFusionArchiveImportOptions(name))
+    else:
+        data_file = app.data.findFileById(name)
+        if data_file is None:
+            raise ValueError('No Fusion data file with id ' + name)
+        document = app.documents.open(data_file)
+    design = adsk.fusion.Design.cast(document.products.itemByProductType('DesignProductType'))
+    return document, design
+
+
+def export_jobs(app, job_file):
+    """
+    Open, export and close each design of a job file in turn, see utils/batch.py
+
+    Returns
+    ----------
+    summary: dict
+    """
+    base = os.path.splitext(job_file)[0]
+    log = batch.Log(base + '_' + batch.LOG_FILE, echo=None)
+    properties = {}  # warm across the designs, the variants share most of their parts
+
+    def export_job(job):
+        document, design = open_design(app, job['design'])
+        try:
+            if not design:
+                return None, 'No Fusion design in ' + job['design']
+            os.makedirs(job['output_dir'], exist_ok=True)
+            return export_design(design, job['output_dir'], job['options'], properties)
+        finally:
+            document.close(False)
+
+    try:
+        summary = batch.run_jobs(batch.read_jobs(job_file), export_job, log)
+    finally:
+        log.close()
+    batch.write_summary(summary, base + '_' + batch.SUMMARY_FILE)
+    return summary
+
+
 def run(context):
     ui = None
-    success_msg = 'Successfully create URDF file'
-    msg = success_msg
+    title = 'Fusion2URDF'
     
     try:
         # --------------------
         # initialize
         app = adsk.core.Application.get()
         ui = app.userInterface
+        if JOB_FILE is not None:
+            summary = export_jobs(app, JOB_FILE)
+            ui.messageBox('{} designs exported, {} failed ({:.1f} designs/hour)'.format(
+                summary['succeeded'], summary['failed'], summary['designs_per_hour']), title)
+            return
+        
         product = app.activeProduct
         design = adsk.fusion.Design.cast(product)
-        title = 'Fusion2URDF'
         if not design:
             ui.messageBox('No active Fusion design', title)
             return
 
-        root = design.rootComponent  # root component 
-        components = design.allComponents
-
-        # set the names        
-        package_name = 'fusion2urdf'
-        robot_name = root.name.split()[0]
-        save_dir = utils.file_dialog(ui)
-        if save_dir == False:
+        output_dir = utils.file_dialog(ui)
+        if output_dir == False:
             ui.messageBox('Fusion2URDF was canceled', title)
             return 0
         
-        save_dir = save_dir + '/' + robot_name
-        try: os.mkdir(save_dir)
-        except: pass     
-        
-        # --------------------
-        # set dictionaries
-        
-        # Generate joints_dict. All joints are related to root. 
-        joints_dict, msg = Joint.make_joints_dict(root, msg)
-        if msg != success_msg:
-            ui.messageBox(msg, title)
-            return 0   
-        
-        # Generate inertial_dict
-        inertial_dict, msg = Link.make_inertial_dict(root, msg)
-        if msg != success_msg:
-            ui.messageBox(msg, title)
-            return 0
-        elif not 'base_link' in inertial_dict:
-            msg = 'There is no base_link. Please set base_link and run again.'
-            ui.messageBox(msg, title)
-            return 0
-        
-        links_xyz_dict = {}
-        
-        # --------------------
-        # Generate URDF
-        Write.write_urdf(joints_dict, links_xyz_dict, inertial_dict, package_name, save_dir, robot_name)
-        Write.write_hello_pybullet(robot_name, save_dir)
-        
-        # Generate STl files        
-        utils.copy_occs(root)
-        utils.export_stl(design, save_dir, components)   
+        # the export runs in steps from a custom event, the UI stays responsive
+        # and shows the progress, Cancel stops it between two links
+        def on_done(result, error):
+            try:
+                ui.messageBox(error if error is not None else result[1], title)
+            finally:
+                adsk.terminate()
         
-        ui.messageBox(msg, title)
+        adsk.autoTerminate(False)
+        tasks.FusionTask(app, iter_export(design, output_dir), title, on_done).start()
         
     except:
         if ui:
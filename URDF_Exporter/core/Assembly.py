@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Walk the occurrences and joints of a design through its sub-assemblies.
+
+An occurrence whose component has child occurrences and joints is an
+articulated sub-assembly: its child occurrences become links and its joints
+connect them. Every other occurrence is one rigid link, sub-assemblies without
+joints included. Bodies placed directly in an articulated sub-assembly
+component are not exported, put them in a child component.
+"""
+
+from ..utils.names import BASE_LINK, link_names, sanitize
+
+
+def is_articulated(occ):
+    """
+    True if the children of the occurrence are links joined by the joints of
+    its component
+    """
+    return occ.childOccurrences.count > 0 and occ.component.joints.count > 0
+
+
+def link_name(occ, names=None):
+    """
+    name of the link of an occurrence, as used for the urdf and the mesh files.
+    names is the NameRegistry of the design, e.g. Assembly.names, without it
+    the name is not checked against the other links.
+    """
+    if names is not None:
+        return names[occ.fullPathName]
+    if occ.component.name == BASE_LINK:
+        return BASE_LINK
+    return sanitize(occ.fullPathName)
+
+
+class Assembly:
+    def __init__(self, root):
+        """
+        Walk the design once from the root component
+
+
+        Parameters
+        ----------
+        root: adsk.fusion.Component
+
+        Attributes
+        ----------
+        links: list
+            occurrences exported as links, in walk order
+        joints: list
+            (name, joint) of the joints between links in the root context. The
+            joints of a sub-assembly are named after its full path.
+        transforms: dict
+            {occurrence full path: adsk.core.Matrix3D} in the root component,
+            each composed once from the transform of its parent
+        names: utils.names.NameRegistry
+            link name of each link by its full path
+        """
+        self.links = []
+        self.joints = [(joint.name, joint) for joint in root.joints]
+        self.transforms = {}
+
+        stack = [(occ, None) for occ in reversed(list(root.occurrences))]
+        while stack:
+            occ, parent = stack.pop()
+            path = occ.fullPathName
+            if parent is None:
+                self.transforms[path] = occ.transform
+            else:
+                # the native occurrence is placed relative to its parent component
+                transform = occ.nativeObject.transform.copy()
+                transform.transformBy(self.transforms[parent])
+                self.transforms[path] = transform
+            if is_articulated(occ):
+                for joint in occ.component.joints:
+                    self.joints.append((path + '+' + joint.name, joint.createForAssemblyContext(occ)))
+                stack.extend((child, path) for child in reversed(list(occ.childOccurrences)))
+            else:
+                self.links.append(occ)
+        self.names = link_names(self.links, full_path=True)
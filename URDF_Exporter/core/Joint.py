@@ -5,9 +5,38 @@ Created on Sun May 12 20:17:17 2019
 @author: syuntoku
 """
 
-import adsk, re
-from xml.etree.ElementTree import Element, SubElement
-from ..utils import utils
+from ..utils.xml_template import Template, slot
+from ..utils.names import link_names
+from .Records import JointRecord
+
+
+def _joint_node(axis, limit):
+    node = ('joint', {'name': slot('name'), 'type': slot('type')}, [
+        ('origin', {'xyz': slot('xyz'), 'rpy': '0 0 0'}),
+        ('parent', {'link': slot('parent')}),
+        ('child', {'link': slot('child')})])
+    if axis:
+        node[2].append(('axis', {'xyz': slot('axis')}))
+    if limit:
+        node[2].append(('limit', {'upper': slot('upper_limit'), 'lower': slot('lower_limit'),
+                                  'effort': '100', 'velocity': '100'}))
+    return node
+
+# the xml of a joint by its type, the other types have neither axis nor limit
+JOINT_TEMPLATES = {
+    'revolute': Template(_joint_node(axis=True, limit=True)),
+    'prismatic': Template(_joint_node(axis=True, limit=True)),
+    'continuous': Template(_joint_node(axis=True, limit=False)),
+    'fixed': Template(_joint_node(axis=False, limit=False))}
+
+TRANSMISSION_TEMPLATE = Template(
+    ('transmission', {'name': slot('tran')}, [
+        ('type', None, 'transmission_interface/SimpleTransmission'),
+        ('joint', {'name': slot('name')}, [('hardwareInterface', None, 'PositionJointInterface')]),
+        ('actuator', {'name': slot('actr')}, [
+            ('hardwareInterface', None, 'PositionJointInterface'),
+            ('mechanicalReduction', None, '1')])]))
+
 
 class Joint:
     def __init__(self, name, xyz, axis, parent, child, joint_type, upper_limit, lower_limit):
@@ -46,24 +75,13 @@ class Joint:
         """
         Generate the joint_xml and hold it by self.joint_xml
         """
-        joint = Element('joint')
-        joint.attrib = {'name':self.name, 'type':self.type}
-        
-        origin = SubElement(joint, 'origin')
-        origin.attrib = {'xyz':' '.join([str(_) for _ in self.xyz]), 'rpy':'0 0 0'}
-        parent = SubElement(joint, 'parent')
-        parent.attrib = {'link':self.parent}
-        child = SubElement(joint, 'child')
-        child.attrib = {'link':self.child}
-        if self.type == 'revolute' or self.type == 'continuous' or self.type == 'prismatic':        
-            axis = SubElement(joint, 'axis')
-            axis.attrib = {'xyz':' '.join([str(_) for _ in self.axis])}
-        if self.type == 'revolute' or self.type == 'prismatic':
-            limit = SubElement(joint, 'limit')
-            limit.attrib = {'upper': str(self.upper_limit), 'lower': str(self.lower_limit),
-                            'effort': '100', 'velocity': '100'}
-            
-        self.joint_xml = "\n".join(utils.prettify(joint).split("\n")[1:])
+        template = JOINT_TEMPLATES.get(self.type, JOINT_TEMPLATES['fixed'])
+        self.joint_xml = template.render({
+            'name': self.name, 'type': self.type,
+            'xyz': ' '.join([str(_) for _ in self.xyz]),
+            'parent': self.parent, 'child': self.child,
+            'axis': ' '.join([str(_) for _ in self.axis]),
+            'upper_limit': self.upper_limit, 'lower_limit': self.lower_limit})
 
     def make_transmission_xml(self):
         """
@@ -76,29 +94,11 @@ class Joint:
         type: transmission interface/SimpleTransmission
         hardwareInterface: PositionJointInterface        
         """        
-        
-        tran = Element('transmission')
-        tran.attrib = {'name':self.name + '_tran'}
-        
-        joint_type = SubElement(tran, 'type')
-        joint_type.text = 'transmission_interface/SimpleTransmission'
-        
-        joint = SubElement(tran, 'joint')
-        joint.attrib = {'name':self.name}
-        hardwareInterface_joint = SubElement(joint, 'hardwareInterface')
-        hardwareInterface_joint.text = 'PositionJointInterface'
-        
-        actuator = SubElement(tran, 'actuator')
-        actuator.attrib = {'name':self.name + '_actr'}
-        hardwareInterface_actr = SubElement(actuator, 'hardwareInterface')
-        hardwareInterface_actr.text = 'PositionJointInterface'
-        mechanicalReduction = SubElement(actuator, 'mechanicalReduction')
-        mechanicalReduction.text = '1'
-        
-        self.tran_xml = "\n".join(utils.prettify(tran).split("\n")[1:])
+        self.tran_xml = TRANSMISSION_TEMPLATE.render(
+            {'tran': self.name + '_tran', 'name': self.name, 'actr': self.name + '_actr'})
 
 
-def make_joints_dict(root, msg):
+def make_joints_dict(root, msg, names=None):
     """
     joints_dict holds parent, axis and xyz informatino of the joints
     
@@ -109,11 +109,13 @@ def make_joints_dict(root, msg):
         Root component
     msg: str
         Tell the status
+    names: utils.names.NameRegistry
+        link names by occurrence name, made from root.occurrences if None
         
     Returns
     ----------
     joints_dict: 
-        {name: {type, axis, upper_limit, lower_limit, parent, child, xyz}}
+        {name: Records.JointRecord}
     msg: str
         Tell the status
     """
@@ -123,26 +125,23 @@ def make_joints_dict(root, msg):
     'PinSlot', 'Planner', 'Ball']  # these are the names in urdf
 
     joints_dict = {}
+    if names is None:
+        names = link_names(root.occurrences)
     
     for joint in root.joints:
-        joint_dict = {}
         joint_type = joint_type_list[joint.jointMotion.jointType]
-        joint_dict['type'] = joint_type
-        
-        # swhich by the type of the joint
-        joint_dict['axis'] = [0, 0, 0]
-        joint_dict['upper_limit'] = 0.0
-        joint_dict['lower_limit'] = 0.0
+        # swhich by the type of the joint, no axis nor limits by default
+        record = JointRecord(joint_type, None, None, None)
         
         # support  "Revolute", "Rigid" and "Slider"
         if joint_type == 'revolute':
-            joint_dict['axis'] = [round(i, 6) for i in \
+            record.axis = [round(i, 6) for i in \
                 joint.jointMotion.rotationAxisVector.asArray()] ## In Fusion, exported axis is normalized.
             max_enabled = joint.jointMotion.rotationLimits.isMaximumValueEnabled
             min_enabled = joint.jointMotion.rotationLimits.isMinimumValueEnabled            
             if max_enabled and min_enabled:  
-                joint_dict['upper_limit'] = round(joint.jointMotion.rotationLimits.maximumValue, 6)
-                joint_dict['lower_limit'] = round(joint.jointMotion.rotationLimits.minimumValue, 6)
+                record.upper_limit = round(joint.jointMotion.rotationLimits.maximumValue, 6)
+                record.lower_limit = round(joint.jointMotion.rotationLimits.minimumValue, 6)
             elif max_enabled and not min_enabled:
                 msg = joint.name + 'is not set its lower limit. Please set it and try again.'
                 break
@@ -150,16 +149,16 @@ def make_joints_dict(root, msg):
                 msg = joint.name + 'is not set its upper limit. Please set it and try again.'
                 break
             else:  # if there is no angle limit
-                joint_dict['type'] = 'continuous'
+                record.type = 'continuous'
                 
         elif joint_type == 'prismatic':
-            joint_dict['axis'] = [round(i, 6) for i in \
+            record.axis = [round(i, 6) for i in \
                 joint.jointMotion.slideDirectionVector.asArray()]  # Also normalized
             max_enabled = joint.jointMotion.slideLimits.isMaximumValueEnabled
             min_enabled = joint.jointMotion.slideLimits.isMinimumValueEnabled            
             if max_enabled and min_enabled:  
-                joint_dict['upper_limit'] = round(joint.jointMotion.slideLimits.maximumValue/100, 6)
-                joint_dict['lower_limit'] = round(joint.jointMotion.slideLimits.minimumValue/100, 6)
+                record.upper_limit = round(joint.jointMotion.slideLimits.maximumValue/100, 6)
+                record.lower_limit = round(joint.jointMotion.slideLimits.minimumValue/100, 6)
             elif max_enabled and not min_enabled:
                 msg = joint.name + 'is not set its lower limit. Please set it and try again.'
                 break
@@ -169,25 +168,23 @@ def make_joints_dict(root, msg):
         elif joint_type == 'fixed':
             pass
         
-        if joint.occurrenceTwo.component.name == 'base_link':
-            joint_dict['parent'] = 'base_link'
-        else:
-            joint_dict['parent'] = re.sub('[ :()]', '_', joint.occurrenceTwo.name)
-        joint_dict['child'] = re.sub('[ :()]', '_', joint.occurrenceOne.name)
+        record.parent = names[joint.occurrenceTwo.name]
+        record.child = names[joint.occurrenceOne.name]
         
         try:
-            joint_dict['xyz'] = [round(i / 100.0, 6) for i in \
+            record.xyz = [round(i / 100.0, 6) for i in \
             joint.geometryOrOriginOne.origin.asArray()]  # converted to meter
         except:
             try:
-                if type(joint.geometryOrOriginTwo)==adsk.fusion.JointOrigin:
-                    data = joint.geometryOrOriginTwo.geometry.origin.asArray()
-                else:
-                    data = joint.geometryOrOriginTwo.origin.asArray()
-                joint_dict['xyz'] = [round(i / 100.0, 6) for i in data]  # converted to meter
+                origin = joint.geometryOrOriginTwo
+                if hasattr(origin, 'geometry'):
+                    # a JointOrigin, of a live or a replayed design, is placed by its JointGeometry
+                    origin = origin.geometry
+                data = origin.origin.asArray()
+                record.xyz = [round(i / 100.0, 6) for i in data]  # converted to meter
             except:
                 msg = joint.name + " doesn't have joint origin. Please set it and run again."
                 break
         
-        joints_dict[joint.name] = joint_dict
+        joints_dict[joint.name] = record
     return joints_dict, msg
\ No newline at end of file
@@ -5,13 +5,41 @@ Created on Sun May 12 20:11:28 2019
 @author: syuntoku
 """
 
-import adsk, re
-from xml.etree.ElementTree import Element, SubElement
-from ..utils import utils
+import adsk
+from ..utils import inertia, mesh_formats
+from ..utils.names import link_names
+from ..utils.xml_template import Template, slot
+from .Records import InertialRecord, column
+
+MESH_SCALE_MM = '0.001 0.001 0.001'
+MESH_SCALE_M = '1 1 1'
+
+# the xml of a link, only the slots change from one link to the other
+LINK_TEMPLATE = Template(
+    ('link', {'name': slot('name')}, [
+        ('inertial', None, [
+            ('origin', {'xyz': slot('center_of_mass'), 'rpy': '0 0 0'}),
+            ('mass', {'value': slot('mass')}),
+            ('inertia', {'ixx': slot('ixx'), 'iyy': slot('iyy'), 'izz': slot('izz'),
+                         'ixy': slot('ixy'), 'iyz': slot('iyz'), 'ixz': slot('ixz')})]),
+        ('visual', None, [
+            ('origin', {'xyz': slot('mesh_xyz'), 'rpy': slot('mesh_rpy')}),
+            ('geometry', None, [('mesh', {'filename': slot('mesh'), 'scale': slot('mesh_scale')})]),
+            ('material', {'name': 'silver'})]),
+        ('collision', None, [
+            ('origin', {'xyz': slot('mesh_xyz'), 'rpy': slot('mesh_rpy')}),
+            ('geometry', None, [('mesh', {'filename': slot('collision_mesh'), 
+                                          'scale': slot('collision_mesh_scale')})])])]))
+
+def _file_scale(mesh, mesh_scale):
+    # the formats of mesh_formats.IN_METERS are in meters whatever mesh_scale
+    return MESH_SCALE_M if mesh_formats.in_meters(mesh) else mesh_scale
+
 
 class Link:
 
-    def __init__(self, name, xyz, center_of_mass, repo, mass, inertia_tensor):
+    def __init__(self, name, xyz, center_of_mass, repo, mass, inertia_tensor, mesh=None, 
+                 mesh_scale=MESH_SCALE_MM, collision_mesh=None, mesh_placement=None):
         """
         Parameters
         ----------
@@ -29,6 +57,17 @@ class Link:
             mass of the link
         inertia_tensor: [ixx, iyy, izz, ixy, iyz, ixz]
             tensor of the inertia
+        mesh: str
+            mesh file name in repo, name + '.stl' by default
+        mesh_scale: str
+            scale of the mesh, MESH_SCALE_MM for meshes in mm, MESH_SCALE_M in m.
+            The meshes of mesh_formats.IN_METERS are always in m.
+        collision_mesh: str
+            mesh file name in repo for the collision, mesh by default
+        mesh_placement: [x, y, z, roll, pitch, yaw]
+            placement of the meshes in the root component (m, rad) when they
+            are written in the coordinates of their component, None if they
+            are written in the root coordinates
         """
         self.name = name
         # xyz for visual
@@ -39,50 +78,34 @@ class Link:
         self.repo = repo
         self.mass = mass
         self.inertia_tensor = inertia_tensor
+        self.mesh = mesh if mesh is not None else name + '.stl'
+        self.collision_mesh = collision_mesh if collision_mesh is not None else self.mesh
+        self.mesh_scale = _file_scale(self.mesh, mesh_scale)
+        self.collision_mesh_scale = _file_scale(self.collision_mesh, mesh_scale)
+        self.mesh_placement = mesh_placement
         
     def make_link_xml(self):
         """
         Generate the link_xml and hold it by self.link_xml
         """
+        # origin of the meshes
+        mesh_xyz, mesh_rpy = self.xyz, '0 0 0'
+        if self.mesh_placement is not None:
+            mesh_xyz = [round(p + x, 6) for p, x in zip(self.mesh_placement[:3], self.xyz)]
+            mesh_rpy = ' '.join([str(_) for _ in self.mesh_placement[3:]])
         
-        link = Element('link')
-        link.attrib = {'name':self.name}
-        
-        #inertial
-        inertial = SubElement(link, 'inertial')
-        origin_i = SubElement(inertial, 'origin')
-        origin_i.attrib = {'xyz':' '.join([str(_) for _ in self.center_of_mass]), 'rpy':'0 0 0'}       
-        mass = SubElement(inertial, 'mass')
-        mass.attrib = {'value':str(self.mass)}
-        inertia = SubElement(inertial, 'inertia')
-        inertia.attrib = \
-            {'ixx':str(self.inertia_tensor[0]), 'iyy':str(self.inertia_tensor[1]),\
-            'izz':str(self.inertia_tensor[2]), 'ixy':str(self.inertia_tensor[3]),\
-            'iyz':str(self.inertia_tensor[4]), 'ixz':str(self.inertia_tensor[5])}        
-        
-        # visual
-        visual = SubElement(link, 'visual')
-        origin_v = SubElement(visual, 'origin')
-        origin_v.attrib = {'xyz':' '.join([str(_) for _ in self.xyz]), 'rpy':'0 0 0'}
-        geometry_v = SubElement(visual, 'geometry')
-        mesh_v = SubElement(geometry_v, 'mesh')
-        mesh_v.attrib = {'filename': self.repo + self.name + '.stl','scale':'0.001 0.001 0.001'}
-        material = SubElement(visual, 'material')
-        material.attrib = {'name':'silver'}
-        
-        # collision
-        collision = SubElement(link, 'collision')
-        origin_c = SubElement(collision, 'origin')
-        origin_c.attrib = {'xyz':' '.join([str(_) for _ in self.xyz]), 'rpy':'0 0 0'}
-        geometry_c = SubElement(collision, 'geometry')
-        mesh_c = SubElement(geometry_c, 'mesh')
-        mesh_c.attrib = {'filename': self.repo + self.name + '.stl','scale':'0.001 0.001 0.001'}
+        ixx, iyy, izz, ixy, iyz, ixz = self.inertia_tensor
+        self.link_xml = LINK_TEMPLATE.render({
+            'name': self.name,
+            'center_of_mass': ' '.join([str(_) for _ in self.center_of_mass]),
+            'mass': self.mass,
+            'ixx': ixx, 'iyy': iyy, 'izz': izz, 'ixy': ixy, 'iyz': iyz, 'ixz': ixz,
+            'mesh_xyz': ' '.join([str(_) for _ in mesh_xyz]), 'mesh_rpy': mesh_rpy,
+            'mesh': self.repo + self.mesh, 'collision_mesh': self.repo + self.collision_mesh,
+            'mesh_scale': self.mesh_scale, 'collision_mesh_scale': self.collision_mesh_scale})
 
-        # print("\n".join(utils.prettify(link).split("\n")[1:]))
-        self.link_xml = "\n".join(utils.prettify(link).split("\n")[1:])
 
-
-def make_inertial_dict(root, msg):
+def make_inertial_dict(root, msg, names=None):
     """      
     Parameters
     ----------
@@ -90,10 +113,12 @@ def make_inertial_dict(root, msg):
         Root component
     msg: str
         Tell the status
+    names: utils.names.NameRegistry
+        link names by occurrence name, made from root.occurrences if None
         
     Returns
     ----------
-    inertial_dict: {name:{mass, inertia, center_of_mass}}
+    inertial_dict: {name: Records.InertialRecord}
     
     msg: str
         Tell the status
@@ -101,27 +126,41 @@ def make_inertial_dict(root, msg):
     # Get component properties.      
     allOccs = root.occurrences
     inertial_dict = {}
+    records, moments_world = [], []
+    if names is None:
+        names = link_names(allOccs)
     
     for occs in allOccs:
         # Skip the root component.
-        occs_dict = {}
         prop = occs.getPhysicalProperties(adsk.fusion.CalculationAccuracy.VeryHighCalculationAccuracy)
         
-        occs_dict['name'] = re.sub('[ :()]', '_', occs.name)
-
         mass = prop.mass  # kg
-        occs_dict['mass'] = mass
         center_of_mass = [_/100.0 for _ in prop.centerOfMass.asArray()] ## cm to m
-        occs_dict['center_of_mass'] = center_of_mass
+        record = InertialRecord(mass, center_of_mass)
 
         # https://help.autodesk.com/view/fusion360/ENU/?guid=GUID-ce341ee6-4490-11e5-b25b-f8b156d7cd97
         (_, xx, yy, zz, xy, yz, xz) = prop.getXYZMomentsOfInertia()
-        moment_inertia_world = [_ / 10000.0 for _ in [xx, yy, zz, xy, yz, xz] ] ## kg / cm^2 -> kg/m^2
-        occs_dict['inertia'] = utils.origin2center_of_mass(moment_inertia_world, center_of_mass, mass)
+        moments_world.append([_ / 10000.0 for _ in [xx, yy, zz, xy, yz, xz] ]) ## kg / cm^2 -> kg/m^2
+        records.append(record)
         
-        if occs.component.name == 'base_link':
-            inertial_dict['base_link'] = occs_dict
-        else:
-            inertial_dict[re.sub('[ :()]', '_', occs.name)] = occs_dict
+        inertial_dict[names[occs.name]] = record
 
-    return inertial_dict, msg
\ No newline at end of file
+    # shift all the inertias to their center of mass at once
+    moments = inertia.center_of_mass_inertia(moments_world, column(records, 'center_of_mass'), 
+                                             column(records, 'mass'))
+    for record, moment in zip(records, moments):
+        record.inertia = moment
+
+    return inertial_dict, msg
+
+
+def validate_inertial_dict(inertial_dict):
+    """
+    Check that the inertia of each link is physically valid
+    
+    
+    Returns
+    ----------
+    invalid: {name: reason}
+    """
+    return inertia.validate(list(inertial_dict), column(inertial_dict.values(), 'inertia'))
\ No newline at end of file
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Compact records of the joints and links of a robot.
+
+joints_dict and inertial_dict map a name to one of these records instead of
+a dict. The fields are slots: a record takes a fraction of the memory of a
+dict and a field is read as an attribute. column() gathers one field of many
+records into the list the batched functions of utils/inertia.py take.
+"""
+
+from operator import attrgetter
+
+
+class JointRecord:
+    __slots__ = ('type', 'axis', 'upper_limit', 'lower_limit', 'parent', 'child', 'xyz')
+
+    def __init__(self, type, parent, child, xyz, axis=None, upper_limit=0.0, lower_limit=0.0):
+        """
+        Attributes
+        ----------
+        type: str
+            urdf type of the joint, e.g. 'revolute'
+        axis: [x, y, z]
+            for 'revolute', 'continuous' and 'prismatic', [0, 0, 0] otherwise
+        upper_limit, lower_limit: float
+            for 'revolute' (rad) and 'prismatic' (m), 0.0 otherwise
+        parent, child: str
+            link names
+        xyz: [x, y, z]
+            origin of the joint in the root component (m)
+        """
+        self.type = type
+        self.axis = axis if axis is not None else [0, 0, 0]
+        self.upper_limit = upper_limit
+        self.lower_limit = lower_limit
+        self.parent = parent
+        self.child = child
+        self.xyz = xyz
+
+    def __repr__(self):
+        return 'JointRecord({})'.format(', '.join(
+            '{}={!r}'.format(field, getattr(self, field)) for field in self.__slots__))
+
+
+class InertialRecord:
+    __slots__ = ('mass', 'center_of_mass', 'inertia')
+
+    def __init__(self, mass, center_of_mass, inertia=None):
+        """
+        Attributes
+        ----------
+        mass: float
+            kg
+        center_of_mass: [x, y, z]
+            in the root component (m)
+        inertia: [xx, yy, zz, xy, yz, xz]
+            moments of inertia about the center of mass (kg*m^2)
+        """
+        self.mass = mass
+        self.center_of_mass = center_of_mass
+        self.inertia = inertia
+
+    def __repr__(self):
+        return 'InertialRecord({})'.format(', '.join(
+            '{}={!r}'.format(field, getattr(self, field)) for field in self.__slots__))
+
+
+def column(records, field):
+    """
+    One field of the records as a list, e.g. the Nx3 centers of mass of
+    inertial_dict.values()
+    """
+    return list(map(attrgetter(field), records))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Fusion-independent description of the robot to export.
+
+The Fusion adapter (make_robot) reads the design once, everything downstream
+(urdf generation, mesh export) only works on the Robot.
+"""
+
+from . import Link, Joint, Tree
+from ..utils.names import link_names
+
+
+class Robot:
+    def __init__(self, name, joints_dict, inertial_dict, meshes=None, mesh_scale=Link.MESH_SCALE_MM,
+                 collision_meshes=None, mesh_placements=None, renamed=None):
+        """
+        Attributes
+        ----------
+        name: str
+            name of the robot, used for the urdf file name
+        joints_dict: dict
+            {name: Records.JointRecord}, in breadth-first order from 
+            base_link when made by make_robot
+        inertial_dict: dict
+            {name: Records.InertialRecord}
+        meshes: dict
+            {link name: mesh file name relative to the meshes directory}
+        mesh_scale: str
+            scale of the meshes in the urdf, Link.MESH_SCALE_M if the mesh 
+            files are written in meters
+        collision_meshes: dict
+            {link name: collision mesh file name} for the links whose 
+            collision does not use the visual mesh
+        mesh_placements: dict
+            {link name: [x, y, z, roll, pitch, yaw]} of the links whose meshes
+            are written in the coordinates of their component, e.g. because
+            they are shared with other links
+        renamed: dict
+            {Fusion name: link name} of the occurrences whose sanitized name
+            was already taken by another link, see utils/names.py
+        """
+        self.name = name
+        self.joints_dict = joints_dict
+        self.inertial_dict = inertial_dict
+        self.meshes = meshes if meshes is not None else \
+            {link: link + '.stl' for link in inertial_dict}
+        self.mesh_scale = mesh_scale
+        self.collision_meshes = collision_meshes if collision_meshes is not None else {}
+        self.mesh_placements = mesh_placements if mesh_placements is not None else {}
+        self.renamed = renamed if renamed is not None else {}
+
+    @property
+    def links(self):
+        """
+        names of the links in the urdf: base_link and the child of each joint
+        """
+        return ['base_link'] + [j.child for j in self.joints_dict.values()]
+
+
+def make_robot(design, msg):
+    """
+    Read the joints, the inertials and the mesh references of the design once
+
+
+    Parameters
+    ----------
+    design: adsk.fusion.Design.cast(product)
+    msg: str
+        Tell the status
+
+    Returns
+    ----------
+    robot: Robot or None on failure. Links disconnected from base_link are
+        left out of it and listed in msg.
+    msg: str
+        Tell the status
+    """
+    success_msg = msg
+    root = design.rootComponent
+    # one urdf name per occurrence, for the links and the joints
+    names = link_names(root.occurrences)
+
+    # Generate joints_dict. All joints are related to root.
+    joints_dict, msg = Joint.make_joints_dict(root, msg, names)
+    if msg != success_msg:
+        return None, msg
+
+    # Generate inertial_dict
+    inertial_dict, msg = Link.make_inertial_dict(root, msg, names)
+    if msg != success_msg:
+        return None, msg
+    elif not 'base_link' in inertial_dict:
+        msg = 'There is no base_link. Please set base_link and run again.'
+        return None, msg
+
+    # Check the joints form a tree from base_link, and order them breadth-first
+    tree = Tree.JointTree(joints_dict, inertial_dict)
+    if tree.errors:
+        msg = 'The joints do not form a tree from base_link:\n\n' + '\n'.join(tree.errors)
+        return None, msg
+    if tree.warnings:
+        # the tree from base_link is exported without them
+        inertial_dict = {link: inertial for link, inertial in inertial_dict.items() if link in tree.depth}
+        msg += '\n\nLeft out of the urdf, not connected to base_link:\n' + '\n'.join(tree.warnings)
+
+    return Robot(root.name.split()[0], tree.ordered(joints_dict), inertial_dict, 
+                 renamed=names.renamed), msg
@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""
+Record every Fusion API read the exporter needs into a versioned snapshot.
+
+The joints and occurrences are walked exactly once through the sub-assemblies
+(see Assembly.py), the snapshot is the flat recorded design format replayed by 
+offline/adsk (see offline/__init__.py), so the urdf can be regenerated from it
+without querying the CAD kernel again:
+
+    python -m URDF_Exporter.offline save_dir/.fusion2urdf/snapshot.json output_dir
+"""
+
+import adsk, adsk.core, adsk.fusion
+import os, json, hashlib
+from . import Assembly
+from ..utils import profiling, inertia, tasks, mesh_export, mesh_formats
+
+SNAPSHOT_FORMAT = 'fusion2urdf-snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = '.fusion2urdf'  # relative to save_dir
+SNAPSHOT_FILE = 'snapshot.json'
+FRAGMENTS_FILE = 'fragments.json'  # urdf fragments of the last export
+MESH_REPORT_FILE = 'meshes.json'  # per mesh timing of the last export
+PROPERTIES_FILE = 'properties.json'  # physical properties by fingerprint and accuracy
+
+# accuracy of the physical properties, from the fastest to the most accurate
+ACCURACIES = ['low', 'medium', 'high', 'very-high']
+DEFAULT_ACCURACY = 'very-high'
+
+
+def _limits(limits):
+    return {'isMaximumValueEnabled': limits.isMaximumValueEnabled,
+            'isMinimumValueEnabled': limits.isMinimumValueEnabled,
+            'maximumValue': limits.maximumValue,
+            'minimumValue': limits.minimumValue}
+
+
+def _geometry(geometry):
+    """
+    {"origin": [x, y, z]} for a joint geometry, {"jointOrigin": [x, y, z]} for
+    a joint origin and None if there is no origin
+    """
+    try:
+        return {'origin': list(geometry.origin.asArray())}
+    except:
+        pass
+    try:
+        return {'jointOrigin': list(geometry.geometry.origin.asArray())}
+    except:
+        return None
+
+
+def fingerprint(data):
+    """
+    Content hash of json serializable data
+    """
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def record_joint(joint, name=None):
+    """
+    Read a joint once, name is joint.name by default
+    """
+    name = joint.name if name is None else name
+    with profiling.span(name, 'joint'):
+        return _read_joint(joint, name)
+
+
+def _read_joint(joint, name):
+    motion = joint.jointMotion
+    joint_type = motion.jointType
+    data = {'name': name, 'jointType': joint_type,
+            'occurrenceOne': joint.occurrenceOne.fullPathName,
+            'occurrenceTwo': joint.occurrenceTwo.fullPathName,
+            'geometryOrOriginOne': _geometry(joint.geometryOrOriginOne),
+            'geometryOrOriginTwo': _geometry(joint.geometryOrOriginTwo)}
+    if joint_type == adsk.fusion.JointTypes.RevoluteJointType:
+        data['rotationAxisVector'] = list(motion.rotationAxisVector.asArray())
+        data['rotationLimits'] = _limits(motion.rotationLimits)
+    elif joint_type == adsk.fusion.JointTypes.SliderJointType:
+        data['slideDirectionVector'] = list(motion.slideDirectionVector.asArray())
+        data['slideLimits'] = _limits(motion.slideLimits)
+    data['fingerprint'] = fingerprint(data)
+    return data
+
+
+def _read_shape(occs, transform):
+    """
+    Cheap reads that change whenever the geometry, placement or material of the
+    occurrence changes: body count, bounding box, transform and per body volume,
+    area and material. No physical property calculation is needed for them.
+    """
+    box = occs.boundingBox
+    bodies = []
+    for body in occs.bRepBodies:
+        material = body.material
+        bodies.append({'volume': body.volume, 'area': body.area,
+                       'material': material.name if material else None})
+    return {'name': occs.fullPathName, 'component': occs.component.name,
+            'bodyCount': len(bodies), 'bodies': bodies,
+            'transform': list(transform.asArray()),
+            'boundingBox': [list(box.minPoint.asArray()), list(box.maxPoint.asArray())]}
+
+
+def cache_identity(o):
+    """
+    What the cached results of a recorded occurrence depend on: its 
+    fingerprint and the revision of its component, which changes with any
+    edit of the component, even one the cheap reads of the fingerprint miss
+    """
+    return [o['fingerprint'], o.get('revisionId')]
+
+
+def identity_key(o):
+    """
+    cache_identity of a recorded occurrence as a json object key: its
+    fingerprint, followed by the revision of its component if it has one
+    """
+    revision = o.get('revisionId')
+    return o['fingerprint'] if revision is None else '{}@{}'.format(o['fingerprint'], revision)
+
+
+def _rank(accuracy):
+    """
+    Index of accuracy in ACCURACIES, ValueError if it is unknown
+    """
+    if accuracy not in ACCURACIES:
+        raise ValueError('Unknown accuracy {}, expected one of {}'.format(accuracy, ', '.join(ACCURACIES)))
+    return ACCURACIES.index(accuracy)
+
+
+def _calculation_accuracy(accuracy):
+    """
+    adsk.fusion.CalculationAccuracy of 'low', 'medium', 'high' or 'very-high'
+    """
+    return [adsk.fusion.CalculationAccuracy.LowCalculationAccuracy,
+            adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy,
+            adsk.fusion.CalculationAccuracy.HighCalculationAccuracy,
+            adsk.fusion.CalculationAccuracy.VeryHighCalculationAccuracy][_rank(accuracy)]
+
+
+def _at_least(physical_properties, accuracy):
+    """
+    True if the physical properties were calculated with accuracy or better.
+    Snapshots without accuracy were always calculated with very high accuracy.
+    """
+    return _rank(physical_properties.get('accuracy', 'very-high')) >= _rank(accuracy)
+
+
+def cached_properties(properties, key, accuracy):
+    """
+    The most accurate physical properties cached for key with accuracy or 
+    better, None if there are none
+    """
+    cached = properties.get(key) or {}
+    for better in reversed(ACCURACIES[_rank(accuracy):]):
+        if better in cached:
+            return cached[better]
+    return None
+
+
+def _split(matrix):
+    m = matrix.asArray()
+    return [[m[0], m[1], m[2]], [m[4], m[5], m[6]], [m[8], m[9], m[10]]], [m[3], m[7], m[11]]
+
+
+def _component_properties(physical, matrix):
+    """
+    Physical properties of an occurrence placed by matrix, moved into the
+    coordinates of its component: center of mass and inertia about it
+    """
+    r, t = _split(matrix)
+    c = physical['centerOfMass']
+    d = [c[k] - t[k] for k in range(3)]
+    moments = inertia.center_of_mass_inertia([physical['xyzMomentsOfInertia']], [c], [physical['mass']])
+    return dict(physical, centerOfMass=[sum(r[k][i] * d[k] for k in range(3)) for i in range(3)],
+                xyzMomentsOfInertia=inertia.rotate_inertia(moments, [list(zip(*r))])[0])
+
+
+def _place_properties(local, matrix):
+    """
+    inverse of _component_properties for another occurrence of the component
+    """
+    r, t = _split(matrix)
+    c_l = local['centerOfMass']
+    c = [sum(r[i][k] * c_l[k] for k in range(3)) + t[i] for i in range(3)]
+    moments = inertia.rotate_inertia([local['xyzMomentsOfInertia']], [r])
+    return dict(local, centerOfMass=c,
+                xyzMomentsOfInertia=inertia.origin_inertia(moments, [c], [local['mass']])[0])
+
+
+def _calculate_properties(occs, accuracy):
+    with profiling.span(occs.fullPathName, 'getPhysicalProperties', accuracy=accuracy):
+        prop = occs.getPhysicalProperties(_calculation_accuracy(accuracy))
+    (_, xx, yy, zz, xy, yz, xz) = prop.getXYZMomentsOfInertia()
+    return {'mass': prop.mass, 'volume': prop.volume, 'area': prop.area,
+            'centerOfMass': list(prop.centerOfMass.asArray()),
+            'xyzMomentsOfInertia': [xx, yy, zz, xy, yz, xz],
+            'accuracy': accuracy}
+
+
+def record_occurrence(occs, previous=None, accuracy=DEFAULT_ACCURACY, properties=None, 
+                      transform=None, shared=None, names=None, cache=None):
+    """
+    Read an occurrence once, including its physical properties
+    
+    
+    Parameters
+    ----------
+    occs: adsk.fusion.Occurrence
+    previous: dict
+        record of the same occurrence in the previous snapshot. If its 
+        fingerprint and component revision match, it is reused and the 
+        physical properties are not calculated again.
+    accuracy: str
+        one of ACCURACIES, the physical properties are calculated with it 
+        unless a result at least as accurate is already known
+    properties: dict
+        cache of the physical properties {identity_key: {accuracy: properties}},
+        the calculated properties are added to it
+    transform: adsk.core.Matrix3D
+        placement of the occurrence in the root component, occs.transform by
+        default
+    shared: dict
+        {component name: properties in the component coordinates}. Other 
+        occurrences of an already read component are placed from it instead
+        of calculating their physical properties.
+    names: utils.names.NameRegistry
+        link names of the design by full path, see Assembly.link_name
+    cache: utils.cache.DiskCache
+        physical properties calculated by any export, keyed by cache_identity,
+        looked up before calculating them; the calculated ones are added
+    """
+    if transform is None:
+        transform = occs.transform
+    data = _read_shape(occs, transform)
+    data['fingerprint'] = fingerprint(data)
+    revision = getattr(occs.component, 'revisionId', None)
+    if revision is not None:
+        data['revisionId'] = revision
+    if properties is None:
+        properties = {}
+    component = occs.component.name
+    identity = identity_key(data)
+    cached = cached_properties(properties, identity, accuracy)
+    if cached is not None:
+        data['physicalProperties'] = cached
+    elif previous is not None and 'fingerprint' in previous \
+            and cache_identity(previous) == cache_identity(data) \
+            and 'physicalProperties' in previous and _at_least(previous['physicalProperties'], accuracy):
+        data['physicalProperties'] = previous['physicalProperties']
+    elif shared and component in shared and _at_least(shared[component], accuracy):
+        data['physicalProperties'] = _place_properties(shared[component], transform)
+    else:
+        # {accuracy: properties} of previous sessions or other workstations
+        key = ['properties'] + cache_identity(data)
+        stored = {identity: cache.get_json(key) or {}} if cache is not None else {}
+        data['physicalProperties'] = cached_properties(stored, identity, accuracy)
+        if data['physicalProperties'] is None:
+            data['physicalProperties'] = _calculate_properties(occs, accuracy)
+            if cache is not None:
+                cache.update_json(key, {accuracy: data['physicalProperties']})
+    physical = data['physicalProperties']
+    physical_accuracy = physical.get('accuracy', 'very-high')
+    properties.setdefault(identity, {})[physical_accuracy] = physical
+    if shared is not None and not (component in shared and _at_least(shared[component], physical_accuracy)):
+        shared[component] = _component_properties(physical, transform)
+
+    # where the mesh export puts the mesh, relative to the snapshot
+    data['mesh'] = '../meshes/' + Assembly.link_name(occs, names) + '.stl'
+    return data
+
+
+def iter_record_design(design, previous=None, accuracy=DEFAULT_ACCURACY, properties=None, assembly=None,
+                       cache=None):
+    """
+    Walk the joints and occurrences once, through the sub-assemblies, as
+    steps (see utils/tasks.py): one progress step per occurrence
+
+
+    Parameters
+    ----------
+    design: adsk.fusion.Design.cast(product)
+    previous: dict
+        snapshot of the previous export, unchanged occurrences reuse its 
+        physical properties
+    accuracy: str
+        accuracy of the physical properties, one of ACCURACIES
+    properties: dict
+        cache of the physical properties by identity_key and accuracy, see 
+        read_properties
+    assembly: Assembly.Assembly
+        walk of the design, made if None
+    cache: utils.cache.DiskCache
+        see record_occurrence
+
+    Returns
+    ----------
+    snapshot: dict
+        recorded design, json serializable
+    """
+    root = design.rootComponent
+    if assembly is None:
+        assembly = Assembly.Assembly(root)
+    previous_occs = {}
+    if previous:
+        previous_occs = {o['name']: o for o in previous.get('occurrences', [])}
+    shared = {}  # occurrences of the same component share their physical properties
+    occurrences = []
+    for i, occs in enumerate(assembly.links):
+        yield 'record design', i, len(assembly.links)
+        occurrences.append(record_occurrence(occs, previous_occs.get(occs.fullPathName), accuracy, 
+                                             properties, assembly.transforms[occs.fullPathName], shared,
+                                             assembly.names, cache))
+    return {'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+            'rootComponent': {'name': root.name},
+            'occurrences': occurrences,
+            'joints': [record_joint(joint, name) for name, joint in assembly.joints]}
+
+
+def record_design(design, previous=None, accuracy=DEFAULT_ACCURACY, properties=None, assembly=None,
+                  cache=None):
+    """
+    iter_record_design run to the end
+    """
+    return tasks.run_steps(iter_record_design(design, previous, accuracy, properties, assembly, cache))
+
+
+def changed_occurrences(snapshot, previous):
+    """
+    Names of the occurrences that are new or whose fingerprint or component
+    revision changed since the previous snapshot
+    """
+    old = {}
+    if previous:
+        old = {o['name']: cache_identity(o) for o in previous.get('occurrences', []) if 'fingerprint' in o}
+    return set([o['name'] for o in snapshot['occurrences']
+                if o.get('fingerprint') is None or old.get(o['name']) != cache_identity(o)])
+
+
+def record_mesh_settings(snapshot, names, settings, scale=mesh_export.CM_TO_MM, quantize=False):
+    """
+    Point the occurrences of a snapshot at their mesh files and record the
+    refinement, scale and quantization of the files, which the fingerprint 
+    does not cover
+
+
+    Parameters
+    ----------
+    names: utils.names.NameRegistry
+        link names by full path, Assembly.names
+    settings: function
+        (mesh file name, refinement) of a link name
+    scale: float
+        from cm to the unit of the files, mesh_export.CM_TO_MM or CM_TO_M, 
+        but for the formats of mesh_formats.IN_METERS
+    quantize: bool
+        16-bit positions in the glb files
+    """
+    for o in snapshot['occurrences']:
+        mesh, refinement = settings(names[o['name']])
+        o['mesh'] = '../meshes/' + mesh
+        o['refinement'] = refinement
+        o['scale'] = mesh_export.CM_TO_M if mesh_formats.in_meters(mesh) else scale
+        o['quantize'] = quantize
+
+
+def _mesh_settings(o):
+    # snapshots without them were written with the defaults
+    return (o.get('mesh'), o.get('refinement', mesh_export.DEFAULT_REFINEMENT), 
+            o.get('scale', mesh_export.CM_TO_MM), o.get('quantize', False))
+
+
+def unchanged_meshes(snapshot, previous, save_dir):
+    """
+    Names of the occurrences whose fingerprint, component revision, mesh
+    file, refinement, scale and quantization did not change since the 
+    previous snapshot and whose mesh is still in save_dir
+    """
+    changed = changed_occurrences(snapshot, previous)
+    old = {o['name']: _mesh_settings(o) for o in (previous or {}).get('occurrences', [])}
+    snapshot_dir = save_dir + '/' + SNAPSHOT_DIR + '/'
+    return set([o['name'] for o in snapshot['occurrences']
+                if o['name'] not in changed 
+                and old.get(o['name']) == _mesh_settings(o)
+                and os.path.isfile(os.path.normpath(snapshot_dir + o['mesh']))])
+
+
+def replay_design(snapshot):
+    """
+    Return a design answering the exporter's queries from the snapshot
+    """
+    check_version(snapshot)
+    # the replay answers like the stand-in of offline/, only imported when replaying
+    from ..offline.adsk import fusion as replay
+    return replay.Design(snapshot)
+
+
+def check_version(snapshot):
+    """
+    Raise ValueError if the snapshot was written by a newer exporter.
+    Designs recorded by hand have no version and are read as version 1.
+    """
+    version = snapshot.get('version', 1)
+    if version > SNAPSHOT_VERSION:
+        raise ValueError('Snapshot version {} is newer than the supported version {}'
+                         .format(version, SNAPSHOT_VERSION))
+
+
+def write_snapshot(snapshot, save_dir):
+    """
+    Write the snapshot into "save_dir/.fusion2urdf/snapshot.json"
+
+    Returns
+    ----------
+    file_name: str
+    """
+    return write_cache(save_dir, SNAPSHOT_FILE, snapshot)
+
+
+def read_snapshot(file_name):
+    with open(file_name) as f:
+        snapshot = json.load(f)
+    check_version(snapshot)
+    return snapshot
+
+
+def read_previous(save_dir):
+    """
+    Snapshot of the previous export into save_dir, None if there is none or 
+    it can not be used
+    """
+    try:
+        return read_snapshot(save_dir + '/' + SNAPSHOT_DIR + '/' + SNAPSHOT_FILE)
+    except (OSError, ValueError):
+        return None
+
+
+def read_properties(save_dir):
+    """
+    Cache of the physical properties calculated by the previous exports into
+    save_dir: {identity_key: {accuracy: physical properties}}
+    """
+    return read_cache(save_dir, PROPERTIES_FILE)
+
+
+def write_properties(save_dir, properties, snapshot):
+    """
+    Write the cache of the physical properties, keeping only the identities
+    of the occurrences in snapshot
+    """
+    current = set([identity_key(o) for o in snapshot['occurrences']])
+    return write_cache(save_dir, PROPERTIES_FILE, 
+                       {key: value for key, value in properties.items() if key in current})
+
+
+def read_cache(save_dir, file_name):
+    """
+    Read "save_dir/.fusion2urdf/file_name", {} if missing or broken
+    """
+    try:
+        with open(save_dir + '/' + SNAPSHOT_DIR + '/' + file_name) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(save_dir, file_name, data):
+    """
+    Write data as json into "save_dir/.fusion2urdf/file_name"
+    """
+    try: os.mkdir(save_dir + '/' + SNAPSHOT_DIR)
+    except OSError: pass
+    file_name = save_dir + '/' + SNAPSHOT_DIR + '/' + file_name
+    with open(file_name, mode='w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    return file_name
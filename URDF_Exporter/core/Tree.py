@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the kinematic tree described by joints_dict.
+
+The index is built in one pass over the joints and one breadth-first walk
+from base_link, and collects every topology error instead of stopping at the
+first one. Links disconnected from base_link are warnings only: the tree
+from base_link is still a valid robot.
+"""
+
+from collections import deque
+
+
+class JointTree:
+    def __init__(self, joints_dict, links=None, root='base_link'):
+        """
+        Parameters
+        ----------
+        joints_dict: dict
+            {name: Records.JointRecord}
+        links: iterable
+            names of all the links, e.g. inertial_dict. Links missing from it
+            and links no joint reaches are reported.
+        root: str
+            name of the root link
+
+        Attributes
+        ----------
+        children: dict
+            {link: [joints whose parent is link]}
+        parent: dict
+            {link: joint whose child is link}, the first one if there are several
+        depth: dict
+            {link: number of joints from root}, only for the links reached from root
+        link_order: list
+            links in breadth-first order from root
+        joint_order: list
+            joints in breadth-first order, the joint of each link of link_order
+        errors: list
+            cycles, multiple parents and unknown links
+        warnings: list
+            links disconnected from root, left out of link_order
+        """
+        self.root = root
+        self.children = {}
+        self.parent = {}
+        self.depth = {}
+        self.link_order = []
+        self.joint_order = []
+        self.errors = []
+        self.warnings = []
+        links = list(links) if links is not None else None
+        known = set(links) if links is not None else None
+
+        for name, joint in joints_dict.items():
+            parent, child = joint.parent, joint.child
+            for role, link in (('parent', parent), ('child', child)):
+                if known is not None and link not in known:
+                    self.errors.append('{} of {} is {}, which is not a link'.format(role, name, link))
+            self.children.setdefault(parent, []).append(name)
+            if child == root:
+                self.errors.append('{} is the child of {}, it can not have a parent'.format(root, name))
+            elif child in self.parent:
+                self.errors.append('{} has multiple parents: {} and {}'.format(
+                    child, self.parent[child], name))
+            else:
+                self.parent[child] = name
+
+        # breadth-first walk, each link is reached through its parent joint only
+        self.depth[root] = 0
+        self.link_order.append(root)
+        queue = deque([root])
+        while queue:
+            link = queue.popleft()
+            for name in self.children.get(link, []):
+                child = joints_dict[name].child
+                if self.parent.get(child) != name or child in self.depth:
+                    continue
+                self.depth[child] = self.depth[link] + 1
+                self.link_order.append(child)
+                self.joint_order.append(name)
+                queue.append(child)
+
+        self._check_unreached(joints_dict, links)
+
+    def _check_unreached(self, joints_dict, links):
+        """
+        Report the cycles among the links not reached from root as errors,
+        then the links disconnected from root as warnings
+        """
+        unreached = [child for child in self.parent if child not in self.depth]
+        in_cycle = set()
+        state = {}  # link: index of the walk that visited it
+        for start, link in enumerate(unreached):
+            path = []
+            while link in self.parent and link not in self.depth and link not in state:
+                state[link] = start
+                path.append(link)
+                link = joints_dict[self.parent[link]].parent
+            if state.get(link) == start and link not in in_cycle:
+                cycle = path[path.index(link):]
+                in_cycle.update(cycle)
+                self.errors.append('cycle: ' + ' <- '.join(cycle + [link]))
+        for child in unreached:
+            if child not in in_cycle:
+                self.warnings.append('{} is not connected to {}'.format(child, self.root))
+        if links is not None:
+            for link in links:
+                if link not in self.depth and link not in self.parent:
+                    self.warnings.append('{} is not connected to {}'.format(link, self.root))
+
+    def ordered(self, joints_dict):
+        """
+        joints_dict in breadth-first order
+        """
+        return {name: joints_dict[name] for name in self.joint_order}
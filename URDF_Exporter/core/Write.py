@@ -5,10 +5,218 @@ Created on Sun May 12 20:46:26 2019
 @author: syuntoku
 """
 
-import adsk, os
-from xml.etree.ElementTree import Element, SubElement
+import hashlib
 from . import Link, Joint
-from ..utils import utils
+from .Records import column
+from ..utils import inertia, profiling
+
+URDF_BUFFER_SIZE = 1 << 16  # bytes buffered before each write to the urdf
+
+URDF_HEADER = """<?xml version="1.0" ?>
+<robot name="{}">
+
+<material name="silver">
+  <color rgba="0.700 0.700 0.700 1.000"/>
+</material>
+
+"""
+
+URDF_ENDTAG = '</robot>\n'
+
+
+def iter_links(joints_dict, repo, links_xyz_dict, inertial_dict, meshes=None, 
+               mesh_scale=Link.MESH_SCALE_MM, collision_meshes=None, mesh_placements=None):
+    """
+    Yield the Link of base_link and then the child link of each joint
+    
+    
+    Parameters
+    ----------
+    joints_dict: dict
+        {name: Records.JointRecord}
+    repo: str
+        the name of the repository to save the xml file
+    links_xyz_dict: vacant dict
+        xyz information of the each link
+    inertial_dict:
+        {name: Records.InertialRecord}
+    meshes: dict
+        mesh file name of the each link, name.stl by default
+    mesh_scale: str
+        scale of the meshes
+    collision_meshes: dict
+        collision mesh file name of the links not using their mesh for collision
+    mesh_placements: dict
+        placement of the meshes of the links whose meshes are in the 
+        coordinates of their component, see Link.Link
+    
+    Note
+    ----------
+    In this function, links_xyz_dict is set for iter_joints.
+    The origin of the coordinate of center_of_mass is the coordinate of the link
+    """
+    # for base_link
+    base = inertial_dict['base_link']
+    link = Link.Link(name='base_link', xyz=[0,0,0], 
+        center_of_mass=base.center_of_mass, repo=repo,
+        mass=base.mass,
+        inertia_tensor=base.inertia,
+        mesh=meshes.get('base_link') if meshes else None, mesh_scale=mesh_scale,
+        collision_mesh=collision_meshes.get('base_link') if collision_meshes else None,
+        mesh_placement=mesh_placements.get('base_link') if mesh_placements else None)
+    links_xyz_dict[link.name] = link.xyz
+    yield link
+
+    # others, the centers of mass of all the children moved to their link frame at once
+    joints = list(joints_dict.values())
+    inertials = [inertial_dict[joint.child] for joint in joints]
+    centers_of_mass = inertia.relative_centers_of_mass(
+        column(inertials, 'center_of_mass'), column(joints, 'xyz'))
+    for joint, inertial, center_of_mass in zip(joints, inertials, centers_of_mass):
+        name = joint.child
+        link = Link.Link(name=name, xyz=joint.xyz,\
+            center_of_mass=center_of_mass,\
+            repo=repo, mass=inertial.mass,\
+            inertia_tensor=inertial.inertia,\
+            mesh=meshes.get(name) if meshes else None, mesh_scale=mesh_scale,\
+            collision_mesh=collision_meshes.get(name) if collision_meshes else None,\
+            mesh_placement=mesh_placements.get(name) if mesh_placements else None)
+        links_xyz_dict[link.name] = link.xyz
+        yield link
+
+
+def iter_joints(joints_dict, links_xyz_dict):
+    """
+    Yield the Joint of each joint in joints_dict
+    
+    
+    Parameters
+    ----------
+    joints_dict: dict
+        {name: Records.JointRecord}
+    links_xyz_dict: dict
+        xyz information of the each link, filled by iter_links
+    """
+    for j, record in joints_dict.items():
+        parent = record.parent
+        child = record.child
+        try:
+            xyz = [round(p-c, 6) for p, c in \
+                zip(links_xyz_dict[parent], links_xyz_dict[child])]  # xyz = parent - child
+        except KeyError:
+            # Robot.make_robot checks the tree, this only happens for hand made joints_dict
+            raise ValueError("There seems to be an error with the connection between\n\n%s\nand\n%s\n\nCheck \
+whether the connections\nparent=component2=%s\nchild=component1=%s\nare correct or if you need \
+to swap component1<=>component2"
+            % (parent, child, parent, child))
+            
+        yield Joint.Joint(name=j, joint_type = record.type, xyz=xyz, \
+        axis=record.axis, parent=parent, child=child, \
+        upper_limit=record.upper_limit, lower_limit=record.lower_limit)
+
+
+def _fragment_key(*values):
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+
+def iter_link_xml(joints_dict, repo, links_xyz_dict, inertial_dict, meshes=None, fragments=None,
+                  mesh_scale=Link.MESH_SCALE_MM, collision_meshes=None, mesh_placements=None):
+    """
+    Yield the xml text of the links, in the order they are written to the urdf
+    
+    
+    Parameters
+    ----------
+    fragments: dict
+        {'link:' + name: [key, xml]} of a previous export. Links whose inputs 
+        did not change reuse their xml, the others are generated and stored.
+    """
+    for link in iter_links(joints_dict, repo, links_xyz_dict, inertial_dict, meshes, mesh_scale, 
+                           collision_meshes, mesh_placements):
+        if fragments is None:
+            link.make_link_xml()
+            yield link.link_xml
+        else:
+            key = _fragment_key(link.name, link.xyz, link.center_of_mass, link.repo,
+                                link.mass, link.inertia_tensor, link.mesh, link.mesh_scale,
+                                link.collision_mesh, link.mesh_placement)
+            cached = fragments.get('link:' + link.name)
+            if cached is None or cached[0] != key:
+                link.make_link_xml()
+                cached = fragments['link:' + link.name] = [key, link.link_xml]
+            yield cached[1]
+        yield '\n'
+
+
+def iter_joint_tran_xml(joints_dict, links_xyz_dict, fragments=None):
+    """
+    Yield the xml text of the joints and transmissions, in the order they are 
+    written to the urdf
+    
+    
+    Parameters
+    ----------
+    fragments: dict
+        {'joint:' + name: [key, xml]} of a previous export, see iter_link_xml
+    """
+    for joint in iter_joints(joints_dict, links_xyz_dict):
+        if fragments is not None:
+            key = _fragment_key(joint.name, joint.type, joint.xyz, joint.axis, joint.parent,
+                                joint.child, joint.upper_limit, joint.lower_limit)
+            cached = fragments.get('joint:' + joint.name)
+            if cached is not None and cached[0] == key:
+                yield cached[1]
+                continue
+        joint.make_joint_xml()
+        xml = joint.joint_xml
+        if joint.type != 'fixed':
+            joint.make_transmission_xml()
+            xml += joint.tran_xml
+        if fragments is not None:
+            fragments['joint:' + joint.name] = [key, xml + '\n']
+        yield xml + '\n'
+
+
+def iter_urdf(joints_dict, links_xyz_dict, inertial_dict, robot_name, repo='meshes/', meshes=None, 
+              fragments=None, mesh_scale=Link.MESH_SCALE_MM, collision_meshes=None, mesh_placements=None):
+    """
+    Yield the whole urdf document piece by piece
+    
+    
+    Parameters
+    ----------
+    joints_dict: dict
+        information of the each joint
+    links_xyz_dict: vacant dict
+        xyz information of the each link
+    inertial_dict:
+        information of the each inertial
+    robot_name: str
+        name of the robot
+    repo: str
+        the name of the repository to save the xml file
+    meshes: dict
+        mesh file name of the each link, name.stl by default
+    fragments: dict
+        xml of the links and joints of a previous export, updated in place
+    mesh_scale: str
+        scale of the meshes, Link.MESH_SCALE_M if they are written in meters
+    collision_meshes: dict
+        collision mesh file name of the links not using their mesh for collision
+    mesh_placements: dict
+        placement of the meshes written in the coordinates of their component
+    
+    Note
+    ----------
+    All links are generated before the joints since the joint origins are 
+    relative to the links_xyz_dict filled by the links.
+    """
+    yield URDF_HEADER.format(robot_name)
+    yield from iter_link_xml(joints_dict, repo, links_xyz_dict, inertial_dict, meshes, fragments,
+                             mesh_scale, collision_meshes, mesh_placements)
+    yield from iter_joint_tran_xml(joints_dict, links_xyz_dict, fragments)
+    yield URDF_ENDTAG
+
 
 def write_link_urdf(joints_dict, repo, links_xyz_dict, file_name, inertial_dict):
     """
@@ -34,30 +242,7 @@ def write_link_urdf(joints_dict, repo, links_xyz_dict, file_name, inertial_dict)
     The origin of the coordinate of center_of_mass is the coordinate of the link
     """
     with open(file_name, mode='a') as f:
-        # for base_link
-        center_of_mass = inertial_dict['base_link']['center_of_mass']
-        link = Link.Link(name='base_link', xyz=[0,0,0], 
-            center_of_mass=center_of_mass, repo=repo,
-            mass=inertial_dict['base_link']['mass'],
-            inertia_tensor=inertial_dict['base_link']['inertia'])
-        links_xyz_dict[link.name] = link.xyz
-        link.make_link_xml()
-        f.write(link.link_xml)
-        f.write('\n')
-
-        # others
-        for joint in joints_dict:
-            name = joints_dict[joint]['child']
-            center_of_mass = \
-                [ i-j for i, j in zip(inertial_dict[name]['center_of_mass'], joints_dict[joint]['xyz'])]
-            link = Link.Link(name=name, xyz=joints_dict[joint]['xyz'],\
-                center_of_mass=center_of_mass,\
-                repo=repo, mass=inertial_dict[name]['mass'],\
-                inertia_tensor=inertial_dict[name]['inertia'])
-            links_xyz_dict[link.name] = link.xyz            
-            link.make_link_xml()
-            f.write(link.link_xml)
-            f.write('\n')
+        f.writelines(iter_link_xml(joints_dict, repo, links_xyz_dict, inertial_dict))
 
 
 def write_joint_tran_urdf(joints_dict, repo, links_xyz_dict, file_name):
@@ -76,63 +261,55 @@ def write_joint_tran_urdf(joints_dict, repo, links_xyz_dict, file_name):
     file_name: str
         urdf full path
     """
-    
     with open(file_name, mode='a') as f:
-        for j in joints_dict:
-            parent = joints_dict[j]['parent']
-            child = joints_dict[j]['child']
-            joint_type = joints_dict[j]['type']
-            upper_limit = joints_dict[j]['upper_limit']
-            lower_limit = joints_dict[j]['lower_limit']
-            try:
-                xyz = [round(p-c, 6) for p, c in \
-                    zip(links_xyz_dict[parent], links_xyz_dict[child])]  # xyz = parent - child
-            except KeyError as ke:
-                app = adsk.core.Application.get()
-                ui = app.userInterface
-                ui.messageBox("There seems to be an error with the connection between\n\n%s\nand\n%s\n\nCheck \
-whether the connections\nparent=component2=%s\nchild=component1=%s\nare correct or if you need \
-to swap component1<=>component2"
-                % (parent, child, parent, child), "Error!")
-                quit()
-                
-            joint = Joint.Joint(name=j, joint_type = joint_type, xyz=xyz, \
-            axis=joints_dict[j]['axis'], parent=parent, child=child, \
-            upper_limit=upper_limit, lower_limit=lower_limit)
-            joint.make_joint_xml()
-            joint.make_transmission_xml()
-            f.write(joint.joint_xml)
-            if joint_type != 'fixed':
-                f.write(joint.tran_xml)
-            f.write('\n')
+        f.writelines(iter_joint_tran_xml(joints_dict, links_xyz_dict))
 
 
-def write_urdf(joints_dict, links_xyz_dict, inertial_dict, package_name, save_dir, robot_name):
+def write_urdf(joints_dict, links_xyz_dict, inertial_dict, package_name, save_dir, robot_name, meshes=None,
+               fragments=None, mesh_scale=Link.MESH_SCALE_MM, collision_meshes=None, mesh_placements=None):
+    """
+    Write the whole urdf "save_dir/robot_name.urdf" in a single pass
+    
+    
+    Note
+    ----------
+    The file is opened once and the document is streamed from iter_urdf, 
+    so no link or joint is kept in memory after it is written.
+    With fragments, only the links and joints that changed are generated again.
+    """
     file_name = save_dir + '/' + robot_name + '.urdf'  # the name of urdf file
     repo = 'meshes/'  # Pybullet only need relative paths
-    with open(file_name, mode='w') as f:
-        f.write('<?xml version="1.0" ?>\n')
-        f.write('<robot name="{}">\n'.format(robot_name))
-        f.write('\n')
-        f.write('<material name="silver">\n')
-        f.write('  <color rgba="0.700 0.700 0.700 1.000"/>\n')
-        f.write('</material>\n')
-        f.write('\n')
+    with open(file_name, mode='w', buffering=URDF_BUFFER_SIZE) as f:
+        f.writelines(iter_urdf(joints_dict, links_xyz_dict, inertial_dict, robot_name, repo, meshes,
+                               fragments, mesh_scale, collision_meshes, mesh_placements))
 
-    write_link_urdf(joints_dict, repo, links_xyz_dict, file_name, inertial_dict)
-    write_joint_tran_urdf(joints_dict, repo, links_xyz_dict, file_name)
-    write_endtag(file_name)
-
-def write_endtag(file_name):
+def write_robot(robot, package_name, save_dir, fragments=None):
     """
-    Write the </robot> tag at the end of the urdf
+    Write the urdf and hello_bullet.py of a Robot into save_dir
+    
+    
     Parameters
     ----------
-    file_name: str
-        urdf full path
+    robot: Robot.Robot
+        robot model filled by Robot.make_robot
+    package_name: str
+    save_dir: str
+        directory path to save
+    fragments: dict
+        xml of the links and joints of a previous export. It is updated in 
+        place and only keeps the links and joints of this robot.
     """
-    with open(file_name, mode='a') as f:
-        f.write('</robot>\n')
+    with profiling.span('write urdf'):
+        write_urdf(robot.joints_dict, {}, robot.inertial_dict, package_name, save_dir, 
+                   robot.name, robot.meshes, fragments, robot.mesh_scale, robot.collision_meshes,
+                   robot.mesh_placements)
+    if fragments is not None:
+        current = set(['link:' + l for l in robot.links] + ['joint:' + j for j in robot.joints_dict])
+        for key in list(fragments):
+            if key not in current:
+                del fragments[key]
+    with profiling.span('write hello_bullet.py'):
+        write_hello_pybullet(robot.name, save_dir)
 
 def write_hello_pybullet(robot_name, save_dir):
     robot_urdf = robot_name + '.urdf' ## basename of robot.urdf
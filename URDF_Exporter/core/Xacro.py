@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+xacro output: the repeated sub-chains of a robot written once as macros.
+
+A sub-chain is a link with the joint to its parent and everything below it.
+Two sub-chains are identical when they differ only by their names and the
+origin of their first joint: same masses, inertias, mesh files and origins,
+joint types, axes and limits, and the same children at the same relative
+origins. Each sub-chain gets an id, computed bottom-up from the values of its
+first link and joint and the ids of its children, so the whole robot is
+compared in one pass. The values are compared to PRECISION, the inertia
+relative to its largest moment, since the centers of mass and inertias of
+identical links differ by round-off once moved to their link frame; a macro
+writes the values of its first sub-chain.
+
+The sub-chains found at least twice become macros. A macro takes the parent
+link, the origin of its first joint and the names of all its links and joints
+(link0, joint0, link1, ...), so the xacro expands to the same links and joints
+as the urdf. Macros call the macros of their own repeated sub-chains, e.g. a
+leg macro calls a toe macro.
+
+The meshes of identical links are only shared with dedup_meshes (see
+utils/mesh_export.py); without it every link has its own mesh file and no
+sub-chain repeats. The joints are never rotated by the exporter, so the
+sub-chains are compared up to a translation.
+"""
+
+import copy
+
+from . import Link, Write
+from ..utils.xml_writer import escape
+
+XACRO_NAMESPACE = 'http://www.ros.org/wiki/xacro'
+XACRO_HEADER = Write.URDF_HEADER.replace('<robot name="{}">',
+                                         '<robot name="{}" xmlns:xacro="' + XACRO_NAMESPACE + '">')
+MACRO_NAME = 'chain_{}'
+PRECISION = 9  # decimals of the compared values, in m, kg and relative inertia
+
+
+def _round(values):
+    return tuple(round(v, PRECISION) for v in values)
+
+
+def _link_key(link):
+    """
+    values of a link compared between the sub-chains
+    """
+    scale = max(abs(i) for i in link.inertia_tensor[:3]) or 1.0
+    placement = link.mesh_placement or [0.0] * 6
+    return (round(link.mass, PRECISION), _round(link.center_of_mass),
+            _round([i / scale for i in link.inertia_tensor]), float('{:.{}g}'.format(scale, PRECISION)),
+            link.mesh, link.collision_mesh, link.mesh_scale, link.collision_mesh_scale,
+            _round([p + x for p, x in zip(placement, link.xyz)]), _round(placement[3:]))
+
+
+def _joint_key(joint):
+    return joint.type, _round(joint.axis), joint.upper_limit, joint.lower_limit
+
+
+def _link_xml(link, name):
+    """
+    xml of link under another name, rendered from a copy: the link is also
+    written into the urdf
+    """
+    link = copy.copy(link)
+    link.name = name
+    link.make_link_xml()
+    return link.link_xml
+
+
+def _joint_xml(joint, name, parent, child, xyz=None):
+    """
+    xml of joint and its transmission under other names, xyz written as is,
+    rendered from a copy like _link_xml
+    """
+    joint = copy.copy(joint)
+    joint.name, joint.parent, joint.child = name, parent, child
+    if xyz is not None:
+        joint.xyz = [xyz]
+    joint.make_joint_xml()
+    xml = joint.joint_xml
+    if joint.type != 'fixed':
+        joint.make_transmission_xml()
+        xml += joint.tran_xml
+    return xml
+
+
+class ChainIndex:
+    def __init__(self, joints_dict, links, joints):
+        """
+        Ids of the sub-chains of a robot
+
+
+        Parameters
+        ----------
+        joints_dict: dict
+            {name: Records.JointRecord} in breadth-first order from base_link
+        links: dict
+            {name: Link.Link} of Write.iter_links
+        joints: dict
+            {name: Joint.Joint} of Write.iter_joints
+
+        Attributes
+        ----------
+        children: dict
+            {link: [joints whose parent is link]}, in the canonical order of
+            the sub-chains: by origin, then by id
+        chain: dict
+            {link: id of the sub-chain starting at link}
+        count: dict
+            {id: number of sub-chains with this id}
+        size: dict
+            {id: links of the sub-chain}
+        """
+        self.links = links
+        self.joints = joints
+        self.joint_of = {record.child: name for name, record in joints_dict.items()}
+        self.children = {}
+        for name, record in joints_dict.items():
+            self.children.setdefault(record.parent, []).append(name)
+        self.chain = {}
+        self.count = {}
+        self.size = {}
+        ids = {}
+        # children before their parents
+        for name in reversed(list(joints_dict)):
+            child = joints_dict[name].child
+            self.children[child] = sorted(self.children.get(child, []), key=self._below)
+            below = [self._below(j) for j in self.children[child]]
+            key = (_link_key(links[child]), _joint_key(joints[name]), tuple(below))
+            chain = ids.setdefault(key, len(ids))
+            self.chain[child] = chain
+            self.count[chain] = self.count.get(chain, 0) + 1
+            self.size[chain] = 1 + sum(self.size[c] for _, c in below)
+
+    def _below(self, joint):
+        # a child sub-chain: the origin of its joint and its id
+        return tuple(self.joints[joint].xyz), self.chain[self.joints[joint].child]
+
+    def repeated(self, link):
+        return self.count[self.chain[link]] > 1
+
+    def walk(self, link):
+        """
+        links of the sub-chain starting at link, in the canonical order
+        """
+        order = [link]
+        for link in order:
+            order.extend(self.joints[j].child for j in self.children.get(link, []))
+        return order
+
+
+def _call(macro, parent, xyz, names):
+    """
+    xml of a macro call, names are the (link, joint) of each link of the sub-chain
+    """
+    params = ['parent="{}"'.format(escape(parent)), 'xyz="{}"'.format(escape(xyz))]
+    for i, (link, joint) in enumerate(names):
+        params.append('link{0}="{1}" joint{0}="{2}"'.format(i, escape(link), escape(joint)))
+    return '<xacro:{} {}/>\n'.format(macro, ' '.join(params))
+
+
+def _xyz(joint):
+    return ' '.join([str(_) for _ in joint.xyz])
+
+
+def iter_chain_xml(index, macros, link, parent, xyz, names, inline=False):
+    """
+    Yield the xml of the sub-chain starting at link: a macro call if it is
+    repeated, its links and joints otherwise
+
+
+    Parameters
+    ----------
+    index: ChainIndex
+    macros: dict
+        {chain id: macro name}
+    link: str
+        first link of the sub-chain
+    parent, xyz: str
+        parent link and origin of the first joint, as written
+    names: dict
+        {link: (link name, joint name)} as written, e.g. '${link3}' in a macro
+    inline: bool
+        write the links and joints even if the sub-chain is repeated, for the
+        body of its own macro
+    """
+    stack = [(link, parent, xyz, inline)]  # no recursion, chains can be 100k links long
+    while stack:
+        link, parent, xyz, inline = stack.pop()
+        if not inline and index.repeated(link):
+            yield _call(macros[index.chain[link]], parent, xyz, [names[l] for l in index.walk(link)])
+            continue
+        name, joint = names[link]
+        yield _link_xml(index.links[link], name) + '\n'
+        yield _joint_xml(index.joints[index.joint_of[link]], joint, parent, name, xyz) + '\n'
+        stack.extend((index.joints[j].child, name, _xyz(index.joints[j]), False)
+                     for j in reversed(index.children.get(link, [])))
+
+
+def iter_macro_xml(index, macros, link):
+    """
+    Yield the definition of the macro of the sub-chain starting at link
+    """
+    chain = index.walk(link)
+    params = ' '.join('link{0} joint{0}'.format(i) for i in range(len(chain)))
+    names = {l: ('${{link{}}}'.format(i), '${{joint{}}}'.format(i)) for i, l in enumerate(chain)}
+    yield '<xacro:macro name="{}" params="parent xyz {}">\n'.format(macros[index.chain[link]], params)
+    yield from iter_chain_xml(index, macros, link, '${parent}', '${xyz}', names, inline=True)
+    yield '</xacro:macro>\n\n'
+
+
+def iter_xacro(joints_dict, inertial_dict, robot_name, repo='meshes/', meshes=None,
+               mesh_scale=Link.MESH_SCALE_MM, collision_meshes=None, mesh_placements=None):
+    """
+    Yield the whole xacro document piece by piece, see Write.iter_urdf for
+    the parameters. joints_dict is in breadth-first order from base_link.
+    """
+    links_xyz_dict = {}
+    links = {link.name: link for link in Write.iter_links(
+        joints_dict, repo, links_xyz_dict, inertial_dict, meshes, mesh_scale, collision_meshes,
+        mesh_placements)}
+    joints = {joint.name: joint for joint in Write.iter_joints(joints_dict, links_xyz_dict)}
+    index = ChainIndex(joints_dict, links, joints)
+
+    # one macro per repeated sub-chain, the smaller ones first since the
+    # larger ones call them
+    first = {}
+    for record in joints_dict.values():
+        if index.repeated(record.child):
+            first.setdefault(index.chain[record.child], record.child)
+    order = sorted(first, key=lambda chain: (index.size[chain], chain))
+    macros = {chain: MACRO_NAME.format(i) for i, chain in enumerate(order)}
+
+    yield XACRO_HEADER.format(robot_name)
+    for chain in order:
+        yield from iter_macro_xml(index, macros, first[chain])
+    names = {name: (name, index.joint_of.get(name)) for name in links}
+    yield _link_xml(links['base_link'], 'base_link') + '\n'
+    for j in index.children.get('base_link', []):
+        child = joints[j].child
+        yield from iter_chain_xml(index, macros, child, 'base_link', _xyz(joints[j]), names)
+    yield Write.URDF_ENDTAG
+
+
+def write_xacro(robot, save_dir):
+    """
+    Write "save_dir/robot_name.urdf.xacro" of a Robot, next to its urdf
+    """
+    file_name = save_dir + '/' + robot.name + '.urdf.xacro'
+    with open(file_name, mode='w', buffering=Write.URDF_BUFFER_SIZE) as f:
+        f.writelines(iter_xacro(robot.joints_dict, robot.inertial_dict, robot.name, 'meshes/',
+                                robot.meshes, robot.mesh_scale, robot.collision_meshes,
+                                robot.mesh_placements))
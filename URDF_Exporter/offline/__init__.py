@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Headless export without Fusion 360.
+
+A recorded design (JSON) is replayed through the pure-Python adsk stand-in in
+offline/adsk, so the same exporter code runs on Linux, in CI and in batch jobs:
+
+    python -m URDF_Exporter.offline design.json output_dir
+
+or from Python:
+
+    from URDF_Exporter import offline
+    offline.activate()
+    design = offline.load_design('design.json')
+
+Many designs are exported in one process from a job file (utils/batch.py):
+
+    python -m URDF_Exporter.offline --jobs jobs.json
+
+Synthetic designs of any size, for scaling tests, come from offline/synthetic.py.
+
+Recorded design format
+----------
+Snapshots written by core/Snapshot.py inside Fusion use this format.
+
+{
+  "format": "fusion2urdf-snapshot", "version": 1,
+  "rootComponent": {"name": str},
+  "occurrences": [{"name", "component", "bodyCount", "transform": [16],
+                   "bodies": [{"volume", "area", "material",
+                               "mesh": {"nodeCoordinates": [x, y, z, ...],
+                                        "nodeIndices": [i, j, k, ...]}}] (optional),
+                   "boundingBox": [[x, y, z], [x, y, z]],
+                   "physicalProperties": {"mass", "volume", "area",
+                       "centerOfMass": [x, y, z],
+                       "xyzMomentsOfInertia": [xx, yy, zz, xy, yz, xz],
+                       "accuracy": "low" to "very-high" (optional)},
+                   "mesh": mesh file relative to the json, stl or a format of
+                           utils/mesh_formats.py (optional),
+                   "scale": units of the mesh file per cm, 10 (mm) if missing, 
+                            glb files are in meters,
+                   "refinement", "quantize": of the mesh (snapshots only),
+                   "revisionId": of the component (optional),
+                   "fingerprint": str (snapshots only)}],
+  "joints": [{"name", "jointType", "occurrenceOne", "occurrenceTwo",
+              "geometryOrOriginOne": {"origin": [x, y, z]} or {"jointOrigin": [x, y, z]},
+              "geometryOrOriginTwo": same as above,
+              "rotationAxisVector", "rotationLimits", "slideDirectionVector", "slideLimits",
+              "fingerprint": str (snapshots only)}]
+}
+Values are in Fusion internal units (cm, kg, kg*cm^2), limits hold
+isMaximumValueEnabled, isMinimumValueEnabled, maximumValue and minimumValue.
+
+Snapshots are flat: the occurrences of sub-assemblies are recorded as links
+named by their full path ("module:1+finger:1") and placed in the root 
+component. Designs written by hand may instead nest them: an occurrence can
+hold "childOccurrences" (same fields, transform relative to the parent, the
+rest in root coordinates) and "joints" (the joints of its component, between
+the names of its child occurrences).
+"""
+
+import os, sys, json, shutil
+
+STANDIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def activate():
+    """
+    Make `import adsk` resolve to the stand-in. Never call this inside Fusion.
+    """
+    if 'adsk' in sys.modules:
+        return
+    if STANDIN_DIR not in sys.path:
+        sys.path.insert(0, STANDIN_DIR)
+    import adsk, adsk.core, adsk.fusion
+
+
+def load_design(path):
+    """
+    Build the stand-in design recorded in the json file `path` and make it the
+    active product of adsk.core.Application.get()
+
+
+    Returns
+    ----------
+    design: adsk.fusion.Design
+    """
+    activate()
+    import adsk.core, adsk.fusion
+    with open(path) as f:
+        data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for occ in data.get('occurrences', []):
+        if occ.get('mesh'):
+            occ['mesh'] = os.path.join(base_dir, occ['mesh'])
+    from ..core import Snapshot
+    Snapshot.check_version(data)
+    design = adsk.fusion.Design(data)
+    adsk.core.Application.get().activeProduct = design
+    return design
+
+
+def copy_mesh(source, file_name, source_scale=10.0, scale=10.0, quantize=False):
+    """
+    Write the mesh file recorded with a design as file_name: copied, or
+    converted to the format of its name or to another unit
+
+
+    Parameters
+    ----------
+    source: str
+        recorded mesh file
+    file_name: str
+        stl or a format of utils/mesh_formats.py
+    source_scale, scale: float
+        units per cm of source and of file_name, 10 for mm, 0.01 for meters
+    quantize: bool
+        16-bit positions in a glb file
+    """
+    from ..utils import mesh_formats
+    if source_scale != scale or \
+            mesh_formats.split_extension(source)[1] != mesh_formats.split_extension(file_name)[1]:
+        coordinates, indices = mesh_formats.read_mesh(source)
+        mesh_formats.write_mesh(file_name, coordinates, indices, scale / source_scale, quantize)
+    elif not (os.path.isfile(file_name) and os.path.samefile(source, file_name)):
+        shutil.copyfile(source, file_name)
+
+
+def export(path, output_dir, package_name='fusion2urdf', meters=False, visual_triangles=None,
+           collision_hull=False, profile=False, dedup=False, xacro=False, mesh_format='stl', compress=False,
+           quantize=False, link_meshes=None, options=None):
+    """
+    Generate the urdf, hello_bullet.py and meshes of a recorded design into
+    "output_dir/robot_name" through URDF_Exporter.export_design, like the 
+    Fusion script does. The arguments set the options of JOB_OPTIONS, 
+    options any other of URDF_Exporter.OPTIONS but FUSION_OPTIONS.
+    The recorded mesh files are copied, or converted by copy_mesh, the 
+    recorded tessellations are exported like Fusion bodies; with dedup 
+    only these are shared, the mesh files are in root coordinates.
+
+
+    Returns
+    ----------
+    save_dir: str or None on failure
+    msg: str
+        Tell the status
+    """
+    activate()
+    from .. import URDF_Exporter as exporter
+    from ..utils import mesh_export, mesh_formats
+    options = dict(options or {})
+    clash = set(options) & (set(JOB_OPTIONS) | set(FUSION_OPTIONS))
+    if clash:
+        raise ValueError('options set by an argument or without effect offline: ' + ', '.join(sorted(clash)))
+    options.update(package_name=package_name, meshes_in_meters=meters, visual_triangles=visual_triangles,
+                   collision_hull=collision_hull, profile=profile, dedup_meshes=dedup, xacro=xacro,
+                   mesh_format=mesh_format, compress_meshes=compress, quantize_meshes=quantize,
+                   link_meshes=link_meshes)
+    missing = []
+
+    def write_mesh(name, occ, file_name, options):
+        if occ.mesh and os.path.isfile(occ.mesh):
+            # the formats in meters are always in meters, recorded ones too
+            scale = mesh_export.CM_TO_M if options['meshes_in_meters'] or mesh_formats.in_meters(file_name) \
+                else mesh_export.CM_TO_MM
+            source_scale = mesh_export.CM_TO_M if mesh_formats.in_meters(occ.mesh) else occ.meshScale
+            copy_mesh(occ.mesh, file_name, source_scale, scale, options['quantize_meshes'])
+            return True
+        if any(body.meshManager.createMeshCalculator().calculate().triangleCount
+               for body in occ.bRepBodies):
+            return False
+        missing.append(name)
+        return True
+
+    save_dir, msg = exporter.export_design(load_design(path), output_dir, options, write_mesh=write_mesh)
+    if missing:
+        msg += '\nNo recorded mesh for: ' + ', '.join(missing)
+    return save_dir, msg
+
+
+# options of a job (URDF_Exporter.OPTIONS) and the argument of export they set
+JOB_OPTIONS = {'package_name': 'package_name', 'meshes_in_meters': 'meters',
+               'visual_triangles': 'visual_triangles', 'collision_hull': 'collision_hull',
+               'profile': 'profile', 'dedup_meshes': 'dedup', 'xacro': 'xacro',
+               'mesh_format': 'mesh_format', 'compress_meshes': 'compress', 
+               'quantize_meshes': 'quantize', 'link_meshes': 'link_meshes'}
+# options of the Fusion export with no effect on a recorded design
+FUSION_OPTIONS = ('copy_bodies',)
+
+
+def export_jobs(job_file, log_file=None):
+    """
+    Export the recorded designs of a job file in turn, see utils/batch.py.
+    The log and the summary are written next to the job file.
+
+
+    Returns
+    ----------
+    summary: dict
+        see utils.batch.run_jobs
+    """
+    from ..utils import batch
+    base = os.path.splitext(job_file)[0]
+    log = batch.Log(log_file or base + '_' + batch.LOG_FILE)
+
+    def export_job(job):
+        kwargs = {JOB_OPTIONS[key]: value for key, value in job['options'].items() 
+                  if key in JOB_OPTIONS}
+        options = {key: value for key, value in job['options'].items()
+                   if key not in JOB_OPTIONS and key not in FUSION_OPTIONS}
+        return export(job['design'], job['output_dir'], options=options, **kwargs)
+
+    try:
+        summary = batch.run_jobs(batch.read_jobs(job_file), export_job, log)
+    finally:
+        log.close()
+    batch.write_summary(summary, base + '_' + batch.SUMMARY_FILE)
+    return summary
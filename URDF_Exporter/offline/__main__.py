@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+python -m URDF_Exporter.offline design.json output_dir [--package-name NAME] [--meters]
+    [--visual-triangles N] [--collision-hull] [--profile] [--dedup-meshes] [--xacro]
+    [--mesh-format stl|glb|dae] [--compress-meshes] [--quantize-meshes]
+python -m URDF_Exporter.offline --jobs jobs.json
+"""
+
+import argparse, sys
+from . import export, export_jobs
+from ..utils.mesh_formats import FORMATS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m URDF_Exporter.offline',
+                                     description='Generate URDF from a recorded Fusion 360 design')
+    parser.add_argument('design', nargs='?', help='recorded design (json)')
+    parser.add_argument('output_dir', nargs='?', help='the urdf is written into output_dir/robot_name')
+    parser.add_argument('--jobs', metavar='JOB_FILE',
+                        help='export the designs of a job file instead, see utils/batch.py')
+    parser.add_argument('--package-name', default='fusion2urdf')
+    parser.add_argument('--meters', action='store_true', 
+                        help='write the meshes in meters, the urdf then has no mesh scale')
+    parser.add_argument('--visual-triangles', type=int, default=None,
+                        help='decimate the visual meshes to this triangle budget')
+    parser.add_argument('--collision-hull', action='store_true',
+                        help='use the convex hull of each mesh for collision')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the timing of each stage next to the urdf')
+    parser.add_argument('--dedup-meshes', action='store_true',
+                        help='write the tessellated meshes of a component once, shared by its links')
+    parser.add_argument('--xacro', action='store_true',
+                        help='also write a xacro with the repeated sub-chains as macros')
+    parser.add_argument('--mesh-format', choices=FORMATS, default='stl',
+                        help='file format of the meshes')
+    parser.add_argument('--compress-meshes', action='store_true',
+                        help='gzip the mesh files, e.g. name.stl.gz')
+    parser.add_argument('--quantize-meshes', action='store_true',
+                        help='16-bit positions in the glb files')
+    args = parser.parse_args(argv)
+    if args.jobs is not None:
+        summary = export_jobs(args.jobs)
+        return 1 if summary['failed'] else 0
+    if args.design is None or args.output_dir is None:
+        parser.error('design and output_dir are required without --jobs')
+
+    save_dir, msg = export(args.design, args.output_dir, args.package_name, args.meters,
+                           args.visual_triangles, args.collision_hull, args.profile, args.dedup_meshes,
+                           args.xacro, args.mesh_format, args.compress_meshes, args.quantize_meshes)
+    print(msg)
+    if save_dir is None:
+        return 1
+    print(save_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
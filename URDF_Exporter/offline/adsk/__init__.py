@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Pure-Python stand-in for the Fusion 360 ``adsk`` package.
+
+It replays a recorded design so the exporter can run without Fusion 360.
+Only put this directory on sys.path outside of Fusion (see offline.activate).
+"""
+
+from . import core, fusion
+
+
+def doEvents():
+    """
+    Handle the custom events fired so far, like Fusion does on its main thread
+    """
+    app = core.Application.get()
+    queue, app._queue = app._queue, []
+    for event_id, info in queue:
+        event = app._events.get(event_id)
+        for handler in list(event.handlers if event else []):
+            handler.notify(core.CustomEventArgs(info))
+
+
+def autoTerminate(value):
+    pass
+
+
+def terminate():
+    pass
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the parts of adsk.core used by the exporter.
+"""
+
+
+class Base:
+    pass
+
+
+class Point3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+
+class Vector3D(Point3D):
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+
+class Matrix3D(Base):
+    def __init__(self, data=None):
+        if data is None:
+            data = [1.0, 0.0, 0.0, 0.0,
+                    0.0, 1.0, 0.0, 0.0,
+                    0.0, 0.0, 1.0, 0.0,
+                    0.0, 0.0, 0.0, 1.0]
+        self._data = [float(_) for _ in data]
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    def asArray(self):
+        return tuple(self._data)
+
+    def setWithArray(self, data):
+        self._data = [float(_) for _ in data]
+        return True
+
+    @property
+    def translation(self):
+        d = self._data
+        return Vector3D(d[3], d[7], d[11])
+
+    def transformBy(self, matrix):
+        """
+        self = matrix * self, as in the Fusion API
+        """
+        a = matrix.asArray()
+        b = self._data
+        self._data = [sum(a[4*r + k] * b[4*k + c] for k in range(4))
+                      for r in range(4) for c in range(4)]
+        return True
+
+    def invert(self):
+        """
+        Invert in place, False if the matrix is singular
+        """
+        a = [self._data[4*r:4*r + 4] + [1.0 if r == c else 0.0 for c in range(4)] for r in range(4)]
+        for c in range(4):
+            pivot = max(range(c, 4), key=lambda r: abs(a[r][c]))
+            if abs(a[pivot][c]) < 1e-12:
+                return False
+            a[c], a[pivot] = a[pivot], a[c]
+            a[c] = [v / a[c][c] for v in a[c]]
+            for r in range(4):
+                if r != c and a[r][c] != 0.0:
+                    a[r] = [v - a[r][c] * w for v, w in zip(a[r], a[c])]
+        self._data = [v for row in a for v in row[4:]]
+        return True
+
+    def copy(self):
+        return Matrix3D(self._data)
+
+
+class BoundingBox3D(Base):
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+
+class DialogResults:
+    DialogError = -1
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+
+
+class UserInterface(Base):
+    """
+    Headless user interface: message boxes are printed, dialogs are cancelled
+    """
+    def messageBox(self, text, title='', *args):
+        print('[{}] {}'.format(title, text) if title else text)
+        return DialogResults.DialogOK
+
+    def createFolderDialog(self):
+        return _Dialog()
+
+    def createFileDialog(self):
+        return _Dialog()
+
+    def createProgressDialog(self):
+        return ProgressDialog()
+
+
+class ProgressDialog(Base):
+    """
+    Headless progress dialog, never cancelled unless wasCancelled is set
+    """
+    def __init__(self):
+        self.isCancelButtonShown = False
+        self.isShowing = False
+        self.wasCancelled = False
+        self.title = ''
+        self.message = ''
+        self.minimumValue = 0
+        self.maximumValue = 100
+        self.progressValue = 0
+
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.title, self.message = title, message
+        self.minimumValue, self.maximumValue = minimumValue, maximumValue
+        self.isShowing = True
+        return True
+
+    def hide(self):
+        self.isShowing = False
+        return True
+
+
+class CustomEventHandler(Base):
+    def notify(self, args):
+        pass
+
+
+class CustomEventArgs(Base):
+    def __init__(self, additionalInfo=''):
+        self.additionalInfo = additionalInfo
+
+
+class CustomEvent(Base):
+    def __init__(self, eventId):
+        self.eventId = eventId
+        self.handlers = []
+
+    def add(self, handler):
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler):
+        self.handlers.remove(handler)
+        return True
+
+
+class _Dialog(Base):
+    def __init__(self):
+        self.title = ''
+        self.folder = ''
+        self.filename = ''
+        self.filter = ''
+
+    def showDialog(self):
+        return DialogResults.DialogCancel
+
+    def showOpen(self):
+        return DialogResults.DialogCancel
+
+    def showSave(self):
+        return DialogResults.DialogCancel
+
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeProduct = None
+        self._events = {}
+        self._queue = []  # fired custom events, handled by adsk.doEvents
+
+    def registerCustomEvent(self, eventId):
+        return self._events.setdefault(eventId, CustomEvent(eventId))
+
+    def unregisterCustomEvent(self, eventId):
+        return self._events.pop(eventId, None) is not None
+
+    def fireCustomEvent(self, eventId, additionalInfo=''):
+        # like Fusion, from any thread, the handlers run later on the main thread
+        self._queue.append((eventId, additionalInfo))
+        return True
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the parts of adsk.fusion used by the exporter.
+
+The objects are built from a recorded design (see offline.load_design) and
+only answer the queries the exporter makes.
+"""
+
+from . import core
+
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+
+class MeshRefinementSettings:
+    MeshRefinementHigh = 0
+    MeshRefinementMedium = 1
+    MeshRefinementLow = 2
+    MeshRefinementCustom = 3
+
+
+class TriangleMeshQualityOptions:
+    LowQualityTriangleMesh = 8
+    NormalQualityTriangleMesh = 11
+    HighQualityTriangleMesh = 13
+    VeryHighQualityTriangleMesh = 15
+
+
+class JointTypes:
+    RigidJointType = 0
+    RevoluteJointType = 1
+    SliderJointType = 2
+    CylindricalJointType = 3
+    PinSlotJointType = 4
+    PlanarJointType = 5
+    BallJointType = 6
+
+
+class _Collection(core.Base):
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def itemByName(self, name):
+        for i in self._items:
+            if i.name == name:
+                return i
+        return None
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PhysicalProperties(core.Base):
+    def __init__(self, data):
+        self.mass = data.get('mass', 0.0)
+        self.volume = data.get('volume', 0.0)
+        self.area = data.get('area', 0.0)
+        self.density = data.get('density', 0.0)
+        self.centerOfMass = core.Point3D(*data.get('centerOfMass', [0.0, 0.0, 0.0]))
+        self._moments = list(data.get('xyzMomentsOfInertia', [0.0] * 6))
+
+    def getXYZMomentsOfInertia(self):
+        return tuple([True] + self._moments)
+
+
+class Material(core.Base):
+    def __init__(self, name):
+        self.name = name
+
+
+class TriangleMesh(core.Base):
+    def __init__(self, data):
+        self.nodeCoordinatesAsDouble = list(data.get('nodeCoordinates', []))
+        self.nodeIndices = list(data.get('nodeIndices', []))
+        self.nodeCount = len(self.nodeCoordinatesAsDouble) // 3
+        self.triangleCount = len(self.nodeIndices) // 3
+
+
+class TriangleMeshCalculator(core.Base):
+    def __init__(self, data):
+        self._data = data
+        self.surfaceTolerance = 0.0
+
+    def setQuality(self, quality):
+        return True
+
+    def calculate(self):
+        return TriangleMesh(self._data)
+
+
+class MeshManager(core.Base):
+    def __init__(self, data):
+        self._data = data
+
+    def createMeshCalculator(self):
+        return TriangleMeshCalculator(self._data)
+
+
+class BRepBody(core.Base):
+    def __init__(self, name, parentComponent, data=None, assemblyContext=None):
+        data = data or {}
+        self.name = name
+        self.parentComponent = parentComponent
+        self.assemblyContext = assemblyContext
+        self.volume = data.get('volume', 0.0)
+        self.area = data.get('area', 0.0)
+        self.material = Material(data['material']) if data.get('material') else None
+        self.meshManager = MeshManager(data.get('mesh', {}))
+        self._data = data
+        self._native = None
+
+    @property
+    def nativeObject(self):
+        """
+        The body in the coordinates of its component, None if the body is not
+        a proxy. Recorded meshes are in the coordinates of the root component.
+        """
+        if self.assemblyContext is None:
+            return None
+        if self._native is None:
+            inverse = self.assemblyContext.transform.copy()
+            inverse.invert()
+            m = inverse.asArray()
+            data = dict(self._data)
+            mesh = data.get('mesh')
+            if mesh:
+                c = mesh.get('nodeCoordinates', [])
+                local = []
+                for k in range(0, len(c), 3):
+                    x, y, z = c[k], c[k + 1], c[k + 2]
+                    local += [m[0]*x + m[1]*y + m[2]*z + m[3],
+                              m[4]*x + m[5]*y + m[6]*z + m[7],
+                              m[8]*x + m[9]*y + m[10]*z + m[11]]
+                data['mesh'] = dict(mesh, nodeCoordinates=local)
+            self._native = BRepBody(self.name, self.parentComponent, data)
+        return self._native
+
+
+class Component(core.Base):
+    def __init__(self, name):
+        self.name = name
+        self.bRepBodies = _Collection()
+        self.occurrences = _Collection()
+        self.allOccurrences = _Collection()
+        self.joints = _Collection()
+
+
+class Occurrence(core.Base):
+    def __init__(self, data, component, parent=None, components=None):
+        """
+        Occurrences of the root component, or proxies of the occurrences of a
+        sub-assembly when parent is given. Recorded child occurrences have 
+        their transform relative to their parent, proxies are placed in the
+        root component and nativeObject holds the relative transform.
+        """
+        self.name = data['name']
+        self.fullPathName = self.name if parent is None else parent.fullPathName + '+' + self.name
+        self.component = component
+        self.transform = core.Matrix3D(data.get('transform'))
+        self.nativeObject = None
+        if parent is not None:
+            self.nativeObject = Occurrence(dict(data, childOccurrences=[]), component)
+            self.transform.transformBy(parent.transform)
+        self._physical = data.get('physicalProperties', {})
+        bodies = data.get('bodies')
+        if bodies is None:
+            count = data.get('bodyCount', 1)
+            bodies = [{'volume': self._physical.get('volume', 0.0) / count,
+                       'area': self._physical.get('area', 0.0) / count}] * count
+        self.bRepBodies = _Collection(
+            [BRepBody('Body{}'.format(i + 1), component, body, self) for i, body in enumerate(bodies)])
+        box = data.get('boundingBox', [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+        self.boundingBox = core.BoundingBox3D(core.Point3D(*box[0]), core.Point3D(*box[1]))
+        self.childOccurrences = _Collection()
+        for child in data.get('childOccurrences', []):
+            name = child.get('component', child['name'])
+            if name not in components:
+                components[name] = Component(name)
+            self.childOccurrences._items.append(Occurrence(child, components[name], self, components))
+        if data.get('joints') and not component.joints.count:
+            # joints of the component, between its child occurrences
+            component.joints = _Collection([Joint(j, {}) for j in data['joints']])
+        self.mesh = data.get('mesh')  # recorded stl, only known to the stand-in
+        self.meshScale = data.get('scale', 10.0)  # units of the recorded mesh per cm, mm by default
+        if 'revisionId' in data:
+            component.revisionId = data['revisionId']
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        return PhysicalProperties(self._physical)
+
+
+class JointLimits(core.Base):
+    def __init__(self, data):
+        data = data or {}
+        self.isMaximumValueEnabled = data.get('isMaximumValueEnabled', False)
+        self.isMinimumValueEnabled = data.get('isMinimumValueEnabled', False)
+        self.maximumValue = data.get('maximumValue', 0.0)
+        self.minimumValue = data.get('minimumValue', 0.0)
+
+
+class JointMotion(core.Base):
+    def __init__(self, data):
+        self.jointType = data.get('jointType', JointTypes.RigidJointType)
+        if 'rotationAxisVector' in data:
+            self.rotationAxisVector = core.Vector3D(*data['rotationAxisVector'])
+            self.rotationLimits = JointLimits(data.get('rotationLimits'))
+        if 'slideDirectionVector' in data:
+            self.slideDirectionVector = core.Vector3D(*data['slideDirectionVector'])
+            self.slideLimits = JointLimits(data.get('slideLimits'))
+
+
+class JointGeometry(core.Base):
+    def __init__(self, origin):
+        self.origin = core.Point3D(*origin)
+
+
+class JointOrigin(core.Base):
+    def __init__(self, origin):
+        self.geometry = JointGeometry(origin)
+
+
+def _joint_geometry(data):
+    if not data:
+        return None
+    if 'jointOrigin' in data:
+        return JointOrigin(data['jointOrigin'])
+    return JointGeometry(data['origin'])
+
+
+class Joint(core.Base):
+    def __init__(self, data, occurrences):
+        self._data = data
+        self.name = data['name']
+        self.jointMotion = JointMotion(data)
+        self.occurrenceOne = occurrences.get(data.get('occurrenceOne'))
+        self.occurrenceTwo = occurrences.get(data.get('occurrenceTwo'))
+        self.geometryOrOriginOne = _joint_geometry(data.get('geometryOrOriginOne'))
+        self.geometryOrOriginTwo = _joint_geometry(data.get('geometryOrOriginTwo'))
+
+    def createForAssemblyContext(self, occurrence):
+        """
+        The joint of a sub-assembly component between the child occurrences
+        of occurrence
+        """
+        return Joint(self._data, {child.name: child for child in occurrence.childOccurrences})
+
+
+class ExportManager(core.Base):
+    pass
+
+
+class Design(core.Base):
+    def __init__(self, data):
+        self.rootComponent = Component(data.get('rootComponent', {}).get('name', 'robot'))
+        components = {}
+        occurrences = {}
+        for occ_data in data.get('occurrences', []):
+            comp_name = occ_data.get('component', occ_data['name'])
+            if comp_name not in components:
+                components[comp_name] = Component(comp_name)
+            occ = Occurrence(occ_data, components[comp_name], components=components)
+            self.rootComponent.occurrences._items.append(occ)
+            stack = [occ]
+            while stack:
+                occ = stack.pop()
+                occurrences[occ.fullPathName] = occ
+                self.rootComponent.allOccurrences._items.append(occ)
+                stack.extend(occ.childOccurrences)
+        self.rootComponent.joints = _Collection(
+            [Joint(j, occurrences) for j in data.get('joints', [])])
+        self.allComponents = _Collection([self.rootComponent] + list(components.values()))
+        self.exportManager = ExportManager()
+
+    @staticmethod
+    def cast(obj):
+        return obj if isinstance(obj, Design) else None
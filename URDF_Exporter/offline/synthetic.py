@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic recorded designs of any size, for scaling tests without a CAD model.
+
+synthetic_design builds a design in the recorded format of offline/__init__.py
+with n_links occurrences joined by every joint type the exporter supports, in
+turn: revolute with limits, continuous (revolute without limits), prismatic
+(slider) with limits and fixed (rigid). The links are occurrences of a few
+components with physically valid properties, the same for every occurrence
+of a component but for their placement. The topology is
+
+- 'chain': each link hangs from the previous one
+- 'tree': a complete tree, each link has `branching` children
+- 'fan': every link hangs from base_link
+
+The same arguments always give the same design:
+
+    from URDF_Exporter import offline
+    from URDF_Exporter.offline import synthetic
+    offline.activate()
+    design = synthetic.make_design(synthetic.synthetic_design(10000, 'tree'))
+"""
+
+import math, random
+
+TOPOLOGIES = ('chain', 'tree', 'fan')
+COMPONENTS = 4  # distinct link components
+SPACING = 10.0  # cm between a link and its parent
+_GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+
+def parents(n_links, topology='chain', branching=2):
+    """
+    index of the parent of each link, None for base_link (index 0)
+    """
+    if topology == 'chain':
+        return [None] + list(range(n_links - 1))
+    elif topology == 'tree':
+        return [None] + [(i - 1) // branching for i in range(1, n_links)]
+    elif topology == 'fan':
+        return [None] + [0] * (n_links - 1)
+    raise ValueError('unknown topology {}, one of {}'.format(topology, ', '.join(TOPOLOGIES)))
+
+
+def sphere(n_triangles, radius, center=(0.0, 0.0, 0.0)):
+    """
+    flat node coordinates and indices of a uv sphere with about n_triangles
+    """
+    rings = max(2, int(math.sqrt(n_triangles / 2)))
+    segments = max(3, n_triangles // (2 * rings))
+    cx, cy, cz = center
+    coordinates = []
+    for r in range(rings + 1):
+        theta = math.pi * r / rings
+        for s in range(segments):
+            phi = 2 * math.pi * s / segments
+            coordinates += [cx + radius * math.sin(theta) * math.cos(phi),
+                            cy + radius * math.sin(theta) * math.sin(phi), cz + radius * math.cos(theta)]
+    indices = []
+    for r in range(rings):
+        for s in range(segments):
+            a, b = r * segments + s, r * segments + (s + 1) % segments
+            indices += [a, b, a + segments, b, b + segments, a + segments]
+    return coordinates, indices
+
+
+def _moments(mass, size, center):
+    """
+    moments of inertia of a box about the origin of the root component
+    (kg*cm^2), like Fusion reports them
+    """
+    w, h, d = size
+    x, y, z = center
+    return [mass * ((h * h + d * d) / 12 + y * y + z * z), mass * ((w * w + d * d) / 12 + x * x + z * z),
+            mass * ((w * w + h * h) / 12 + x * x + y * y), -mass * x * y, -mass * y * z, -mass * x * z]
+
+
+def _joint(i, child, parent, origin):
+    """
+    joint of link i, its type and the way its origin is given change with i
+    """
+    joint = {'name': 'joint {}'.format(i), 'occurrenceOne': child, 'occurrenceTwo': parent}
+    if i % 2:
+        joint.update(geometryOrOriginOne={'origin': origin}, geometryOrOriginTwo=None)
+    else:
+        joint.update(geometryOrOriginOne=None, geometryOrOriginTwo={'jointOrigin': origin})
+    limits = {'isMaximumValueEnabled': True, 'isMinimumValueEnabled': True,
+              'maximumValue': 1.57, 'minimumValue': -1.57}
+    kind = i % 4
+    if kind == 1:  # revolute
+        joint.update(jointType=1, rotationAxisVector=[0, 0, 1], rotationLimits=limits)
+    elif kind == 2:  # continuous
+        joint.update(jointType=1, rotationAxisVector=[1, 0, 0],
+                     rotationLimits=dict(limits, isMaximumValueEnabled=False, isMinimumValueEnabled=False))
+    elif kind == 3:  # prismatic
+        joint.update(jointType=2, slideDirectionVector=[0, 1, 0],
+                     slideLimits=dict(limits, maximumValue=5.0, minimumValue=-5.0))
+    else:  # fixed
+        joint.update(jointType=0)
+    return joint
+
+
+def synthetic_design(n_links, topology='chain', branching=2, n_components=COMPONENTS, n_triangles=0,
+                     seed=0):
+    """
+    Recorded design of a synthetic robot
+
+
+    Parameters
+    ----------
+    n_links: int
+        links including base_link, n_links - 1 joints
+    topology: str
+        one of TOPOLOGIES
+    branching: int
+        children of each link of a 'tree'
+    n_components: int
+        distinct components the links are occurrences of
+    n_triangles: int
+        triangles of the tessellated body of each link, 0 for no body mesh
+    seed: int
+        of the masses and sizes
+
+    Returns
+    ----------
+    design: dict
+        see offline/__init__.py, ready for json.dump or make_design
+    """
+    rng = random.Random(seed)
+    parent = parents(n_links, topology, branching)
+    # per component, its occurrences only differ by their placement
+    sizes = [[rng.uniform(1.0, 5.0) for _ in range(3)] for _ in range(n_components)]
+    masses = [rng.uniform(0.1, 2.0) for _ in range(n_components)]
+    positions = [(0.0, 0.0, 0.0)]
+    occurrences, joints = [], []
+    for i in range(n_links):
+        c = i % n_components
+        if i:
+            # around and above the parent, so the siblings do not overlap
+            px, py, pz = positions[parent[i]]
+            angle = _GOLDEN_ANGLE * i
+            positions.append((px + SPACING * math.cos(angle), py + SPACING * math.sin(angle), pz + SPACING))
+        x, y, z = positions[i]
+        component = 'base_link' if i == 0 else 'part {}'.format(c)
+        mass = masses[c]
+        occ = {'name': '{}:{}'.format(component, i + 1), 'component': component, 'bodyCount': 1,
+               'transform': [1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z, 0, 0, 0, 1],
+               'physicalProperties': {'mass': mass, 'volume': sizes[c][0] * sizes[c][1] * sizes[c][2],
+                                      'area': 2 * (sizes[c][0] * sizes[c][1] + sizes[c][1] * sizes[c][2] +
+                                                   sizes[c][0] * sizes[c][2]),
+                                      'centerOfMass': [x, y, z],
+                                      'xyzMomentsOfInertia': _moments(mass, sizes[c], (x, y, z))}}
+        if n_triangles:
+            coordinates, indices = sphere(n_triangles, min(sizes[c]) / 2, (x, y, z))
+            occ['bodies'] = [{'volume': occ['physicalProperties']['volume'],
+                              'area': occ['physicalProperties']['area'], 'material': 'Steel',
+                              'mesh': {'nodeCoordinates': coordinates, 'nodeIndices': indices}}]
+        occurrences.append(occ)
+        if i:
+            joints.append(_joint(i, occ['name'], occurrences[parent[i]]['name'], [x, y, z]))
+    return {'rootComponent': {'name': '{}{} v1'.format(topology, n_links)},
+            'occurrences': occurrences, 'joints': joints}
+
+
+def make_design(data):
+    """
+    stand-in adsk.fusion.Design of a recorded design, offline.activate() first
+    """
+    import adsk.fusion
+    return adsk.fusion.Design(data)
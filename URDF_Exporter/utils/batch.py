@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Export many designs in one process from a job file.
+
+A job file is json:
+
+{
+  "output_dir": str (optional, default for the jobs),
+  "options": {option: value} (optional, defaults for the jobs),
+  "jobs": [{"design": str, "output_dir": str (optional), "options": {...} (optional)}]
+}
+
+"design" is a Fusion data file id or a .f3d archive inside Fusion, a recorded
+design json offline. Relative paths are relative to the job file. The options
+are those of URDF_Exporter.OPTIONS, e.g. {"accuracy": "low", "incremental": true}.
+
+run_jobs exports the jobs in turn and keeps going after a failed one. Each
+start and end is written to the log as soon as it happens, and the summary
+ends with the throughput in designs per hour.
+"""
+
+import os, json, time, traceback
+
+LOG_FILE = 'batch.log'
+SUMMARY_FILE = 'batch_summary.json'
+
+
+def read_jobs(path):
+    """
+    Read a job file
+
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    ----------
+    jobs: list
+        {design, output_dir, options} per job, with the defaults of the file
+        applied and the paths made absolute
+    """
+    with open(path) as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    if isinstance(data, list):
+        data = {'jobs': data}
+    if not isinstance(data.get('jobs'), list):
+        raise ValueError('{}: "jobs" has to be a list'.format(path))
+    default_dir = data.get('output_dir', '.')
+    jobs = []
+    for i, job in enumerate(data['jobs']):
+        if isinstance(job, str):
+            job = {'design': job}
+        if 'design' not in job:
+            raise ValueError('{}: job {} has no "design"'.format(path, i))
+        design = job['design']
+        if not os.path.isabs(design) and os.path.exists(os.path.join(base, design)):
+            design = os.path.join(base, design)
+        options = dict(data.get('options', {}))
+        options.update(job.get('options', {}))
+        jobs.append({'design': design,
+                     'output_dir': os.path.join(base, job.get('output_dir', default_dir)),
+                     'options': options})
+    return jobs
+
+
+class Log:
+    def __init__(self, file_name=None, echo=print):
+        """
+        Progress lines of a batch, flushed to file_name as they are written
+
+
+        Parameters
+        ----------
+        file_name: str
+            None to only echo
+        echo: function
+            called with each line too, e.g. print or a Fusion text palette
+        """
+        self.file = open(file_name, mode='a', buffering=1) if file_name else None
+        self.echo = echo
+
+    def __call__(self, line):
+        line = time.strftime('%Y-%m-%d %H:%M:%S ') + line
+        if self.file is not None:
+            self.file.write(line + '\n')
+        if self.echo is not None:
+            self.echo(line)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def run_jobs(jobs, export_job, log=None):
+    """
+    Export the jobs in turn
+
+
+    Parameters
+    ----------
+    jobs: list
+        jobs of read_jobs
+    export_job: function
+        export_job(job) -> (save_dir or None on failure, msg), exceptions are
+        reported as failures
+    log: Log
+        progress of the batch, printed if None
+
+    Returns
+    ----------
+    summary: dict
+        {jobs: [{design, save_dir, ok, seconds, msg}], succeeded, failed,
+         seconds, designs_per_hour}
+    """
+    if log is None:
+        log = Log()
+    results = []
+    start = time.perf_counter()
+    for i, job in enumerate(jobs):
+        log('[{}/{}] start {}'.format(i + 1, len(jobs), job['design']))
+        job_start = time.perf_counter()
+        try:
+            save_dir, msg = export_job(job)
+        except Exception:
+            save_dir, msg = None, traceback.format_exc()
+        seconds = time.perf_counter() - job_start
+        results.append({'design': job['design'], 'save_dir': save_dir, 'ok': save_dir is not None,
+                        'seconds': seconds, 'msg': msg})
+        log('[{}/{}] {} {} in {:.1f} s'.format(i + 1, len(jobs), 'done' if save_dir else 'FAILED',
+                                               job['design'], seconds))
+        lines = msg.strip().splitlines()
+        if save_dir is None:
+            for line in lines:
+                log('    ' + line)
+        elif len(lines) > 1:
+            log('    {} warnings, see the summary'.format(len(lines) - 1))
+    seconds = time.perf_counter() - start
+    succeeded = sum(1 for r in results if r['ok'])
+    summary = {'jobs': results, 'succeeded': succeeded, 'failed': len(results) - succeeded,
+               'seconds': seconds,
+               'designs_per_hour': len(results) * 3600.0 / seconds if seconds > 0 else 0.0}
+    log('{} designs in {:.1f} s, {:.1f} designs/hour, {} succeeded, {} failed'.format(
+        len(results), seconds, summary['designs_per_hour'], succeeded, summary['failed']))
+    return summary
+
+
+def write_summary(summary, file_name):
+    """
+    Write the summary of run_jobs as json
+    """
+    with open(file_name, mode='w') as f:
+        json.dump(summary, f, indent=1)
+    return file_name
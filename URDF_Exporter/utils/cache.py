@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Result cache on disk, shared by the exports of all sessions and, over a
+network mount, of several workstations.
+
+Each entry is one file named by the sha1 of its key, e.g. the fingerprint and
+component revision of an occurrence (see Snapshot.cache_identity) and the
+export options its result depends on, in a directory per first two hex
+digits:
+
+    cache_dir/3f/3fa4...e1
+
+Writers never leave a partial entry: the data goes into a temporary file in
+the same directory, renamed over the entry at once (os.replace), so readers
+see the old entry, the new one or none. Two writers of the same key write the
+same result, the last rename wins.
+
+The size of the cache is capped: evict removes the least recently used
+entries, reads touch the modification time of their entry, until the cache
+is under max_bytes. Eviction and the read-modify-write of update_json hold
+a lock file, created with O_EXCL so only one process, on any machine, holds
+it. Its holder touches it every REFRESH_SECONDS; a lock untouched for 
+STALE_SECONDS was left by a crashed process and is broken, by one process at
+a time under a second lock file, so none removes the lock another one has
+just taken after breaking the same stale lock. Ages are 
+measured on the clock of the file server, the modification time of a file
+just touched, since the clocks of the workstations drift apart. The cache
+is best effort: an unreachable directory or a busy lock is a miss, never a
+failed export.
+"""
+
+import os, json, time, socket, hashlib, threading
+
+CACHE_VERSION = 1  # part of every key, changing it starts a new cache
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+STALE_SECONDS = 60.0  # age of an abandoned lock or temporary file
+REFRESH_SECONDS = 10.0  # held locks are touched this often
+LOCK_WAIT = 10.0  # seconds waited for a lock before giving up
+_LOCK_SUFFIX = '.lock'
+_BREAK_SUFFIX = '.break' + _LOCK_SUFFIX  # held while breaking the lock of the same name
+_TEMP_PREFIX = '.tmp-'
+_CLOCK_PREFIX = '.clock-'
+EVICT_LOCK = 'evict' + _LOCK_SUFFIX
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class DiskCache:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Attributes
+        ----------
+        root: str
+            cache directory, created if missing
+        max_bytes: int
+            size the cache is brought back to by evict
+        hits, misses: int
+            lookups of this process
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._owner = '{}:{}'.format(socket.gethostname(), os.getpid())
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        """
+        file of the entry of key, any json serializable value
+        """
+        digest = hashlib.sha1(json.dumps([CACHE_VERSION, key], sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, key):
+        """
+        data of the entry of key, None on a miss
+        """
+        path = self.path(key)
+        try:
+            with open(path, mode='rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try: os.utime(path)  # most recently used
+        except OSError: pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Write the entry of key atomically
+
+        Returns
+        ----------
+        path of the entry : str, None if it could not be written
+        """
+        path = self.path(key)
+        try: os.mkdir(os.path.dirname(path))
+        except OSError: pass
+        # one per writer, the mesh workers of a process write concurrently
+        temp = '{}{}-{}-{}-{}'.format(_TEMP_PREFIX, os.path.basename(path), self._owner.replace(':', '-'),
+                                      threading.get_ident(), time.monotonic_ns())
+        temp = os.path.join(os.path.dirname(path), temp)
+        try:
+            with open(temp, mode='wb') as f:
+                f.write(data)
+            os.replace(temp, path)
+        except OSError:
+            # e.g. the entry is open on Windows, the other writer wrote the same data
+            try: os.remove(temp)
+            except OSError: pass
+            return None
+        return path
+
+    def get_json(self, key):
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode('utf-8'))
+        except ValueError:
+            return None
+
+    def put_json(self, key, value):
+        return self.put(key, json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+    def update_json(self, key, value):
+        """
+        Merge the dict value into the entry of key, under its lock so the
+        values of concurrent writers are all kept. Skipped, returning None,
+        if the lock is not released within LOCK_WAIT.
+        """
+        path = self.path(key)
+        try: os.mkdir(os.path.dirname(path))
+        except OSError: pass
+        try:
+            with self.lock(path + _LOCK_SUFFIX):
+                current = self.get_json(key) or {}
+                current.update(value)
+                return self.put_json(key, current)
+        except (LockTimeout, OSError):
+            return None
+
+    def now(self):
+        """
+        current time on the clock of the file server: the modification time
+        of a file of this process, touched for the purpose
+        """
+        path = os.path.join(self.root, _CLOCK_PREFIX + self._owner.replace(':', '-'))
+        with open(path, mode='a'):
+            pass
+        os.utime(path)
+        return os.path.getmtime(path)
+
+    def lock(self, path):
+        """
+        context manager holding the lock file path
+        """
+        return _Lock(path, self._owner, self.now)
+
+    def entries(self):
+        """
+        (path, size, last use) of every entry
+        """
+        result = []
+        now = self.now()
+        for directory in os.scandir(self.root):
+            if directory.name.startswith(_CLOCK_PREFIX):
+                # of a process gone, the others touch theirs at each use
+                try:
+                    if now - directory.stat().st_mtime > STALE_SECONDS:
+                        os.remove(directory.path)
+                except OSError:
+                    pass
+                continue
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed by another process
+                if entry.name.startswith(_TEMP_PREFIX) or entry.name.endswith(_BREAK_SUFFIX):
+                    if now - stat.st_mtime > STALE_SECONDS:
+                        # left by a crashed process
+                        try: os.remove(entry.path)
+                        except OSError: pass
+                    continue
+                if entry.name.endswith(_LOCK_SUFFIX):
+                    if now - stat.st_mtime > STALE_SECONDS:
+                        _break(entry.path, self.now)
+                    continue
+                result.append((entry.path, stat.st_size, stat.st_mtime))
+        return result
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache holds at most
+        max_bytes. Skipped if another process is evicting or the cache
+        directory is unreachable.
+
+        Returns
+        ----------
+        removed entries : int
+        """
+        try:
+            with self.lock(os.path.join(self.root, EVICT_LOCK)):
+                entries = self.entries()
+                size = sum(e[1] for e in entries)
+                removed = 0
+                for path, entry_size, _ in sorted(entries, key=lambda e: e[2]):
+                    if size <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    size -= entry_size
+                    removed += 1
+                return removed
+        except (LockTimeout, OSError):
+            return 0
+
+
+def _break(path, now):
+    """
+    Remove the lock file path if it is stale, under the lock file
+    path + _BREAK_SUFFIX: the staleness is checked again there, since another
+    process may have broken the lock and taken it meanwhile. A break lock is
+    only held for a moment, a stale one was left by a crashed process.
+
+
+    Parameters
+    ----------
+    now: function
+        current time on the clock of the file server, see DiskCache.now
+
+    Returns
+    ----------
+    True if the lock was removed
+    """
+    guard = path[:-len(_LOCK_SUFFIX)] + _BREAK_SUFFIX
+    try:
+        fd = os.open(guard, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if now() - os.path.getmtime(guard) > STALE_SECONDS:
+                os.remove(guard)
+        except OSError:
+            pass
+        return False
+    os.close(fd)
+    try:
+        if now() - os.path.getmtime(path) <= STALE_SECONDS:
+            return False
+        os.remove(path)
+        return True
+    except OSError:
+        return False  # released meanwhile
+    finally:
+        try: os.remove(guard)
+        except OSError: pass
+
+
+class _Lock:
+    def __init__(self, path, owner, now):
+        """
+        now: function
+            current time on the clock of the file server, see DiskCache.now
+        """
+        self.path = path
+        self.owner = owner
+        self.now = now
+        self._released = threading.Event()
+        self._refresher = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + LOCK_WAIT
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    touched = os.path.getmtime(self.path)
+                except OSError:
+                    continue  # released meanwhile
+                if self.now() - touched > STALE_SECONDS and _break(self.path, self.now):
+                    continue  # held by a crashed process
+                if time.monotonic() > deadline:
+                    raise LockTimeout(self.path)
+                time.sleep(0.01)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.owner)
+            self._refresher = threading.Thread(target=self._refresh, daemon=True)
+            self._refresher.start()
+            return self
+
+    def _refresh(self):
+        # a held lock never looks abandoned, however long the work under it
+        while not self._released.wait(REFRESH_SECONDS):
+            try: os.utime(self.path)
+            except OSError: pass
+
+    def __exit__(self, *exc):
+        self._released.set()
+        self._refresher.join()
+        try: os.remove(self.path)
+        except OSError: pass
+        return False
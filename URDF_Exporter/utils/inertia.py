@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Batched inertial math for all the links at once.
+
+Masses, centers of mass and inertia tensors are held as N, Nx3 and Nx3x3
+arrays; the parallel-axis shift, the change to the link frames and the
+physical validity checks each run as one vectorized call. Without NumPy the
+same functions loop over the links.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def center_of_mass_inertia(moments, centers_of_mass, masses):
+    """
+    convert the moments of inertia about the world coordinate into those
+    about the center of mass coordinate, for all the links at once
+
+
+    Parameters
+    ----------
+    moments: Nx6
+        moment of inertia about the world coordinate: [xx, yy, zz, xy, yz, xz]
+    centers_of_mass: Nx3
+    masses: N
+
+
+    Returns
+    ----------
+    moments of inertia about the center of mass : Nx6 list
+    """
+    if np is not None and len(masses):
+        c = np.asarray(centers_of_mass, dtype=np.float64)
+        x, y, z = c[:, 0], c[:, 1], c[:, 2]
+        translation = np.stack([y**2+z**2, x**2+z**2, x**2+y**2, -x*y, -y*z, -x*z], axis=1)
+        shifted = np.asarray(moments, dtype=np.float64) \
+            - np.asarray(masses, dtype=np.float64)[:, None] * translation
+        return shifted.tolist()
+    result = []
+    for inertia, (x, y, z), mass in zip(moments, centers_of_mass, masses):
+        translation = [y**2+z**2, x**2+z**2, x**2+y**2, -x*y, -y*z, -x*z]
+        result.append([i - mass*t for i, t in zip(inertia, translation)])
+    return result
+
+
+def origin_inertia(moments, centers_of_mass, masses):
+    """
+    inverse of center_of_mass_inertia: moments of inertia about the center of
+    mass converted into those about the origin, Nx6 list
+    """
+    if np is not None and len(masses):
+        c = np.asarray(centers_of_mass, dtype=np.float64)
+        x, y, z = c[:, 0], c[:, 1], c[:, 2]
+        translation = np.stack([y**2+z**2, x**2+z**2, x**2+y**2, -x*y, -y*z, -x*z], axis=1)
+        return (np.asarray(moments, dtype=np.float64)
+                + np.asarray(masses, dtype=np.float64)[:, None] * translation).tolist()
+    result = []
+    for inertia, (x, y, z), mass in zip(moments, centers_of_mass, masses):
+        translation = [y**2+z**2, x**2+z**2, x**2+y**2, -x*y, -y*z, -x*z]
+        result.append([i + mass*t for i, t in zip(inertia, translation)])
+    return result
+
+
+def rotate_inertia(moments, rotations):
+    """
+    moments of inertia about the center of mass expressed in rotated axes: 
+    R I R^T for each of the Nx6 moments and Nx3x3 rotations, Nx6 list
+    """
+    if np is not None and len(moments):
+        r = np.asarray(rotations, dtype=np.float64).reshape(-1, 3, 3)
+        t = np.einsum('nij,njk,nlk->nil', r, tensors(moments), r)
+        return np.stack([t[:, 0, 0], t[:, 1, 1], t[:, 2, 2], t[:, 0, 1], t[:, 1, 2], t[:, 0, 2]],
+                        axis=1).tolist()
+    result = []
+    for t, r in zip(tensors(moments), rotations):
+        rt = [[sum(r[i][k] * t[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+        t = [[sum(rt[i][k] * r[j][k] for k in range(3)) for j in range(3)] for i in range(3)]
+        result.append([t[0][0], t[1][1], t[2][2], t[0][1], t[1][2], t[0][2]])
+    return result
+
+
+def relative_centers_of_mass(centers_of_mass, origins):
+    """
+    centers of mass relative to the link origins, all at once
+
+
+    Parameters
+    ----------
+    centers_of_mass: Nx3
+    origins: Nx3
+
+    Returns
+    ----------
+    center_of_mass - origin : Nx3 list
+    """
+    if np is not None and len(origins):
+        return (np.asarray(centers_of_mass, dtype=np.float64)
+                - np.asarray(origins, dtype=np.float64)).tolist()
+    return [[i - j for i, j in zip(c, o)] for c, o in zip(centers_of_mass, origins)]
+
+
+def tensors(moments):
+    """
+    Nx3x3 symmetric tensors of Nx6 moments [xx, yy, zz, xy, yz, xz]
+    """
+    if np is not None:
+        m = np.asarray(moments, dtype=np.float64).reshape(-1, 6)
+        t = np.empty((len(m), 3, 3))
+        t[:, 0, 0], t[:, 1, 1], t[:, 2, 2] = m[:, 0], m[:, 1], m[:, 2]
+        t[:, 0, 1] = t[:, 1, 0] = m[:, 3]
+        t[:, 1, 2] = t[:, 2, 1] = m[:, 4]
+        t[:, 0, 2] = t[:, 2, 0] = m[:, 5]
+        return t
+    return [[[xx, xy, xz], [xy, yy, yz], [xz, yz, zz]] for xx, yy, zz, xy, yz, xz in moments]
+
+
+def _principal_moments(xx, yy, zz, xy, yz, xz):
+    """
+    eigenvalues of a symmetric 3x3 matrix, ascending
+    """
+    p1 = xy*xy + yz*yz + xz*xz
+    q = (xx + yy + zz) / 3.0
+    if p1 == 0.0:
+        return sorted([xx, yy, zz])
+    p2 = (xx - q)**2 + (yy - q)**2 + (zz - q)**2 + 2.0 * p1
+    p = math.sqrt(p2 / 6.0)
+    b = [[(xx - q) / p, xy / p, xz / p], [xy / p, (yy - q) / p, yz / p], [xz / p, yz / p, (zz - q) / p]]
+    r = (b[0][0] * (b[1][1]*b[2][2] - b[1][2]*b[2][1])
+         - b[0][1] * (b[1][0]*b[2][2] - b[1][2]*b[2][0])
+         + b[0][2] * (b[1][0]*b[2][1] - b[1][1]*b[2][0])) / 2.0
+    phi = math.acos(max(-1.0, min(1.0, r))) / 3.0
+    e1 = q + 2.0 * p * math.cos(phi)
+    e3 = q + 2.0 * p * math.cos(phi + 2.0 * math.pi / 3.0)
+    return [e3, 3.0 * q - e1 - e3, e1]
+
+
+def validate(names, moments, rtol=1e-9):
+    """
+    Check that each inertia tensor is physically valid: positive definite and
+    its principal moments satisfy the triangle inequality
+
+
+    Parameters
+    ----------
+    names: N
+    moments: Nx6
+        moments of inertia about the center of mass: [xx, yy, zz, xy, yz, xz]
+    rtol: float
+        tolerance relative to the largest principal moment
+
+    Returns
+    ----------
+    {name: reason} of the invalid tensors
+    """
+    invalid = {}
+    if not len(names):
+        return invalid
+    if np is not None:
+        e = np.linalg.eigvalsh(tensors(moments))  # ascending, for all tensors at once
+        tol = rtol * np.abs(e).max(axis=1)
+        not_definite = e[:, 0] <= tol
+        not_triangle = e[:, 0] + e[:, 1] < e[:, 2] - tol
+        for i in np.nonzero(not_definite | not_triangle)[0].tolist():
+            invalid[names[i]] = _reason(not_definite[i], e[i].tolist())
+        return invalid
+    for name, m in zip(names, moments):
+        e = _principal_moments(*m)
+        tol = rtol * max(abs(_) for _ in e)
+        if e[0] <= tol or e[0] + e[1] < e[2] - tol:
+            invalid[name] = _reason(e[0] <= tol, e)
+    return invalid
+
+
+def _reason(not_definite, principal):
+    if not_definite:
+        return 'not positive definite (principal moments {})'.format(principal)
+    return 'principal moments {} violate the triangle inequality'.format(principal)
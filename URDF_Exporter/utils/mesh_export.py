@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+Mesh export pipeline.
+
+The Fusion API is only called from the main thread to tessellate each
+occurrence. Encoding the binary STL and writing it to disk run in a bounded
+thread pool, so they overlap with the next tessellation call.
+
+With in_place, the bodies of each occurrence are tessellated in their
+component and moved by the occurrence transform, so the design does not need
+to be duplicated by utils.copy_occs first, and the occurrences of the same
+component share one tessellation.
+
+With dedup, the meshes are written in the coordinates of their component and
+named by the hash of their tessellation, so the occurrences of a component,
+and the components with the same geometry, share one file. Each link then
+places the shared mesh with the rpy and xyz of its visual origin, see
+placement.
+
+The meshes are STL by default. Each link can have its own file format (see
+utils/mesh_formats.py) and tessellation refinement, e.g. a fine glb for the
+visual of a gripper and coarse STL everywhere else, see mesh_settings.
+"""
+
+import adsk, adsk.core, adsk.fusion
+import os, json, time, math, hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from . import stl_writer, mesh_formats, profiling, tasks
+from .names import link_names
+
+DEFAULT_WORKERS = 4
+CM_TO_MM = 10.0  # tessellation is in cm, the meshes are written in mm like the STL export
+CM_TO_M = 0.01  # meshes in meters need no scale in the urdf
+# tessellation refinements and their adsk.fusion.TriangleMeshQualityOptions
+REFINEMENTS = {'low': 'LowQualityTriangleMesh', 'normal': 'NormalQualityTriangleMesh',
+               'high': 'HighQualityTriangleMesh', 'very-high': 'VeryHighQualityTriangleMesh'}
+DEFAULT_REFINEMENT = 'low'  # like MeshRefinementLow of the Fusion STL export
+
+
+def quality_of(refinement):
+    """
+    adsk.fusion.TriangleMeshQualityOptions of a refinement of REFINEMENTS
+    """
+    if refinement not in REFINEMENTS:
+        raise ValueError('unknown mesh refinement {}, one of {}'.format(refinement, ', '.join(REFINEMENTS)))
+    return getattr(adsk.fusion.TriangleMeshQualityOptions, REFINEMENTS[refinement])
+
+
+def mesh_settings(name, mesh_format='stl', refinement=DEFAULT_REFINEMENT, link_meshes=None):
+    """
+    (format, refinement) of the mesh of a link
+
+
+    Parameters
+    ----------
+    name: str
+        link name
+    mesh_format, refinement: str
+        of the links without an entry in link_meshes
+    link_meshes: dict
+        {link name: {'format': str, 'refinement': str}}, both optional
+    """
+    settings = (link_meshes or {}).get(name, {})
+    return settings.get('format', mesh_format), settings.get('refinement', refinement)
+
+
+def stl_occurrences(components):
+    """
+    (file name, occurrence) of every occurrence to export after
+    utils.copy_occs: all the occurrences whose component is not an
+    'old_component'
+    """
+    for component in components:
+        for occ in component.allOccurrences:
+            if 'old_component' not in occ.component.name:
+                yield occ.component.name, occ
+
+
+def link_occurrences(links, skip=None, names=None):
+    """
+    (link name, occurrence) of every link occurrence with bodies, the 
+    meshes of the copies utils.copy_occs would make, without copying them
+
+
+    Parameters
+    ----------
+    links: iterable of adsk.fusion.Occurrence
+        root.occurrences, or Assembly.links to include the sub-assemblies
+    skip: set
+        full path names of the occurrences not to export, e.g. because their
+        mesh is up to date
+    names: utils.names.NameRegistry
+        link names by full path, Assembly.names. Made from links if None.
+    """
+    if names is None:
+        links = list(links)
+        names = link_names(links, full_path=True)
+    for occ in links:
+        if (skip and occ.fullPathName in skip) or occ.bRepBodies.count == 0:
+            continue
+        yield names[occ.fullPathName], occ
+
+
+def transform_coordinates(coordinates, matrix):
+    """
+    Apply a transform to flat [x, y, z, ...] coordinates
+
+
+    Parameters
+    ----------
+    coordinates: list
+    matrix: adsk.core.Matrix3D
+
+    Returns
+    ----------
+    transformed coordinates : list
+    """
+    m = matrix.asArray()
+    if list(m) == [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]:
+        return coordinates
+    if stl_writer.np is not None:
+        np = stl_writer.np
+        m = np.asarray(m, dtype=np.float64).reshape(4, 4)
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        return (points @ m[:3, :3].T + m[:3, 3]).ravel().tolist()
+    result = []
+    for k in range(0, len(coordinates), 3):
+        x, y, z = coordinates[k], coordinates[k + 1], coordinates[k + 2]
+        result += [m[0]*x + m[1]*y + m[2]*z + m[3],
+                   m[4]*x + m[5]*y + m[6]*z + m[7],
+                   m[8]*x + m[9]*y + m[10]*z + m[11]]
+    return result
+
+
+def placement(matrix):
+    """
+    Placement of a mesh written in the coordinates of its component
+
+
+    Parameters
+    ----------
+    matrix: adsk.core.Matrix3D
+        rigid transform of the occurrence in the root component, in cm
+
+    Returns
+    ----------
+    [x, y, z, roll, pitch, yaw]: the translation in m and the fixed axis
+    angles of the urdf origin (R = Rz(yaw) Ry(pitch) Rx(roll)) in rad
+    """
+    m = matrix.asArray()
+    pitch = math.asin(max(-1.0, min(1.0, -m[8])))
+    if abs(m[8]) < 1.0 - 1e-12:
+        roll = math.atan2(m[9], m[10])
+        yaw = math.atan2(m[4], m[0])
+    else:
+        # gimbal lock, only roll - yaw or roll + yaw is defined
+        roll = math.atan2(-m[6], m[5])
+        yaw = 0.0
+    return [round(_, 6) + 0.0 for _ in (m[3] / 100, m[7] / 100, m[11] / 100, roll, pitch, yaw)]
+
+
+def mesh_digest(coordinates, indices):
+    """
+    Content address of a tessellation: sha1 of its coordinates and indices
+    """
+    digest = hashlib.sha1(array('d', coordinates).tobytes())
+    digest.update(array('q', indices).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _tessellate_bodies(bodies, quality):
+    coordinates = []
+    indices = []
+    for body in bodies:
+        calculator = body.meshManager.createMeshCalculator()
+        calculator.setQuality(quality)
+        mesh = calculator.calculate()
+        offset = len(coordinates) // 3
+        coordinates.extend(mesh.nodeCoordinatesAsDouble)
+        if offset:
+            indices.extend([i + offset for i in mesh.nodeIndices])
+        else:
+            indices.extend(mesh.nodeIndices)
+    return coordinates, indices
+
+
+def tessellate(occ, quality=None, in_place=False, transform=None, shared=None):
+    """
+    Tessellate all the bodies of an occurrence
+
+
+    Parameters
+    ----------
+    occ: adsk.fusion.Occurrence
+    quality: adsk.fusion.TriangleMeshQualityOptions
+        LowQualityTriangleMesh by default, like MeshRefinementLow
+    in_place: bool
+        tessellate the bodies in their component and apply the occurrence
+        transform, instead of using the bodies as they are in the root 
+        component
+    transform: adsk.core.Matrix3D
+        placement of the occurrence in the root component with in_place,
+        occ.transform by default
+    shared: dict
+        {(component name, quality): tessellation in the component} with 
+        in_place, the other occurrences of a component reuse its tessellation
+
+    Returns
+    ----------
+    coordinates: list
+        flat [x, y, z, ...] of the nodes in cm
+    indices: list
+        flat node indices, three per triangle
+    """
+    if quality is None:
+        quality = adsk.fusion.TriangleMeshQualityOptions.LowQualityTriangleMesh
+    if not in_place:
+        return _tessellate_bodies(occ.bRepBodies, quality)
+    key = occ.component.name, quality
+    if shared is not None and key in shared:
+        coordinates, indices = shared[key]
+    else:
+        coordinates, indices = _tessellate_bodies(
+            [body.nativeObject or body for body in occ.bRepBodies], quality)
+        if shared is not None:
+            shared[key] = coordinates, indices
+    return transform_coordinates(coordinates, occ.transform if transform is None else transform), indices
+
+
+def _pack(meta, data):
+    """
+    cache entry of a mesh: a line of json, then the file
+    """
+    return json.dumps(meta).encode('utf-8') + b'\n' + data
+
+
+def _unpack(entry):
+    """
+    (meta, file content) of a cache entry, (None, None) on a miss
+    """
+    if entry is None:
+        return None, None
+    head, _, data = entry.partition(b'\n')
+    try:
+        return json.loads(head.decode('utf-8')), data
+    except ValueError:
+        return None, None
+
+
+def _encode_and_write(file_name, coordinates, indices, scale, timing, quantize=False, cache=None,
+                      cache_key=None, meta=None):
+    try:
+        start = time.perf_counter()
+        with profiling.span(timing['name'], 'write stl' if file_name.endswith('.stl') else 'write mesh'):
+            if cache_key is None:
+                timing['bytes'] = mesh_formats.write_mesh(file_name, coordinates, indices, scale, quantize)
+            else:
+                data = mesh_formats.encode_mesh(file_name, coordinates, indices, scale, quantize)
+                with open(file_name, mode='wb') as f:
+                    f.write(data)
+                timing['bytes'] = len(data)
+        timing['write'] = time.perf_counter() - start
+        if cache_key is not None:
+            cache.put(cache_key, _pack(meta, data))
+    except Exception as e:
+        timing['error'] = 'writing {} failed: {}'.format(os.path.basename(file_name), e)
+    return timing
+
+
+def _write_cached(file_name, data, timing):
+    try:
+        start = time.perf_counter()
+        with profiling.span(timing['name'], 'write cached'):
+            with open(file_name, mode='wb') as f:
+                f.write(data)
+        timing['bytes'] = len(data)
+        timing['write'] = time.perf_counter() - start
+    except Exception as e:
+        timing['error'] = 'writing {} failed: {}'.format(os.path.basename(file_name), e)
+    return timing
+
+
+def iter_export_meshes(occurrences, mesh_dir, workers=DEFAULT_WORKERS, quality=None, scale=CM_TO_MM,
+                       in_place=False, transforms=None, dedup=False, mesh_format='stl', compress=False,
+                       quantize=False, link_meshes=None, cache=None, fingerprints=None):
+    """
+    export mesh files into "mesh_dir/", as steps (see utils/tasks.py): one
+    progress step per occurrence, and the writes the pool has to finish
+    before the next tessellation are yielded
+
+
+    Parameters
+    ----------
+    occurrences: iterable of (name, adsk.fusion.Occurrence)
+        each occurrence is written into "mesh_dir/name.stl", or the extension
+        of its format
+    mesh_dir: str
+        directory path to save
+    workers: int
+        number of threads encoding and writing the files, 0 to do
+        everything on the calling thread
+    quality: adsk.fusion.TriangleMeshQualityOptions
+        of the links without a refinement in link_meshes
+    scale: float
+        from cm to the unit of the files, CM_TO_MM or CM_TO_M. The formats 
+        of mesh_formats.IN_METERS are always written in meters.
+    in_place: bool
+        see tessellate, for the occurrences of link_occurrences
+    transforms: dict
+        {occurrence full path: placement in the root component} with in_place,
+        Assembly.transforms for the occurrences of sub-assemblies
+    dedup: bool
+        with in_place, write each distinct mesh once in the coordinates of its
+        component into "mesh_dir/digest.stl"
+    mesh_format: str
+        one of mesh_formats.FORMATS, for the links without a format in 
+        link_meshes
+    compress: bool
+        gzip all the files, e.g. "name.stl.gz"
+    quantize: bool
+        16-bit positions in the glb files
+    link_meshes: dict
+        {link name: {'format', 'refinement'}}, see mesh_settings
+    cache: utils.cache.DiskCache
+        mesh files of any export, keyed by the fingerprint of the occurrence
+        and the options above, copied instead of tessellating the occurrence
+    fingerprints: dict
+        {occurrence full path: identity} for the cache, see 
+        Snapshot.cache_identity. The other occurrences are not cached.
+
+    Returns
+    ----------
+    report: list
+        {name, triangles, tessellate, write, bytes} per mesh with
+        the times in seconds, or {name, error} if the mesh failed. With dedup
+        also {mesh, placement, shared}: the file name relative to mesh_dir, 
+        the placement of the link and whether the file was already written
+        for another link. The meshes from the cache have {cached: True} 
+        and no tessellate time.
+    """
+    dedup = dedup and in_place
+    if quality is None:
+        quality = quality_of(DEFAULT_REFINEMENT)
+    identity = adsk.core.Matrix3D.create() if dedup else None
+    digests = {}  # (component name, quality): digest of its tessellation
+    written = set()  # file names
+    try: os.mkdir(mesh_dir)
+    except: pass
+    report = []
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+    pending = []  # futures, oldest first
+    shared = {}
+    occurrences = list(occurrences)
+    try:
+        for i, (name, occ) in enumerate(occurrences):
+            yield 'export meshes', i, len(occurrences)
+            timing = {'name': name}
+            report.append(timing)
+            try:
+                link_format, refinement = mesh_settings(name, mesh_format, None, link_meshes)
+                ext = mesh_formats.extension(link_format, compress)
+                link_scale = CM_TO_M if link_format in mesh_formats.IN_METERS else scale
+                mesh_quality = quality if refinement is None else quality_of(refinement)
+                key = occ.component.name, mesh_quality
+                cache_key = None
+                if cache is not None and fingerprints and occ.fullPathName in fingerprints:
+                    cache_key = ['mesh', fingerprints[occ.fullPathName], mesh_quality, ext, link_scale,
+                                 quantize, in_place, dedup]
+                meta, data = _unpack(cache.get(cache_key)) if cache_key else (None, None)
+                if meta is not None and not data and \
+                        not (dedup and digests.get(key, meta.get('digest')) + ext in written):
+                    meta = None  # only the digest of a shared mesh was cached, the file is needed
+                transform = transforms.get(occ.fullPathName) if transforms else None
+                if dedup and transform is None:
+                    transform = occ.transform
+                if meta is not None:
+                    timing['cached'] = True
+                    timing['triangles'] = meta['triangles']
+                else:
+                    start = time.perf_counter()
+                    with profiling.span(name, 'tessellate'):
+                        if dedup:
+                            coordinates, indices = tessellate(occ, mesh_quality, True, identity, shared)
+                        else:
+                            coordinates, indices = tessellate(occ, mesh_quality, in_place, transform, shared)
+                    timing['tessellate'] = time.perf_counter() - start
+                    timing['triangles'] = len(indices) // 3
+                file_name = mesh_dir + '/' + name + ext
+                if dedup:
+                    if key not in digests:
+                        digests[key] = meta['digest'] if meta is not None else \
+                            mesh_digest(coordinates, indices)
+                    timing['mesh'] = digests[key] + ext
+                    timing['placement'] = placement(transform)
+                    timing['shared'] = timing['mesh'] in written
+                    if timing['shared']:
+                        if meta is None and cache_key:
+                            # the next exports of this link skip its tessellation too
+                            cache.put(cache_key, _pack({'triangles': timing['triangles'], 
+                                                        'digest': digests[key]}, b''))
+                        continue
+                    written.add(timing['mesh'])
+                    file_name = mesh_dir + '/' + timing['mesh']
+                if meta is not None:
+                    job = (_write_cached, file_name, data, timing)
+                else:
+                    job = (_encode_and_write, file_name, coordinates, indices, link_scale, timing, quantize,
+                           cache, cache_key, {'triangles': timing['triangles'], 'digest': digests.get(key)})
+                if pool is None:
+                    job[0](*job[1:])
+                    continue
+                # bound the tessellated meshes waiting in memory
+                pending = [future for future in pending if not future.done()]
+                if len(pending) >= 2 * workers:
+                    yield pending.pop(0)
+                pending.append(pool.submit(*job))
+            except Exception as e:
+                timing['error'] = str(e)
+        for future in pending:
+            yield future
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return report
+
+
+def export_meshes(occurrences, mesh_dir, workers=DEFAULT_WORKERS, quality=None, scale=CM_TO_MM,
+                  in_place=False, transforms=None, dedup=False, mesh_format='stl', compress=False,
+                  quantize=False, link_meshes=None, cache=None, fingerprints=None):
+    """
+    iter_export_meshes run to the end, see its parameters and report
+    """
+    return tasks.run_steps(iter_export_meshes(occurrences, mesh_dir, workers, quality, scale, 
+                                              in_place, transforms, dedup, mesh_format, compress,
+                                              quantize, link_meshes, cache, fingerprints))
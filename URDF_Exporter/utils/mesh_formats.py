@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Mesh file formats of the exported meshes, chosen by the file extension.
+
+- '.stl': binary STL, one record per triangle, see utils/stl_writer.py
+- '.glb': binary glTF 2.0 with an index buffer. With quantize, the positions
+  are 16-bit integers dequantized by the node transform
+  (KHR_mesh_quantization), a third of the float positions.
+- '.dae': COLLADA 1.4.1 with an index list
+
+glb and dae are indexed: the nodes shared by several triangles, and the
+duplicated nodes Fusion gives along the edges of the faces, are written once
+(see weld), so they are several times smaller than the triangle soup of an
+STL. Any of them can be compressed with gzip: '.stl.gz', '.glb.gz', ...
+
+The coordinates are written like the STL, in the frame of the link with z up,
+but for glb: glTF is +Y up in meters, so the glb files are rotated to +Y up
+and always written in meters (IN_METERS), the urdf scales them by 1.
+read_mesh turns them back to z up.
+"""
+
+import gzip, json, struct
+from xml.etree import ElementTree
+from . import stl_writer
+
+np = stl_writer.np
+
+FORMATS = ('stl', 'glb', 'dae')
+IN_METERS = ('glb',)  # formats written in meters whatever the scale of the others
+GZIP_SUFFIX = '.gz'
+
+_GLB_MAGIC = 0x46546C67  # 'glTF'
+_GLB_JSON = 0x4E4F534A
+_GLB_BIN = 0x004E4942
+_FLOAT, _UNSIGNED_SHORT, _UNSIGNED_INT = 5126, 5123, 5125
+_QUANTIZED = 65535  # levels of a quantized coordinate
+_COLLADA_NAMESPACE = 'http://www.collada.org/2005/11/COLLADASchema'
+
+
+def extension(mesh_format, compress=False):
+    """
+    file extension of a format of FORMATS, e.g. '.glb.gz'
+    """
+    if mesh_format not in FORMATS:
+        raise ValueError('unknown mesh format {}, one of {}'.format(mesh_format, ', '.join(FORMATS)))
+    return '.' + mesh_format + (GZIP_SUFFIX if compress else '')
+
+
+def in_meters(file_name):
+    """
+    True if the mesh file is of a format of IN_METERS
+    """
+    ext = split_extension(file_name)[1]
+    if ext.endswith(GZIP_SUFFIX):
+        ext = ext[:-len(GZIP_SUFFIX)]
+    return ext[1:] in IN_METERS
+
+
+def split_extension(file_name):
+    """
+    (file name without its extension, extension), the extension of
+    'a.glb.gz' is '.glb.gz'
+    """
+    stem, suffix = file_name, ''
+    if stem.endswith(GZIP_SUFFIX):
+        stem, suffix = stem[:-len(GZIP_SUFFIX)], GZIP_SUFFIX
+    dot = stem.rfind('.')
+    if dot <= stem.replace('\\', '/').rfind('/'):
+        return stem, suffix
+    return stem[:dot], stem[dot:] + suffix
+
+
+def weld(coordinates, indices, scale=1.0):
+    """
+    Merge the nodes with the same coordinates
+
+
+    Returns
+    ----------
+    vertices: list or numpy array
+        flat [x, y, z, ...] or (n, 3) float32 of the distinct nodes, scaled
+    indices: list or numpy array
+        flat vertex indices, three per triangle
+    """
+    if np is not None:
+        nodes = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3) * scale
+        vertices, inverse = np.unique(nodes.astype(np.float32), axis=0, return_inverse=True)
+        return vertices, inverse.reshape(-1)[np.asarray(indices, dtype=np.intp).reshape(-1)]
+    # the float32 values, like the NumPy path, so nodes equal once written merge
+    nodes = struct.unpack('<{}f'.format(len(coordinates)),
+                          struct.pack('<{}f'.format(len(coordinates)), *[c * scale for c in coordinates]))
+    index = {}
+    remap = []
+    vertices = []
+    for k in range(0, len(nodes), 3):
+        node = nodes[k:k + 3]
+        if node not in index:
+            index[node] = len(index)
+            vertices.extend(node)
+        remap.append(index[node])
+    return vertices, [remap[i] for i in indices]
+
+
+def _bounds(vertices):
+    if np is not None:
+        return vertices.min(axis=0).tolist(), vertices.max(axis=0).tolist()
+    columns = [vertices[axis::3] for axis in range(3)]
+    return [min(c) for c in columns], [max(c) for c in columns]
+
+
+def _pad(data, fill):
+    return data + fill * (-len(data) % 4)
+
+
+def encode_glb(coordinates, indices, scale=1.0, quantize=False):
+    """
+    Encode a triangle mesh as binary glTF, see stl_writer.encode_stl for the
+    parameters. With quantize the positions are 16-bit integers.
+
+    Returns
+    ----------
+    glb : bytes
+    """
+    vertices, faces = weld(coordinates, indices, scale)
+    n_vertices = len(vertices) if np is not None else len(vertices) // 3
+    # z up to the +Y up of glTF: (x, y, z) -> (x, z, -y)
+    if np is not None:
+        vertices = vertices[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=np.float32)
+    else:
+        vertices = [c for k in range(0, len(vertices), 3) 
+                    for c in (vertices[k], vertices[k + 2], -vertices[k + 1])]
+    low, high = _bounds(vertices) if n_vertices else ([0.0] * 3, [0.0] * 3)
+    node = {'mesh': 0}
+    extensions = {}
+    if quantize:
+        # position = translation + scale * q, q in [0, 65535]
+        step = [(h - l) / _QUANTIZED or 1.0 for l, h in zip(low, high)]
+        if np is not None:
+            q = np.rint((vertices - np.asarray(low, dtype=np.float32)) / np.asarray(step)).astype('<u2')
+            positions = np.zeros((n_vertices, 4), dtype='<u2')  # vertices aligned on 4 bytes
+            positions[:, :3] = q
+            positions = positions.tobytes()
+            q_low, q_high = (q.min(axis=0).tolist(), q.max(axis=0).tolist()) if n_vertices else \
+                ([0] * 3, [0] * 3)
+        else:
+            q = [int(round((v - low[k % 3]) / step[k % 3])) for k, v in enumerate(vertices)]
+            positions = b''.join(struct.pack('<4H', q[k], q[k + 1], q[k + 2], 0) for k in range(0, len(q), 3))
+            q_low, q_high = _bounds(q) if n_vertices else ([0] * 3, [0] * 3)
+        node.update(translation=low, scale=step)
+        position_view = {'byteStride': 8}
+        position_accessor = {'componentType': _UNSIGNED_SHORT, 'min': q_low, 'max': q_high}
+        extensions = {'extensionsUsed': ['KHR_mesh_quantization'],
+                      'extensionsRequired': ['KHR_mesh_quantization']}
+    else:
+        if np is not None:
+            positions = vertices.astype('<f4').tobytes()
+        else:
+            positions = struct.pack('<{}f'.format(len(vertices)), *vertices)
+        position_view = {}
+        position_accessor = {'componentType': _FLOAT, 'min': low, 'max': high}
+    small = n_vertices <= 0xFFFF
+    if np is not None:
+        index_data = faces.astype('<u2' if small else '<u4').tobytes()
+    else:
+        index_data = struct.pack('<{}{}'.format(len(faces), 'H' if small else 'I'), *faces)
+    positions = _pad(positions, b'\0')
+    binary = positions + _pad(index_data, b'\0')
+    document = dict({
+        'asset': {'version': '2.0', 'generator': 'fusion2urdf'},
+        'scene': 0, 'scenes': [{'nodes': [0]}], 'nodes': [node],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1, 'mode': 4}]}],
+        'buffers': [{'byteLength': len(binary)}],
+        'bufferViews': [dict({'buffer': 0, 'byteOffset': 0, 'byteLength': len(positions), 'target': 34962},
+                             **position_view),
+                        {'buffer': 0, 'byteOffset': len(positions), 'byteLength': len(index_data),
+                         'target': 34963}],
+        'accessors': [dict({'bufferView': 0, 'count': n_vertices, 'type': 'VEC3'}, **position_accessor),
+                      {'bufferView': 1, 'componentType': _UNSIGNED_SHORT if small else _UNSIGNED_INT,
+                       'count': len(faces), 'type': 'SCALAR'}]}, **extensions)
+    text = _pad(json.dumps(document, separators=(',', ':')).encode('utf-8'), b' ')
+    length = 12 + 8 + len(text) + 8 + len(binary)
+    return b''.join([struct.pack('<III', _GLB_MAGIC, 2, length),
+                     struct.pack('<II', len(text), _GLB_JSON), text,
+                     struct.pack('<II', len(binary), _GLB_BIN), binary])
+
+
+def encode_dae(coordinates, indices, scale=1.0):
+    """
+    Encode a triangle mesh as COLLADA, see stl_writer.encode_stl for the
+    parameters
+
+    Returns
+    ----------
+    dae : bytes
+    """
+    vertices, faces = weld(coordinates, indices, scale)
+    if np is not None:
+        vertices, faces = vertices.reshape(-1).tolist(), faces.tolist()
+    positions = ' '.join(['{:.9g}'.format(v) for v in vertices])
+    triangles = ' '.join([str(i) for i in faces])
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<COLLADA xmlns="' + _COLLADA_NAMESPACE + '" version="1.4.1">\n'
+            '  <asset>\n'
+            '    <contributor><authoring_tool>fusion2urdf</authoring_tool></contributor>\n'
+            '    <unit name="meter" meter="1"/>\n'
+            '    <up_axis>Z_UP</up_axis>\n'
+            '  </asset>\n'
+            '  <library_geometries>\n'
+            '    <geometry id="mesh" name="mesh">\n'
+            '      <mesh>\n'
+            '        <source id="positions">\n'
+            '          <float_array id="positions-array" count="{n}">{positions}</float_array>\n'
+            '          <technique_common>\n'
+            '            <accessor source="#positions-array" count="{v}" stride="3">\n'
+            '              <param name="X" type="float"/><param name="Y" type="float"/>'
+            '<param name="Z" type="float"/>\n'
+            '            </accessor>\n'
+            '          </technique_common>\n'
+            '        </source>\n'
+            '        <vertices id="vertices"><input semantic="POSITION" source="#positions"/></vertices>\n'
+            '        <triangles count="{t}">\n'
+            '          <input semantic="VERTEX" source="#vertices" offset="0"/>\n'
+            '          <p>{triangles}</p>\n'
+            '        </triangles>\n'
+            '      </mesh>\n'
+            '    </geometry>\n'
+            '  </library_geometries>\n'
+            '  <library_visual_scenes>\n'
+            '    <visual_scene id="scene">\n'
+            '      <node id="node" name="node"><instance_geometry url="#mesh"/></node>\n'
+            '    </visual_scene>\n'
+            '  </library_visual_scenes>\n'
+            '  <scene><instance_visual_scene url="#scene"/></scene>\n'
+            '</COLLADA>\n').format(n=len(vertices), v=len(vertices) // 3, t=len(faces) // 3,
+                                   positions=positions, triangles=triangles).encode('utf-8')
+
+
+def encode_mesh(file_name, coordinates, indices, scale=1.0, quantize=False):
+    """
+    Encode a triangle mesh in the format of the extension of file_name
+
+    Returns
+    ----------
+    file content : bytes
+    """
+    stem, ext = split_extension(file_name)
+    compress = ext.endswith(GZIP_SUFFIX)
+    if compress:
+        ext = ext[:-len(GZIP_SUFFIX)]
+    if ext == '.stl':
+        data = stl_writer.encode_stl(coordinates, indices, scale)
+    elif ext == '.glb':
+        data = encode_glb(coordinates, indices, scale, quantize)
+    elif ext == '.dae':
+        data = encode_dae(coordinates, indices, scale)
+    else:
+        raise ValueError('unknown mesh format of ' + file_name)
+    # mtime=0, the same mesh always gives the same file
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+def write_mesh(file_name, coordinates, indices, scale=1.0, quantize=False):
+    """
+    Write a triangle mesh in the format of the extension of file_name, see
+    stl_writer.write_stl for the parameters. quantize is for '.glb'.
+
+    Returns
+    ----------
+    size of the file in bytes : int
+    """
+    if file_name.endswith('.stl'):
+        return stl_writer.write_stl(file_name, coordinates, indices, scale)
+    data = encode_mesh(file_name, coordinates, indices, scale, quantize)
+    with open(file_name, mode='wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def _decode_glb(data):
+    _, _, length = struct.unpack_from('<III', data, 0)
+    text_length, _ = struct.unpack_from('<II', data, 12)
+    document = json.loads(data[20:20 + text_length].decode('utf-8'))
+    binary = data[20 + text_length + 8:length]
+    node = document['nodes'][0]
+    primitive = document['meshes'][0]['primitives'][0]
+    position = document['accessors'][primitive['attributes']['POSITION']]
+    index = document['accessors'][primitive['indices']]
+
+    def values(accessor, width):
+        view = document['bufferViews'][accessor['bufferView']]
+        code = {_FLOAT: 'f', _UNSIGNED_SHORT: 'H', _UNSIGNED_INT: 'I'}[accessor['componentType']]
+        size = struct.calcsize(code)
+        stride = view.get('byteStride', width * size)
+        offset = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+        if np is not None:
+            rows = np.frombuffer(binary, dtype='<' + code, count=accessor['count'] * stride // size,
+                                 offset=offset).reshape(-1, stride // size)
+            return rows[:, :width].astype(np.float64 if width == 3 else np.intp)
+        unpack = struct.Struct('<{}{}'.format(width, code)).unpack_from
+        result = []
+        for k in range(accessor['count']):
+            result.extend(unpack(binary, offset + k * stride))
+        return result
+
+    coordinates, indices = values(position, 3), values(index, 1)
+    step, low = node.get('scale', [1.0] * 3), node.get('translation', [0.0] * 3)
+    # +Y up back to z up: (x, y, z) -> (x, -z, y)
+    if np is not None:
+        coordinates = coordinates * step + low
+        return coordinates[:, [0, 2, 1]] * [1, -1, 1], indices.reshape(-1, 3)
+    if 'scale' in node or 'translation' in node:
+        coordinates = [low[k % 3] + step[k % 3] * c for k, c in enumerate(coordinates)]
+    coordinates = [c for k in range(0, len(coordinates), 3) 
+                   for c in (coordinates[k], -coordinates[k + 2], coordinates[k + 1])]
+    return coordinates, indices
+
+
+def _decode_dae(data):
+    root = ElementTree.fromstring(data)
+    ns = {'c': _COLLADA_NAMESPACE}
+    coordinates = [float(v) for v in root.find('.//c:float_array', ns).text.split()]
+    indices = [int(i) for i in root.find('.//c:triangles/c:p', ns).text.split()]
+    if np is not None:
+        return np.array(coordinates).reshape(-1, 3), np.array(indices, dtype=np.intp).reshape(-1, 3)
+    return coordinates, indices
+
+
+def read_mesh(file_name):
+    """
+    Read a mesh written by write_mesh, or any binary STL
+
+    Returns
+    ----------
+    coordinates, indices: flat lists, or (n, 3) numpy arrays with NumPy,
+    see stl_writer.read_stl
+    """
+    stem, ext = split_extension(file_name)
+    if ext == '.stl':
+        return stl_writer.read_stl(file_name)
+    with open(file_name, mode='rb') as f:
+        data = f.read()
+    if ext.endswith(GZIP_SUFFIX):
+        data, ext = gzip.decompress(data), ext[:-len(GZIP_SUFFIX)]
+    if ext == '.stl':
+        return stl_writer.decode_stl(data)
+    elif ext == '.glb':
+        return _decode_glb(data)
+    elif ext == '.dae':
+        return _decode_dae(data)
+    raise ValueError('unknown mesh format of ' + file_name)
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""
+Lighter geometry for the urdf: decimated visual meshes and convex hulls for
+collision.
+
+Both work on the exported mesh files, after the mesh export, and are written
+in the format of their source mesh. The clustering and
+the point/plane distances are vectorized with NumPy when it is installed;
+otherwise the same algorithms run in pure Python.
+"""
+
+import os, math
+from . import stl_writer, mesh_formats, profiling
+
+np = stl_writer.np
+
+VISUAL_DIR = 'visual'  # decimated meshes, relative to the meshes directory
+COLLISION_DIR = 'collision'  # convex hulls, relative to the meshes directory
+HULL_DIRECTIONS = 500  # the hull is taken over the farthest vertex along this many directions
+
+
+def _as_lists(coordinates, indices):
+    """
+    [(x, y, z), ...] and [(i, j, k), ...] of flat lists or numpy arrays
+    """
+    if np is not None:
+        vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(indices, dtype=np.intp).reshape(-1, 3)
+        return [tuple(v) for v in vertices.tolist()], [tuple(t) for t in triangles.tolist()]
+    c, i = list(coordinates), list(indices)
+    return ([tuple(c[k:k + 3]) for k in range(0, len(c), 3)],
+            [tuple(i[k:k + 3]) for k in range(0, len(i), 3)])
+
+
+def _cluster(vertices, triangles, cells):
+    """
+    Merge the vertices falling into the same cell of a grid with `cells`
+    cells along the longest side of the bounding box
+
+    Returns
+    ----------
+    vertices, triangles of the clustered mesh, without degenerate or
+    duplicated triangles
+    """
+    if np is not None:
+        low = vertices.min(axis=0)
+        size = (vertices.max(axis=0) - low).max() / cells or 1.0
+        keys = np.floor((vertices - low) / size).astype(np.int64)
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        count = np.bincount(inverse)
+        merged = np.stack([np.bincount(inverse, weights=vertices[:, k]) / count
+                           for k in range(3)], axis=1)
+        t = inverse[triangles]
+        keep = (t[:, 0] != t[:, 1]) & (t[:, 1] != t[:, 2]) & (t[:, 0] != t[:, 2])
+        t = t[keep]
+        _, first = np.unique(np.sort(t, axis=1), axis=0, return_index=True)
+        return merged, t[np.sort(first)]
+
+    low = [min(v[k] for v in vertices) for k in range(3)]
+    size = max(max(v[k] for v in vertices) - low[k] for k in range(3)) / cells or 1.0
+    cluster_of = {}
+    sums = []
+    inverse = []
+    for v in vertices:
+        key = (int((v[0] - low[0]) // size), int((v[1] - low[1]) // size),
+               int((v[2] - low[2]) // size))
+        c = cluster_of.get(key)
+        if c is None:
+            c = cluster_of[key] = len(sums)
+            sums.append([0.0, 0.0, 0.0, 0])
+        s = sums[c]
+        s[0] += v[0]; s[1] += v[1]; s[2] += v[2]; s[3] += 1
+        inverse.append(c)
+    merged = [(s[0] / s[3], s[1] / s[3], s[2] / s[3]) for s in sums]
+    seen = set()
+    t = []
+    for a, b, c in triangles:
+        a, b, c = inverse[a], inverse[b], inverse[c]
+        if a == b or b == c or a == c:
+            continue
+        key = tuple(sorted((a, b, c)))
+        if key not in seen:
+            seen.add(key)
+            t.append((a, b, c))
+    return merged, t
+
+
+def decimate(coordinates, indices, target_triangles):
+    """
+    Reduce a mesh to at most target_triangles by vertex clustering
+
+
+    Parameters
+    ----------
+    coordinates: sequence or numpy array
+        flat [x, y, z, ...] or (n, 3) coordinates of the nodes
+    indices: sequence or numpy array
+        flat or (n, 3) node indices, three per triangle
+    target_triangles: int
+        triangle budget
+
+    Returns
+    ----------
+    coordinates, indices: the decimated mesh, the input mesh if it is
+    already within the budget
+    """
+    if np is not None:
+        vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(indices, dtype=np.intp).reshape(-1, 3)
+    else:
+        vertices, triangles = _as_lists(coordinates, indices)
+    if len(triangles) <= target_triangles or len(vertices) == 0:
+        return coordinates, indices
+
+    # the finest grid whose mesh fits the budget
+    best = None
+    low, high = 1, max(2, int(len(triangles) ** 0.5) * 4)
+    while low <= high:
+        cells = (low + high) // 2
+        mesh = _cluster(vertices, triangles, cells)
+        if len(mesh[1]) <= target_triangles:
+            best = mesh
+            low = cells + 1
+        else:
+            high = cells - 1
+    if best is None:
+        best = _cluster(vertices, triangles, 1)
+    if np is not None:
+        return best
+    return [x for v in best[0] for x in v], [i for t in best[1] for i in t]
+
+
+def _directions(n):
+    """
+    n unit vectors spread evenly over the sphere (Fibonacci lattice) and the
+    six axis directions
+    """
+    golden = math.pi * (3 - math.sqrt(5))
+    directions = [(1.0, 0.0, 0.0), (-1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, -1.0, 0.0), 
+                  (0.0, 0.0, 1.0), (0.0, 0.0, -1.0)]
+    for i in range(n):
+        z = 1 - 2 * (i + 0.5) / n
+        r = math.sqrt(1 - z * z)
+        directions.append((r * math.cos(golden * i), r * math.sin(golden * i), z))
+    return directions
+
+
+def hull_vertices(coordinates, n_directions=HULL_DIRECTIONS):
+    """
+    Vertices of a mesh its convex hull is taken over: the farthest vertex 
+    along each of n_directions directions and the axes. They are vertices of
+    the mesh, never averages, so the hull stays on the part, spans its whole
+    bounding box and misses little of it between the directions.
+
+
+    Parameters
+    ----------
+    coordinates: sequence or numpy array
+        flat [x, y, z, ...] or (n, 3) coordinates of the nodes
+
+    Returns
+    ----------
+    coordinates: (n, 3) numpy array or flat list
+    """
+    if np is not None:
+        vertices = np.unique(np.asarray(coordinates, dtype=np.float64).reshape(-1, 3), axis=0)
+        if len(vertices) <= n_directions + 6:
+            return vertices
+        centered = vertices - (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+        directions = np.array(_directions(n_directions))
+        chosen = np.concatenate([(centered @ directions[k:k + 64].T).argmax(axis=0)
+                                 for k in range(0, len(directions), 64)])
+        return vertices[np.unique(chosen)]
+
+    vertices = sorted(set(_as_lists(coordinates, [])[0]))
+    if len(vertices) <= n_directions + 6:
+        return [x for v in vertices for x in v]
+    center = [(min(v[k] for v in vertices) + max(v[k] for v in vertices)) / 2 for k in range(3)]
+    xs = [v[0] - center[0] for v in vertices]
+    ys = [v[1] - center[1] for v in vertices]
+    zs = [v[2] - center[2] for v in vertices]
+    chosen = set()
+    for dx, dy, dz in _directions(n_directions):
+        distances = [dx * x + dy * y + dz * z for x, y, z in zip(xs, ys, zs)]
+        chosen.add(distances.index(max(distances)))
+    return [x for i in sorted(chosen) for x in vertices[i]]
+
+
+def _plane(p, a, b, c):
+    """
+    outward unit normal and offset of the face (a, b, c), counter-clockwise
+    seen from outside
+    """
+    pa, pb, pc = p[a], p[b], p[c]
+    ux, uy, uz = pb[0] - pa[0], pb[1] - pa[1], pb[2] - pa[2]
+    vx, vy, vz = pc[0] - pa[0], pc[1] - pa[1], pc[2] - pa[2]
+    n = (uy*vz - uz*vy, uz*vx - ux*vz, ux*vy - uy*vx)
+    norm = (n[0]*n[0] + n[1]*n[1] + n[2]*n[2]) ** 0.5 or 1.0
+    n = (n[0] / norm, n[1] / norm, n[2] / norm)
+    return n, n[0]*pa[0] + n[1]*pa[1] + n[2]*pa[2]
+
+
+def _above(points, candidates, plane, eps):
+    """
+    candidates strictly above the plane and the farthest of them
+    """
+    (nx, ny, nz), d = plane
+    if np is not None and len(candidates) > 32:
+        idx = np.asarray(candidates, dtype=np.intp)
+        dist = points[idx] @ np.array([nx, ny, nz]) - d
+        mask = dist > eps
+        if not mask.any():
+            return [], None
+        above = idx[mask]
+        return above.tolist(), int(above[np.argmax(dist[mask])])
+    above = []
+    far, far_dist = None, eps
+    for i in candidates:
+        q = points[i]
+        dist = nx*q[0] + ny*q[1] + nz*q[2] - d
+        if dist > eps:
+            above.append(i)
+            if dist > far_dist:
+                far, far_dist = i, dist
+    return above, far
+
+
+def convex_hull(coordinates):
+    """
+    Convex hull of a point cloud by quickhull
+
+
+    Parameters
+    ----------
+    coordinates: sequence or numpy array
+        flat [x, y, z, ...] or (n, 3) coordinates
+
+    Returns
+    ----------
+    coordinates, indices: flat lists of the hull mesh, its faces oriented
+    outward, or None if the points are flat
+    """
+    if np is not None:
+        points = np.unique(np.asarray(coordinates, dtype=np.float64).reshape(-1, 3), axis=0)
+        p = [tuple(v) for v in points.tolist()]
+    else:
+        p = sorted(set(_as_lists(coordinates, [])[0]))
+        points = p
+    if len(p) < 4:
+        return None
+    extent = max(max(v[k] for v in p) - min(v[k] for v in p) for k in range(3))
+    eps = extent * 1e-9
+    if extent == 0.0:
+        return None
+
+    # initial tetrahedron
+    a = min(range(len(p)), key=lambda i: p[i])
+    b = max(range(len(p)), key=lambda i: sum((p[i][k] - p[a][k]) ** 2 for k in range(3)))
+    ab = [p[b][k] - p[a][k] for k in range(3)]
+
+    def line_distance(i):
+        ap = [p[i][k] - p[a][k] for k in range(3)]
+        cx = ab[1]*ap[2] - ab[2]*ap[1]
+        cy = ab[2]*ap[0] - ab[0]*ap[2]
+        cz = ab[0]*ap[1] - ab[1]*ap[0]
+        return cx*cx + cy*cy + cz*cz
+    c = max(range(len(p)), key=line_distance)
+    n, d = _plane(p, a, b, c)
+    e = max(range(len(p)), key=lambda i: abs(n[0]*p[i][0] + n[1]*p[i][1] + n[2]*p[i][2] - d))
+    if abs(n[0]*p[e][0] + n[1]*p[e][1] + n[2]*p[e][2] - d) <= extent * 1e-7:
+        return None  # flat
+    if n[0]*p[e][0] + n[1]*p[e][1] + n[2]*p[e][2] - d > 0:
+        b, c = c, b  # e has to be below (a, b, c)
+
+    faces = {}  # id: [vertices, plane, outside points]
+    edges = {}  # directed edge: face id
+    next_id = [0]
+
+    def add_face(v0, v1, v2, candidates):
+        fid = next_id[0]
+        next_id[0] += 1
+        plane = _plane(p, v0, v1, v2)
+        outside, far = _above(points, candidates, plane, eps)
+        faces[fid] = [(v0, v1, v2), plane, outside, far]
+        edges[(v0, v1)] = fid
+        edges[(v1, v2)] = fid
+        edges[(v2, v0)] = fid
+        return outside
+
+    rest = [i for i in range(len(p)) if i not in (a, b, c, e)]
+    for v0, v1, v2 in ((a, b, c), (a, e, b), (b, e, c), (c, e, a)):
+        claimed = set(add_face(v0, v1, v2, rest))
+        rest = [i for i in rest if i not in claimed]
+
+    pending = [fid for fid, f in faces.items() if f[2]]
+    while pending:
+        fid = pending.pop()
+        if fid not in faces or not faces[fid][2]:
+            continue
+        apex = faces[fid][3]
+        q = p[apex]
+
+        # faces seen from the apex and their horizon
+        visible = set([fid])
+        stack = [fid]
+        horizon = []
+        while stack:
+            f = faces[stack.pop()][0]
+            for edge in ((f[0], f[1]), (f[1], f[2]), (f[2], f[0])):
+                other = edges.get((edge[1], edge[0]))
+                if other in visible:
+                    continue
+                (nx, ny, nz), d = faces[other][1]
+                if nx*q[0] + ny*q[1] + nz*q[2] - d > eps:
+                    visible.add(other)
+                    stack.append(other)
+                else:
+                    horizon.append(edge)
+
+        orphans = []
+        for f in visible:
+            v, _, outside, _ = faces.pop(f)
+            orphans.extend(outside)
+            for edge in ((v[0], v[1]), (v[1], v[2]), (v[2], v[0])):
+                if edges.get(edge) == f:
+                    del edges[edge]
+        orphans = [i for i in orphans if i != apex]
+
+        for v0, v1 in horizon:
+            claimed = add_face(v0, v1, apex, orphans)
+            if claimed:
+                pending.append(next_id[0] - 1)
+                claimed = set(claimed)
+                orphans = [i for i in orphans if i not in claimed]
+
+    used = sorted(set(i for f in faces.values() for i in f[0]))
+    remap = dict((old, new) for new, old in enumerate(used))
+    hull_coordinates = [x for i in used for x in p[i]]
+    hull_indices = [remap[i] for f in faces.values() for i in f[0]]
+    return hull_coordinates, hull_indices
+
+
+def simplify_meshes(robot, mesh_dir, visual_triangles=None, collision_hull=False, quantize=False):
+    """
+    Write the decimated visual meshes and the collision hulls of the links and
+    point the robot at them
+
+
+    Parameters
+    ----------
+    robot: Robot.Robot
+        robot.meshes and robot.collision_meshes are updated in place
+    mesh_dir: str
+        directory holding the exported meshes
+    visual_triangles: int
+        triangle budget of the visual meshes, None to keep the exported ones
+    collision_hull: bool
+        use the convex hull of each mesh for collision
+    quantize: bool
+        16-bit positions in the glb files, see mesh_formats.encode_glb
+
+    Returns
+    ----------
+    report: list
+        {name, triangles, visual_triangles, hull_triangles} per mesh. 
+        The simplified meshes are named after their source mesh, so the 
+        links sharing a mesh share its simplified meshes too.
+    """
+    report = []
+    done = {}  # source mesh: (visual, collision)
+    for name in robot.links:
+        mesh = robot.meshes.get(name)
+        if mesh in done:
+            visual, collision = done[mesh]
+            if collision is not None:
+                robot.collision_meshes[name] = collision
+            robot.meshes[name] = visual
+            continue
+        if mesh is None or not os.path.isfile(os.path.join(mesh_dir, mesh)):
+            continue
+        stem, ext = mesh_formats.split_extension(os.path.basename(mesh))
+        coordinates, indices = mesh_formats.read_mesh(os.path.join(mesh_dir, mesh))
+        entry = {'name': name, 'triangles': len(indices) // 3 if np is None else len(indices)}
+        report.append(entry)
+
+        if collision_hull:
+            # the hull of a subset of the vertices keeps the collision shape small
+            with profiling.span(name, 'convex hull'):
+                hull = convex_hull(hull_vertices(coordinates))
+            if hull is not None:
+                collision = COLLISION_DIR + '/' + stem + ext
+                try: os.mkdir(os.path.join(mesh_dir, COLLISION_DIR))
+                except: pass
+                mesh_formats.write_mesh(os.path.join(mesh_dir, collision), hull[0], hull[1], 
+                                        quantize=quantize)
+                robot.collision_meshes[name] = collision
+                entry['hull_triangles'] = len(hull[1]) // 3
+
+        if visual_triangles is not None:
+            with profiling.span(name, 'decimate'):
+                c, i = decimate(coordinates, indices, visual_triangles)
+            visual = VISUAL_DIR + '/' + stem + ext
+            try: os.mkdir(os.path.join(mesh_dir, VISUAL_DIR))
+            except: pass
+            mesh_formats.write_mesh(os.path.join(mesh_dir, visual), c, i, quantize=quantize)
+            if name not in robot.collision_meshes:
+                robot.collision_meshes[name] = mesh  # keep the full mesh for collision
+            robot.meshes[name] = visual
+            entry['visual_triangles'] = len(i) // 3 if np is None else len(i)
+        done[mesh] = robot.meshes[name], robot.collision_meshes.get(name)
+    return report
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+urdf names of the Fusion occurrences.
+
+The characters ' ', ':', '(' and ')' of a Fusion name become '_', through one
+str.translate. A NameRegistry sanitizes each name once and makes sure two
+Fusion names never get the same urdf name: the sorted Fusion names claim
+their sanitized name first, and the next ones with the same sanitized name
+get a suffix '_2', '_3', ... Since the order does not depend on the walk, all
+the registries of the same design give the same names, for the links, their
+joints and their mesh files.
+"""
+
+_TABLE = str.maketrans(' :()', '____')
+
+BASE_LINK = 'base_link'
+
+
+def sanitize(name):
+    """
+    name with ' ', ':', '(' and ')' replaced by '_'
+    """
+    return name.translate(_TABLE)
+
+
+class NameRegistry:
+    def __init__(self, names=(), fixed=None):
+        """
+        Parameters
+        ----------
+        names: iterable
+            Fusion names, registered in sorted order
+        fixed: dict
+            {Fusion name: urdf name} registered before names, e.g. the
+            occurrence of the base_link component
+
+        Attributes
+        ----------
+        renamed: dict
+            {Fusion name: urdf name} of the names whose sanitized name was
+            already taken
+        """
+        self._names = {}  # Fusion name: urdf name
+        self._taken = set()  # urdf names
+        self.renamed = {}
+        for group in (sorted(fixed.items()) if fixed else [], [(n, sanitize(n)) for n in sorted(set(names))]):
+            # the unique sanitized names first, so a suffix never takes a name of the group
+            pending = []
+            for name, wanted in group:
+                if name in self._names:
+                    continue
+                if wanted in self._taken:
+                    pending.append((name, wanted))
+                else:
+                    self._names[name] = wanted
+                    self._taken.add(wanted)
+            for name, wanted in pending:
+                self._register(name, wanted)
+
+    def _register(self, name, wanted):
+        urdf_name = wanted
+        i = 2
+        while urdf_name in self._taken:
+            urdf_name = '{}_{}'.format(wanted, i)
+            i += 1
+        self._names[name] = urdf_name
+        self._taken.add(urdf_name)
+        if urdf_name != wanted:
+            self.renamed[name] = urdf_name
+        return urdf_name
+
+    def __getitem__(self, name):
+        """
+        urdf name of a Fusion name, names not registered yet are registered
+        """
+        try:
+            return self._names[name]
+        except KeyError:
+            return self._register(name, sanitize(name))
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+
+def link_names(occurrences, full_path=False):
+    """
+    NameRegistry of the link occurrences: base_link for the occurrence of the
+    base_link component, the sanitized name for the others
+
+
+    Parameters
+    ----------
+    occurrences: iterable of adsk.fusion.Occurrence
+    full_path: bool
+        key the registry by occ.fullPathName instead of occ.name
+    """
+    fixed, names = {}, []
+    for occ in occurrences:
+        name = occ.fullPathName if full_path else occ.name
+        if occ.component.name == BASE_LINK:
+            fixed[name] = BASE_LINK
+        else:
+            names.append(name)
+    return NameRegistry(names, fixed)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Named timing spans around the stages of an export and their per-item steps.
+
+start() makes a Profiler active, span() then records the wall time of a block
+on it from any thread. Without an active Profiler span() only yields, so the
+instrumented functions can also be called on their own.
+
+    profiler = profiling.start('robot')
+    with profiling.span('write urdf'):
+        ...
+    with profiling.span(occ.name, 'getPhysicalProperties', accuracy='low'):
+        ...
+    profiling.stop().write(save_dir)
+
+write() puts a summary (robot_profile.json) and a Chrome trace-event file
+(robot_trace.json, open it in chrome://tracing or https://ui.perfetto.dev)
+next to the urdf.
+"""
+
+import json, threading, time
+from contextlib import contextmanager
+
+STAGE = 'stage'  # category of the spans around the stages of the export
+PROFILE_SUFFIX = '_profile.json'
+TRACE_SUFFIX = '_trace.json'
+SLOWEST = 10  # items listed per category in the summary
+
+_active = None
+
+
+class Profiler:
+    def __init__(self, name):
+        """
+        Attributes
+        ----------
+        name: str
+            name of the run, the robot name for an export
+        spans: list
+            (name, category, start, duration, thread, args) with the times in
+            seconds from the creation of the Profiler
+        """
+        self.name = name
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._threads = {}  # thread ident: (tid, thread name)
+        self._lock = threading.Lock()
+
+    def add(self, name, category, start, end, args=None):
+        """
+        Record a span measured with time.perf_counter()
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            if thread.ident not in self._threads:
+                self._threads[thread.ident] = (len(self._threads) + 1, thread.name)
+            self.spans.append((name, category, start - self._origin, end - start,
+                               self._threads[thread.ident][0], args or {}))
+
+    def report(self):
+        """
+        Summary of the spans
+
+
+        Returns
+        ----------
+        report: dict
+            {name, total, stages: [{name, duration}],
+             items: {category: {count, total, max, slowest: [{name, duration, args}]}}}
+            with the times in seconds
+        """
+        stages = [{'name': name, 'duration': duration}
+                  for name, category, start, duration, tid, args in self.spans if category == STAGE]
+        items = {}
+        for name, category, start, duration, tid, args in self.spans:
+            if category == STAGE:
+                continue
+            summary = items.setdefault(category, {'count': 0, 'total': 0.0, 'max': 0.0, 'slowest': []})
+            summary['count'] += 1
+            summary['total'] += duration
+            summary['max'] = max(summary['max'], duration)
+            summary['slowest'].append({'name': name, 'duration': duration, 'args': args})
+        for summary in items.values():
+            summary['slowest'] = sorted(summary['slowest'], key=lambda _: -_['duration'])[:SLOWEST]
+        total = max([start + duration for _, _, start, duration, _, _ in self.spans] or [0.0])
+        return {'name': self.name, 'total': total, 'stages': stages, 'items': items}
+
+    def trace_events(self):
+        """
+        Spans in the Chrome trace-event format, one complete event per span
+        """
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self._threads.values()]
+        for name, category, start, duration, tid, args in self.spans:
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': tid,
+                           'ts': start * 1e6, 'dur': duration * 1e6, 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, save_dir):
+        """
+        Write "save_dir/name_profile.json" and "save_dir/name_trace.json"
+
+        Returns
+        ----------
+        file_names: [profile, trace]
+        """
+        file_names = [save_dir + '/' + self.name + PROFILE_SUFFIX,
+                      save_dir + '/' + self.name + TRACE_SUFFIX]
+        for file_name, data in zip(file_names, [self.report(), self.trace_events()]):
+            with open(file_name, mode='w') as f:
+                json.dump(data, f, indent=1)
+        return file_names
+
+
+def start(name):
+    """
+    Make a new Profiler active and return it
+    """
+    global _active
+    _active = Profiler(name)
+    return _active
+
+
+def stop():
+    """
+    Deactivate the active Profiler and return it, None if there is none
+    """
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+@contextmanager
+def span(name, category=STAGE, **args):
+    """
+    Record the wall time of the block on the active Profiler
+
+
+    Parameters
+    ----------
+    name: str
+        stage name, or item name such as the occurrence or joint name
+    category: str
+        STAGE or the per-item step, e.g. 'getPhysicalProperties'
+    args:
+        json serializable details shown in the trace
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, category, start, time.perf_counter(), args)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Binary STL encoder.
+
+With NumPy the triangles are packed into a structured array (normal, three
+vertices, attribute) and written with a single buffer write, without a Python
+loop per triangle. Fusion 360 does not ship NumPy, so a pure-Python encoder is
+used when it is not installed.
+"""
+
+import math, struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HEADER = b'fusion2urdf'
+_COUNT = struct.Struct('<I')
+_TRIANGLE = struct.Struct('<12fH')
+
+if np is not None:
+    # 50 bytes per triangle, exactly the binary STL record
+    STL_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                          ('vertices', '<f4', (3, 3)),
+                          ('attribute', '<u2')])
+
+
+def _header(header, n_triangles):
+    return header[:80].ljust(80, b'\0') + _COUNT.pack(n_triangles)
+
+
+def _triangles(coordinates, indices, scale):
+    """
+    structured array of the triangles of a mesh given as flat coordinates
+    and flat indices
+    """
+    vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+    corners = vertices[np.asarray(indices, dtype=np.intp).reshape(-1, 3)]  # (n, 3, 3)
+    if scale != 1.0:
+        corners *= scale
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    norm = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+    np.divide(normals, norm[:, None], out=normals, where=norm[:, None] > 0.0)
+
+    records = np.zeros(len(corners), dtype=STL_DTYPE)
+    records['normal'] = normals
+    records['vertices'] = corners
+    return records
+
+
+def _encode_python(coordinates, indices, scale):
+    c = [v * scale for v in coordinates]
+    n_triangles = len(indices) // 3
+    data = bytearray()
+    pack = _TRIANGLE.pack
+    for t in range(0, n_triangles * 3, 3):
+        a, b, d = 3 * indices[t], 3 * indices[t + 1], 3 * indices[t + 2]
+        ax, ay, az = c[a], c[a + 1], c[a + 2]
+        bx, by, bz = c[b], c[b + 1], c[b + 2]
+        dx, dy, dz = c[d], c[d + 1], c[d + 2]
+        ux, uy, uz = bx - ax, by - ay, bz - az
+        vx, vy, vz = dx - ax, dy - ay, dz - az
+        nx, ny, nz = uy*vz - uz*vy, uz*vx - ux*vz, ux*vy - uy*vx
+        norm = math.sqrt(nx*nx + ny*ny + nz*nz)
+        if norm > 0.0:
+            nx, ny, nz = nx / norm, ny / norm, nz / norm
+        data += pack(nx, ny, nz, ax, ay, az, bx, by, bz, dx, dy, dz, 0)
+    return data
+
+
+def encode_stl(coordinates, indices, scale=1.0, header=HEADER):
+    """
+    Encode a triangle mesh as binary STL
+
+
+    Parameters
+    ----------
+    coordinates: sequence or numpy array
+        flat [x, y, z, ...] or (n, 3) coordinates of the nodes
+    indices: sequence or numpy array
+        flat or (n, 3) node indices, three per triangle
+    scale: float
+        factor applied to the coordinates, e.g. to write the mesh in meters
+
+    Returns
+    ----------
+    binary stl : bytes
+    """
+    if np is not None:
+        records = _triangles(coordinates, indices, scale)
+        return _header(header, len(records)) + records.tobytes()
+    if not isinstance(indices, list):
+        indices = list(indices)
+    return _header(header, len(indices) // 3) + bytes(_encode_python(coordinates, indices, scale))
+
+
+def write_stl(file_name, coordinates, indices, scale=1.0, header=HEADER):
+    """
+    Write a triangle mesh as binary STL, see encode_stl for the parameters
+
+
+    Returns
+    ----------
+    size of the file in bytes : int
+    """
+    with open(file_name, mode='wb') as f:
+        if np is not None:
+            records = _triangles(coordinates, indices, scale)
+            f.write(_header(header, len(records)))
+            f.write(memoryview(records).cast('B'))  # no copy of the triangles
+            return 84 + records.nbytes
+        if not isinstance(indices, list):
+            indices = list(indices)
+        data = _encode_python(coordinates, indices, scale)
+        f.write(_header(header, len(indices) // 3))
+        f.write(data)
+        return 84 + len(data)
+
+
+def read_stl(file_name):
+    """
+    Read a binary STL
+
+
+    Returns
+    ----------
+    coordinates: list or numpy array
+        corners of the n triangles, one node per corner: flat list or 
+        (3 * n, 3) array with NumPy
+    indices: list or numpy array
+        node indices: flat list or (n, 3) array with NumPy
+    """
+    with open(file_name, mode='rb') as f:
+        return decode_stl(f.read())
+
+
+def decode_stl(data):
+    """
+    read_stl of the content of a binary STL
+    """
+    n_triangles = _COUNT.unpack_from(data, 80)[0]
+    if np is not None:
+        records = np.frombuffer(data, dtype=STL_DTYPE, count=n_triangles, offset=84)
+        coordinates = records['vertices'].reshape(-1, 3).astype(np.float64)
+        return coordinates, np.arange(3 * n_triangles).reshape(-1, 3)
+    coordinates = []
+    for triangle in _TRIANGLE.iter_unpack(data[84:84 + 50 * n_triangles]):
+        coordinates.extend(triangle[3:12])
+    return coordinates, list(range(3 * n_triangles))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Exports as resumable steps.
+
+A step generator does a small piece of work between two yields. It yields
+
+- (stage, done, total) to report its progress, e.g. after each link
+- a concurrent.futures.Future of work started with in_background; it is
+  resumed with the result of the future, or the exception of the future is
+  raised at the yield
+
+and returns its result. run_steps drives it to the end on the calling
+thread. FusionTask drives it from a Fusion custom event: the Fusion API is
+only called on the main thread, between two steps the UI stays responsive,
+the ProgressDialog shows the stage, and Cancel closes the generator, so its
+finally blocks run, between two links.
+"""
+
+import adsk, adsk.core
+import time, traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_pool = None
+_handlers = []  # Fusion drops the event handlers nobody references
+
+
+def in_background(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on the background thread. Only for work
+    without Fusion API calls: xml generation, mesh encoding, file writes.
+
+    Returns
+    ----------
+    future: concurrent.futures.Future
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fusion2urdf')
+    return _pool.submit(func, *args, **kwargs)
+
+
+def run_steps(steps, progress=None):
+    """
+    Drive a step generator to the end on the calling thread
+
+
+    Parameters
+    ----------
+    steps: generator
+    progress: function
+        progress(stage, done, total) for each progress step
+
+    Returns
+    ----------
+    the result of the generator
+    """
+    value, error = None, None
+    while True:
+        try:
+            item = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        if isinstance(item, Future):
+            try:
+                value = item.result()
+            except Exception as e:
+                error = e
+        elif progress is not None:
+            progress(*item)
+
+
+class _Handler(adsk.core.CustomEventHandler):
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def notify(self, args):
+        self.task.resume()
+
+
+class FusionTask:
+    EVENT_ID = 'fusion2urdf_step'
+    SLICE = 0.1  # seconds of steps between two UI updates
+
+    def __init__(self, app, steps, title, on_done):
+        """
+        Run a step generator on the main thread of Fusion without blocking it.
+        The script has to call adsk.autoTerminate(False) to stay alive.
+
+
+        Parameters
+        ----------
+        app: adsk.core.Application
+        steps: generator
+        title: str
+            title of the ProgressDialog
+        on_done: function
+            on_done(result, error) on the main thread at the end: the result
+            of the generator, or None and a message if it failed or was
+            canceled
+        """
+        self.app = app
+        self.steps = steps
+        self.on_done = on_done
+        self.waiting = None
+        self.stage = None
+        self.event = app.registerCustomEvent(self.EVENT_ID)
+        handler = _Handler(self)
+        self.event.add(handler)
+        _handlers.append(handler)
+        self.handler = handler
+        self.dialog = app.userInterface.createProgressDialog()
+        self.dialog.isCancelButtonShown = True
+        self.dialog.show(title, '', 0, 1)
+
+    def start(self):
+        self.app.fireCustomEvent(self.EVENT_ID)
+
+    def _next(self):
+        # fired from the worker thread, handled on the main thread
+        self.app.fireCustomEvent(self.EVENT_ID)
+
+    def resume(self):
+        """
+        Run steps for up to SLICE seconds, then give the UI back
+        """
+        try:
+            if self.dialog.wasCancelled:
+                self.steps.close()
+                return self._finish(None, 'Canceled')
+            deadline = time.perf_counter() + self.SLICE
+            while True:
+                value, error = None, None
+                if self.waiting is not None:
+                    if not self.waiting.done():
+                        return  # resumed by the done callback
+                    try:
+                        value = self.waiting.result()
+                    except Exception as e:
+                        error = e
+                    self.waiting = None
+                item = self.steps.throw(error) if error is not None else self.steps.send(value)
+                if isinstance(item, Future):
+                    self.waiting = item
+                    item.add_done_callback(lambda _: self._next())
+                    return
+                self._progress(*item)
+                if self.dialog.wasCancelled or time.perf_counter() >= deadline:
+                    break
+        except StopIteration as stop:
+            return self._finish(stop.value, None)
+        except Exception:
+            self.steps.close()
+            return self._finish(None, 'Failed:\n{}'.format(traceback.format_exc()))
+        self.app.fireCustomEvent(self.EVENT_ID)
+
+    def _progress(self, stage, done, total):
+        if stage != self.stage:
+            self.stage = stage
+            self.dialog.maximumValue = max(total, 1)
+            self.dialog.message = stage + ' %v/%m'
+        self.dialog.progressValue = done
+
+    def _finish(self, result, error):
+        self.dialog.hide()
+        self.event.remove(self.handler)
+        _handlers.remove(self.handler)
+        self.app.unregisterCustomEvent(self.EVENT_ID)
+        self.on_done(result, error)
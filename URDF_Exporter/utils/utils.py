@@ -6,14 +6,21 @@ Created on Sun May 12 19:15:34 2019
 """
 
 import adsk, adsk.core, adsk.fusion
-import os.path, re
-from xml.etree import ElementTree
-from xml.dom import minidom
+from .names import link_names
 
 
-def copy_occs(root):    
+def copy_occs(root, skip=None):    
     """    
     duplicate all the components
+    
+    
+    Parameters
+    ----------
+    root: adsk.fusion.Design.cast(product)
+        Root component
+    skip: set
+        names of the occurrences not to duplicate, e.g. because their mesh 
+        is up to date. They are not exported either.
     """    
     def copy_body(allOccs, occs):
         """    
@@ -31,17 +38,20 @@ def copy_occs(root):
             occs.component.name = 'old_component'
             new_occs.component.name = 'base_link'
         else:
-            new_occs.component.name = re.sub('[ :()]', '_', occs.name)
+            new_occs.component.name = names[occs.name]
         new_occs = allOccs[-1]
         for i in range(bodies.count):
             body = bodies.item(i)
             body.copyToComponent(new_occs)
     
     allOccs = root.occurrences
+    names = link_names(allOccs)  # the component names are the link names
     oldOccs = []
     coppy_list = [occs for occs in allOccs]
     for occs in coppy_list:
-        if occs.bRepBodies.count > 0:
+        if skip and occs.name in skip:
+            oldOccs.append(occs)
+        elif occs.bRepBodies.count > 0:
             copy_body(allOccs, occs)
             oldOccs.append(occs)
 
@@ -49,44 +59,6 @@ def copy_occs(root):
         occs.component.name = 'old_component'
 
 
-def export_stl(design, save_dir, components):  
-    """
-    export stl files into "sace_dir/"
-    
-    
-    Parameters
-    ----------
-    design: adsk.fusion.Design.cast(product)
-    save_dir: str
-        directory path to save
-    components: design.allComponents
-    """
-          
-    # create a single exportManager instance
-    exportMgr = design.exportManager
-    # get the script location
-    try: os.mkdir(save_dir + '/meshes')
-    except: pass
-    scriptDir = save_dir + '/meshes'  
-    # export the occurrence one by one in the component to a specified file
-    for component in components:
-        allOccus = component.allOccurrences
-        for occ in allOccus:
-            if 'old_component' not in occ.component.name:
-                try:
-                    print(occ.component.name)
-                    fileName = scriptDir + "/" + occ.component.name              
-                    # create stl exportOptions
-                    stlExportOptions = exportMgr.createSTLExportOptions(occ, fileName)
-                    stlExportOptions.sendToPrintUtility = False
-                    stlExportOptions.isBinaryFormat = True
-                    # options are .MeshRefinementLow .MeshRefinementMedium .MeshRefinementHigh
-                    stlExportOptions.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementLow
-                    exportMgr.execute(stlExportOptions)
-                except:
-                    print('Component ' + occ.component.name + 'has something wrong.')
-                
-
 def file_dialog(ui):     
     """
     display the dialog to save the file
@@ -100,45 +72,3 @@ def file_dialog(ui):
     if dlgResult == adsk.core.DialogResults.DialogOK:
         return folderDlg.folder
     return False
-
-
-def origin2center_of_mass(inertia, center_of_mass, mass):
-    """
-    convert the moment of the inertia about the world coordinate into 
-    that about center of mass coordinate
-
-
-    Parameters
-    ----------
-    moment of inertia about the world coordinate:  [xx, yy, zz, xy, yz, xz]
-    center_of_mass: [x, y, z]
-    
-    
-    Returns
-    ----------
-    moment of inertia about center of mass : [xx, yy, zz, xy, yz, xz]
-    """
-    x = center_of_mass[0]
-    y = center_of_mass[1]
-    z = center_of_mass[2]
-    translation_matrix = [y**2+z**2, x**2+z**2, x**2+y**2,
-                         -x*y, -y*z, -x*z]
-    return [ i - mass*t for i, t in zip(inertia, translation_matrix)]
-
-
-def prettify(elem):
-    """
-    Return a pretty-printed XML string for the Element.
-    Parameters
-    ----------
-    elem : xml.etree.ElementTree.Element
-    
-    
-    Returns
-    ----------
-    pretified xml : str
-    """
-    rough_string = ElementTree.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
-
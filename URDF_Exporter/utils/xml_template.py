@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled xml fragments.
+
+A fragment with a fixed structure, like a link or a joint of the urdf, is
+written once as an xml_writer tuple tree whose variable attribute values and
+texts are slot(name). Template formats it once into static text and slot
+positions; render then only escapes the values and joins them with the
+static text.
+
+    MASS = Template(('mass', {'value': slot('mass')}))
+    MASS.render({'mass': 0.5})  # '<mass value="0.5"/>\\n'
+
+The text is the one xml_writer.to_xml gives for the same tree with the values
+in place.
+"""
+
+from . import xml_writer
+
+_MARK = '\0'  # can not appear in xml, so it delimits the slots safely
+
+
+def slot(name):
+    """
+    Placeholder of the value `name` in the tree given to Template
+    """
+    return _MARK + name + _MARK
+
+
+class Template:
+    def __init__(self, node, indent='  ', level=0):
+        """
+        Parameters
+        ----------
+        node: tuple
+            (tag, attrib, children or text) as for xml_writer.iter_xml, with
+            slot(name) in place of the attribute values and texts that change
+        indent: str
+        level: int
+            see xml_writer.iter_xml
+
+        Attributes
+        ----------
+        slots: tuple
+            name of each slot in document order, a name can appear several times
+        """
+        parts = xml_writer.to_xml(node, indent, level).split(_MARK)
+        static, self.slots = parts[0::2], tuple(parts[1::2])
+        self._format = '%s'.join([text.replace('%', '%%') for text in static])
+
+    def render(self, values):
+        """
+        Fragment with the values in the slots
+
+
+        Parameters
+        ----------
+        values: dict
+            {slot name: value}, values are converted by str and escaped
+
+        Returns
+        ----------
+        xml : str
+        """
+        escape = xml_writer.escape
+        return self._format % tuple([escape(values[name]) for name in self.slots])
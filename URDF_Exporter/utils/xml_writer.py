@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Direct indenting xml serializer.
+
+Produces the same text as minidom's toprettyxml(indent="  ") on the output of
+ElementTree.tostring, without the serialize -> parse -> serialize round-trip.
+"""
+
+XML_DECLARATION = '<?xml version="1.0" ?>\n'
+
+
+def escape(value):
+    """
+    Escape character data or an attribute value, like minidom does
+    """
+    if not isinstance(value, str):
+        value = str(value)
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '<' in value:
+        value = value.replace('<', '&lt;')
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '>' in value:
+        value = value.replace('>', '&gt;')
+    return value
+
+
+def _node(node):
+    """
+    Return (tag, attrib items, text, children) of an Element or of a plain
+    tuple (tag, attrib[, children or text]).
+
+    children is a list of (child, tail) pairs.
+    """
+    if isinstance(node, tuple):
+        tag = node[0]
+        attrib = node[1] if len(node) > 1 and node[1] else ()
+        body = node[2] if len(node) > 2 else None
+        if isinstance(attrib, dict):
+            attrib = attrib.items()
+        if isinstance(body, str):
+            return tag, attrib, body, ()
+        return tag, attrib, None, [(child, None) for child in (body or ())]
+    return node.tag, node.attrib.items(), node.text, [(child, child.tail) for child in node]
+
+
+def iter_xml(node, indent='  ', level=0):
+    """
+    Yield the pretty-printed xml of node piece by piece
+
+
+    Parameters
+    ----------
+    node : xml.etree.ElementTree.Element or tuple
+        either an Element or a plain tuple (tag, attrib, children) where
+        attrib is a dict or a sequence of (name, value) and children is a
+        list of tuples or the text of the element
+    indent : str
+        indentation added at each level
+    level : int
+        starting indentation level
+
+    Note
+    ----------
+    The attribute order is the insertion order, like ElementTree.tostring.
+    """
+    stack = [(node, level)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        item, depth = pop()
+        if depth is None:
+            # closing tag or text node already formatted
+            yield item
+            continue
+        tag, attrib, text, children = _node(item)
+        pad = indent * depth
+        head = pad + '<' + tag + ''.join(
+            [' ' + k + '="' + escape(v) + '"' for k, v in attrib])
+        if not children:
+            if text:
+                yield head + '>' + escape(text) + '</' + tag + '>\n'
+            else:
+                yield head + '/>\n'
+            continue
+
+        yield head + '>\n'
+        child_pad = pad + indent
+        # push in reverse order so that the nodes come out in document order
+        push((pad + '</' + tag + '>\n', None))
+        for child, tail in reversed(children):
+            if tail:
+                push((child_pad + escape(tail) + '\n', None))
+            push((child, depth + 1))
+        if text:
+            push((child_pad + escape(text) + '\n', None))
+
+
+def to_xml(node, indent='  ', level=0):
+    """
+    Return the pretty-printed xml of node without xml declaration
+
+
+    Parameters
+    ----------
+    node : xml.etree.ElementTree.Element or tuple
+
+
+    Returns
+    ----------
+    pretified xml : str
+    """
+    return ''.join(iter_xml(node, indent, level))
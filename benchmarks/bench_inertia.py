@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of the inertial math of all the links of a synthetic robot.
+
+Compares the per-link path (the parallel-axis shift and the center of mass
+list comprehension of Write.iter_links, one link at a time) with the batched
+functions of utils/inertia.py, and times the validity checks. The batched
+functions loop in Python without NumPy or with --python.
+
+    python benchmarks/bench_inertia.py [n_links] [--python]
+"""
+
+import os, sys, time, random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter import offline
+offline.activate()  # utils imports adsk
+from URDF_Exporter.utils import inertia
+
+
+def make_links(n_links, seed=0):
+    """
+    moments about the world, centers of mass, masses and joint origins of
+    n_links links
+    """
+    rng = random.Random(seed)
+    moments, centers_of_mass, masses, origins = [], [], [], []
+    for _ in range(n_links):
+        mass = rng.uniform(0.1, 2.0)
+        x, y, z = (rng.uniform(-0.5, 0.5) for _ in range(3))
+        w, h, d = (rng.uniform(0.01, 0.3) for _ in range(3))
+        a, b, c = mass*(h**2+d**2)/12, mass*(w**2+d**2)/12, mass*(w**2+h**2)/12
+        # inertia of a box about its center of mass moved to the world
+        moments.append([a + mass*(y**2+z**2), b + mass*(x**2+z**2), c + mass*(x**2+y**2),
+                        -mass*x*y, -mass*y*z, -mass*x*z])
+        centers_of_mass.append([x, y, z])
+        masses.append(mass)
+        origins.append([rng.uniform(-0.5, 0.5) for _ in range(3)])
+    return moments, centers_of_mass, masses, origins
+
+
+def per_link(moments, centers_of_mass, masses, origins):
+    inertias = []
+    for m, (x, y, z), mass in zip(moments, centers_of_mass, masses):
+        translation = [y**2+z**2, x**2+z**2, x**2+y**2, -x*y, -y*z, -x*z]
+        inertias.append([i - mass*t for i, t in zip(m, translation)])
+    relative = [[i-j for i, j in zip(c, o)] for c, o in zip(centers_of_mass, origins)]
+    return inertias, relative
+
+
+def batched(moments, centers_of_mass, masses, origins):
+    return (inertia.center_of_mass_inertia(moments, centers_of_mass, masses),
+            inertia.relative_centers_of_mass(centers_of_mass, origins))
+
+
+def best_of(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv):
+    n_links = int(next((a for a in argv if not a.startswith('--')), 10000))
+    if '--python' in argv:
+        inertia.np = None
+    links = make_links(n_links)
+    names = list(range(n_links))
+    engine = 'numpy' if inertia.np is not None else 'python'
+
+    reference = best_of(per_link, *links)
+    fast = best_of(batched, *links)
+    shifted = batched(*links)[0]
+    check = best_of(inertia.validate, names, shifted)
+    invalid = inertia.validate(names, shifted)
+
+    print('{:,d} links'.format(n_links))
+    print('per-link        {:8.2f} ms'.format(reference * 1e3))
+    print('batched ({:<6s}) {:8.2f} ms  x{:.1f}'.format(engine, fast * 1e3, reference / fast))
+    print('validate        {:8.2f} ms  {} invalid'.format(check * 1e3, len(invalid)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
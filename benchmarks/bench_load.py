@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+How fast a generated package loads: urdf parse time, mesh load time and size.
+
+Measures an output directory of the exporter (the save_dir holding
+robot_name.urdf and meshes/), or, without one, exports a corpus of synthetic
+robots of growing size (offline/synthetic.py) with each export option
+through offline.export and measures every package. With pybullet installed, the urdf is also loaded
+with loadURDF in p.DIRECT mode and stepped, unless its meshes are glb or
+gzip files pybullet does not read.
+
+    python benchmarks/bench_load.py [save_dir] [--links 10,100,400] [--triangles 500]
+                                    [--save baseline.json] [--compare baseline.json]
+
+--save writes the measures of the corpus, --compare fails (exit status 1)
+when the mesh size, file size or link count of a robot and option grew more
+than TOLERANCE over the saved ones. The times are printed, never compared:
+they depend on the machine.
+"""
+
+import os, sys, json, time, tempfile
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter import offline
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import mesh_formats
+
+try:
+    import pybullet
+except ImportError:
+    pybullet = None
+
+# export options of offline.export measured on every robot of the corpus
+OPTIONS = {
+    'default': {},
+    'meters': {'meters': True},
+    'dedup': {'dedup': True},
+    'visual_500': {'visual_triangles': 500},
+    'collision_hull': {'collision_hull': True},
+    'glb': {'mesh_format': 'glb'},
+    'glb_quantized': {'mesh_format': 'glb', 'quantize': True},
+    'dae': {'mesh_format': 'dae'},
+    'stl_gzip': {'compress': True},
+}
+SIZES = [10, 100, 400]  # links of the corpus robots
+TRIANGLES = 500  # per link mesh
+TOLERANCE = 0.02  # relative growth of the compared measures
+COMPARED = ('links', 'joints', 'meshes', 'mesh_bytes', 'total_bytes')
+STEPS = 240  # pybullet steps
+SIMULATED = ('.stl', '.obj', '.dae')  # mesh files pybullet loads
+
+
+def best_of(func, repeat=3):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def mesh_files(root, save_dir):
+    """
+    distinct files of the mesh filenames of the urdf, package://package_name/
+    is the package directory save_dir
+    """
+    files = []
+    for mesh in root.iter('mesh'):
+        name = mesh.get('filename')
+        if name.startswith('package://'):
+            name = name[len('package://'):].split('/', 1)[1]
+        files.append(os.path.join(save_dir, name))
+    return sorted(set(files))
+
+
+def measure(save_dir):
+    """
+    Load measures of an exported package
+
+
+    Returns
+    ----------
+    measures: dict
+        links, joints, meshes, mesh_bytes and total_bytes, parse and
+        mesh_load (s), and with pybullet load_urdf (s) and steps_per_second
+    """
+    urdf = [f for f in os.listdir(save_dir) if f.endswith('.urdf')][0]
+    urdf = os.path.join(save_dir, urdf)
+    parse, tree = best_of(lambda: ElementTree.parse(urdf))
+    root = tree.getroot()
+    files = mesh_files(root, save_dir)
+    mesh_load, _ = best_of(lambda: [mesh_formats.read_mesh(f) for f in files])
+    total = 0
+    for directory, _, names in os.walk(save_dir):
+        total += sum(os.path.getsize(os.path.join(directory, n)) for n in names)
+    measures = {'links': len(root.findall('link')), 'joints': len(root.findall('joint')),
+                'meshes': len(files), 'mesh_bytes': sum(os.path.getsize(f) for f in files),
+                'total_bytes': total, 'parse': parse, 'mesh_load': mesh_load}
+    if pybullet is not None and all(f.endswith(SIMULATED) for f in files):
+        measures.update(simulate(urdf, save_dir))
+    return measures
+
+
+def simulate(urdf, save_dir):
+    client = pybullet.connect(pybullet.DIRECT)
+    try:
+        pybullet.setAdditionalSearchPath(save_dir, physicsClientId=client)
+        start = time.perf_counter()
+        pybullet.loadURDF(urdf, flags=pybullet.URDF_USE_INERTIA_FROM_FILE, physicsClientId=client)
+        load = time.perf_counter() - start
+        pybullet.setGravity(0, 0, -10, physicsClientId=client)
+        start = time.perf_counter()
+        for _ in range(STEPS):
+            pybullet.stepSimulation(physicsClientId=client)
+        steps = STEPS / (time.perf_counter() - start)
+    finally:
+        pybullet.disconnect(client)
+    return {'load_urdf': load, 'steps_per_second': steps}
+
+
+def row(label, m):
+    line = '{:<24s} {:>6d} {:>6d} {:>9.1f} {:>9.1f} {:>9.2f} {:>9.2f}'.format(
+        label, m['links'], m['meshes'], m['mesh_bytes'] / 1e3, m['total_bytes'] / 1e3,
+        m['parse'] * 1e3, m['mesh_load'] * 1e3)
+    if 'load_urdf' in m:
+        line += ' {:>9.2f} {:>9.0f}'.format(m['load_urdf'] * 1e3, m['steps_per_second'])
+    return line
+
+
+def header():
+    line = '{:<24s} {:>6s} {:>6s} {:>9s} {:>9s} {:>9s} {:>9s}'.format(
+        'robot', 'links', 'meshes', 'mesh kB', 'total kB', 'parse ms', 'load ms')
+    if pybullet is not None:
+        line += ' {:>9s} {:>9s}'.format('urdf ms', 'steps/s')
+    return line
+
+
+def run_corpus(sizes, n_triangles):
+    """
+    {"n_links/option": measures} of the synthetic robots exported with each
+    option of OPTIONS
+    """
+    work_dir = tempfile.mkdtemp(prefix='bench_load')
+    results = {}
+    print(header())
+    for n_links in sizes:
+        path = os.path.join(work_dir, 'chain{}.json'.format(n_links))
+        with open(path, 'w') as f:
+            json.dump(synthetic.synthetic_design(n_links, 'chain', n_triangles=n_triangles), f)
+        for option, kwargs in OPTIONS.items():
+            output_dir = os.path.join(work_dir, option)
+            os.makedirs(output_dir, exist_ok=True)
+            save_dir, msg = offline.export(path, output_dir, **kwargs)
+            if save_dir is None:
+                raise RuntimeError(msg)
+            key = '{}/{}'.format(n_links, option)
+            results[key] = measure(save_dir)
+            print(row(key, results[key]))
+    return results
+
+
+def compare(results, baseline):
+    """
+    regressions of results over baseline, as lines
+    """
+    regressions = []
+    for key, measures in sorted(results.items()):
+        if key not in baseline:
+            continue
+        for field in COMPARED:
+            before, after = baseline[key][field], measures[field]
+            if after > before * (1 + TOLERANCE):
+                regressions.append('{} {}: {} -> {}'.format(key, field, before, after))
+    return regressions
+
+
+def main(argv):
+    def option(flag, default=None):
+        return argv[argv.index(flag) + 1] if flag in argv else default
+
+    values = {option(flag) for flag in ('--links', '--triangles', '--save', '--compare')}
+    save_dirs = [a for a in argv if not a.startswith('--') and a not in values]
+    if save_dirs:
+        print(header())
+        for save_dir in save_dirs:
+            print(row(os.path.basename(os.path.normpath(save_dir)), measure(save_dir)))
+        return 0
+    sizes = [int(n) for n in option('--links', ','.join(map(str, SIZES))).split(',')]
+    results = run_corpus(sizes, int(option('--triangles', TRIANGLES)))
+    if option('--save'):
+        with open(option('--save'), 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if option('--compare'):
+        with open(option('--compare')) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print('regression ' + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Memory and read cost of joints_dict and inertial_dict.
+
+Compares the former {name: dict} entries with the slotted records of
+core/Records.py on a synthetic robot: the memory held by the entries and the
+time to gather the columns iter_links passes to utils/inertia.py.
+
+    python benchmarks/bench_records.py [n_links]
+"""
+
+import os, sys, time, random, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter.core.Records import JointRecord, InertialRecord, column
+
+
+def make_fields(n_links, seed=0):
+    rng = random.Random(seed)
+    return [('link_{}'.format(i), 'link_{}'.format(i - 1) if i else 'base_link',
+             [rng.uniform(-1, 1) for _ in range(3)], rng.uniform(0.1, 2.0),
+             [rng.uniform(-1, 1) for _ in range(3)], [rng.uniform(0, 1e-3) for _ in range(6)])
+            for i in range(n_links)]
+
+
+def as_dicts(fields):
+    joints, inertials = {}, {}
+    for name, parent, xyz, mass, com, moments in fields:
+        joints['joint_' + name] = {'type': 'revolute', 'axis': [0, 0, 1], 'upper_limit': 1.0,
+                                   'lower_limit': -1.0, 'parent': parent, 'child': name, 'xyz': xyz}
+        inertials[name] = {'name': name, 'mass': mass, 'center_of_mass': com, 'inertia': moments}
+    return joints, inertials
+
+
+def as_records(fields):
+    joints, inertials = {}, {}
+    for name, parent, xyz, mass, com, moments in fields:
+        joints['joint_' + name] = JointRecord('revolute', parent, name, xyz, [0, 0, 1], 1.0, -1.0)
+        inertials[name] = InertialRecord(mass, com, moments)
+    return joints, inertials
+
+
+def gather_dicts(joints, inertials):
+    children = [joints[j]['child'] for j in joints]
+    return ([inertials[name]['center_of_mass'] for name in children],
+            [joints[j]['xyz'] for j in joints], [inertials[name]['mass'] for name in children])
+
+
+def gather_records(joints, inertials):
+    records = list(joints.values())
+    children = [inertials[joint.child] for joint in records]
+    return column(children, 'center_of_mass'), column(records, 'xyz'), column(children, 'mass')
+
+
+def memory(build, fields):
+    tracemalloc.start()
+    result = build(fields)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def best_of(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv):
+    n_links = int(argv[0]) if argv else 100000
+    fields = make_fields(n_links)
+    # the field values are shared, only the containers are measured
+    dict_size, dicts = memory(as_dicts, fields)
+    record_size, records = memory(as_records, fields)
+    assert gather_dicts(*dicts) == gather_records(*records)
+
+    print('{:,d} links'.format(n_links))
+    print('dicts    {:8.1f} MB  {:6.0f} B/link  gather {:7.2f} ms'.format(
+        dict_size / 1e6, dict_size / n_links, best_of(gather_dicts, *dicts) * 1e3))
+    print('records  {:8.1f} MB  {:6.0f} B/link  gather {:7.2f} ms'.format(
+        record_size / 1e6, record_size / n_links, best_of(gather_records, *records) * 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
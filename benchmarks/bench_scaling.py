@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Time and peak memory of each stage of the robot model and urdf generation,
+from 10 to 100k links.
+
+Records the synthetic designs of offline/synthetic.py into a snapshot and
+replays it like the export does (core/Snapshot.py), then runs 
+make_joints_dict, make_inertial_dict, the joint tree and write_urdf on the
+replayed design, for each topology and size.
+The time of a stage is the best of REPEAT runs, each after a gc.collect(),
+its peak memory (tracemalloc) is measured in another run. The scaling
+exponent of a stage is the slope of log(time) over log(links) between the
+smallest size with at least MIN_LINKS links and the largest size: 1 for a
+linear stage, 2 for a quadratic one. The exit status is 1 when a stage is
+above MAX_EXPONENT, which leaves room for the cache misses of large dicts.
+
+    python benchmarks/bench_scaling.py [--links 10,100,1000,10000,100000]
+                                       [--topology chain,tree,fan]
+"""
+
+import os, sys, gc, math, time, shutil, tempfile, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter import offline
+offline.activate()  # core imports adsk
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.core import Joint, Link, Snapshot, Tree, Write
+from URDF_Exporter.utils.names import link_names
+
+SIZES = [10, 100, 1000, 10000]
+MIN_LINKS = 1000  # smaller robots are dominated by fixed costs
+MAX_EXPONENT = 1.3  # of a linear stage
+REPEAT = 3  # timed runs of each stage, the best is kept
+MSG = 'Successfully create URDF file'
+
+
+def stages(design, save_dir):
+    """
+    (name, function) of the stages, each function takes the result of the
+    previous stages
+    """
+    def record_design(state):
+        state['snapshot'] = Snapshot.record_design(design)
+
+    def replay_design(state):
+        # the replay only allocates objects that stay alive, the full collections
+        # its allocations trigger scan the whole heap of the benchmark for nothing
+        gc.disable()
+        try:
+            state['root'] = Snapshot.replay_design(state['snapshot']).rootComponent
+        finally:
+            gc.enable()
+
+    def names(state):
+        state['names'] = link_names(state['root'].occurrences)
+
+    def joints_dict(state):
+        state['joints'], msg = Joint.make_joints_dict(state['root'], MSG, state['names'])
+        assert msg == MSG, msg
+
+    def inertial_dict(state):
+        state['inertials'], msg = Link.make_inertial_dict(state['root'], MSG, state['names'])
+        assert msg == MSG, msg
+
+    def joint_tree(state):
+        tree = Tree.JointTree(state['joints'], state['inertials'])
+        assert not tree.errors, tree.errors
+        state['ordered'] = tree.ordered(state['joints'])
+
+    def write_urdf(state):
+        Write.write_urdf(state['ordered'], {}, state['inertials'], 'bench', save_dir, 'bench')
+
+    return [('record_design', record_design), ('replay_design', replay_design), ('names', names),
+            ('make_joints_dict', joints_dict), ('make_inertial_dict', inertial_dict),
+            ('joint tree', joint_tree), ('write_urdf', write_urdf)]
+
+
+def measure(n_links, topology, save_dir):
+    """
+    {stage: (seconds, peak bytes)} for one synthetic robot
+    """
+    design = synthetic.make_design(synthetic.synthetic_design(n_links, topology))
+    results = {}
+    timed, traced = {}, {}
+    for name, stage in stages(design, save_dir):
+        best = float('inf')
+        for _ in range(REPEAT):
+            gc.collect()  # the garbage of the previous stages is not charged to this one
+            start = time.perf_counter()
+            stage(timed)
+            best = min(best, time.perf_counter() - start)
+        results[name] = [best]
+    for name, stage in stages(design, save_dir):
+        tracemalloc.start()
+        stage(traced)
+        results[name].append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return results
+
+
+def exponents(per_size):
+    """
+    {stage: scaling exponent} between the smallest size with at least
+    MIN_LINKS links and the largest size
+    """
+    sizes = sorted(n for n in per_size if n >= MIN_LINKS)
+    if len(sizes) < 2:
+        return {}
+    small, large = per_size[sizes[0]], per_size[sizes[-1]]
+    return {stage: math.log(large[stage][0] / small[stage][0]) / math.log(sizes[-1] / sizes[0])
+            for stage in small}
+
+
+def main(argv):
+    def option(flag, default):
+        return argv[argv.index(flag) + 1] if flag in argv else default
+
+    sizes = [int(n) for n in option('--links', ','.join(map(str, SIZES))).split(',')]
+    topologies = option('--topology', ','.join(synthetic.TOPOLOGIES)).split(',')
+    save_dir = tempfile.mkdtemp(prefix='bench_scaling')
+    nonlinear = []
+    try:
+        for topology in topologies:
+            per_size = {}
+            print('{:<6s} {:>8s}  {:<20s} {:>10s} {:>10s} {:>10s}'.format(
+                topology, 'links', 'stage', 'ms', 'us/link', 'peak MB'))
+            for n_links in sizes:
+                per_size[n_links] = measure(n_links, topology, save_dir)
+                for stage, (seconds, peak) in per_size[n_links].items():
+                    print('{:<6s} {:>8,d}  {:<20s} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                        '', n_links, stage, seconds * 1e3, seconds / n_links * 1e6, peak / 1e6))
+            for stage, exponent in exponents(per_size).items():
+                flag = 'ok' if exponent <= MAX_EXPONENT else 'NONLINEAR'
+                print('{:<6s} {:>8s}  {:<20s} time ~ links^{:.2f} {}'.format('', '', stage, exponent, flag))
+                if exponent > MAX_EXPONENT:
+                    nonlinear.append('{} {}'.format(topology, stage))
+            print()
+    finally:
+        shutil.rmtree(save_dir)
+    if nonlinear:
+        print('nonlinear: ' + ', '.join(nonlinear))
+    return 1 if nonlinear else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
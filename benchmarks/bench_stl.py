@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Binary STL write throughput of utils/stl_writer.py in MB/s.
+
+Uses the NumPy encoder when NumPy is installed, and the pure-Python fallback
+(on a smaller mesh unless --full) otherwise or with --python.
+
+    python benchmarks/bench_stl.py [million_triangles] [--python] [--full]
+"""
+
+import os, sys, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter.utils import stl_writer
+
+
+def grid_mesh(n_triangles):
+    """
+    flat coordinates and indices of a wavy grid with about n_triangles
+    """
+    side = max(2, int((n_triangles / 2) ** 0.5) + 1)
+    if stl_writer.np is not None:
+        np = stl_writer.np
+        x, y = np.meshgrid(np.arange(side, dtype=np.float64), np.arange(side, dtype=np.float64))
+        z = np.sin(x * 0.1) * np.cos(y * 0.1)
+        coordinates = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+        i = np.arange(side - 1)
+        a = (i[:, None] * side + i[None, :]).ravel()
+        quads = np.stack([a, a + 1, a + side, a + 1, a + side + 1, a + side], axis=1)
+        return coordinates, quads.reshape(-1, 3)
+    import math
+    coordinates = []
+    for r in range(side):
+        for c in range(side):
+            coordinates += [c, r, math.sin(c * 0.1) * math.cos(r * 0.1)]
+    indices = []
+    for r in range(side - 1):
+        for c in range(side - 1):
+            a = r * side + c
+            indices += [a, a + 1, a + side, a + 1, a + side + 1, a + side]
+    return coordinates, indices
+
+
+def bench(n_triangles, repeat=3):
+    coordinates, indices = grid_mesh(n_triangles)
+    n = len(indices) // 3 if isinstance(indices, list) else len(indices)
+    file_name = os.path.join(tempfile.mkdtemp(), 'bench.stl')
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = stl_writer.write_stl(file_name, coordinates, indices, scale=0.001)
+        best = min(best, time.perf_counter() - start)
+    os.remove(file_name)
+    encoder = 'numpy' if stl_writer.np is not None else 'python'
+    print('{:<7s} {:>10,d} triangles {:8.1f} MB {:8.3f} s {:8.1f} MB/s'.format(
+        encoder, n, size / 1e6, best, size / 1e6 / best))
+
+
+def main(argv):
+    million = [float(a) for a in argv if not a.startswith('--')] or [1.0, 2.0, 4.0]
+    if '--python' in argv:
+        stl_writer.np = None
+    for m in million:
+        n = int(m * 1e6)
+        if stl_writer.np is None and '--full' not in argv:
+            n //= 20  # the pure-Python encoder is far slower
+        bench(n)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
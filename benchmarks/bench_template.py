@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of the link, joint and transmission xml of a synthetic robot.
+
+Compares the ElementTree path (an Element tree per fragment formatted by
+utils/xml_writer.py, as Link and Joint did before) with the precompiled
+templates of utils/xml_template.py that Link and Joint now render. Both give
+the same text, which is checked first.
+
+    python benchmarks/bench_template.py [n_joints]
+"""
+
+import os, sys, time, random
+from xml.etree.ElementTree import Element, SubElement
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter import offline
+offline.activate()  # core imports adsk
+from URDF_Exporter.core import Link, Joint
+from URDF_Exporter.utils import xml_writer
+
+JOINT_TYPES = ['revolute', 'continuous', 'prismatic', 'fixed']
+
+
+def make_robot(n_joints, seed=0):
+    """
+    n_joints + 1 links and n_joints joints with their transmissions
+    """
+    rng = random.Random(seed)
+    links, joints = [], []
+    for i in range(n_joints + 1):
+        name = 'link_{}'.format(i)
+        links.append(Link.Link(name, [round(rng.uniform(-1, 1), 6) for _ in range(3)],
+                               [rng.uniform(-1, 1) for _ in range(3)], 'package://robot/meshes/',
+                               rng.uniform(0.1, 2.0), [rng.uniform(0, 1e-3) for _ in range(6)]))
+    for i in range(n_joints):
+        joints.append(Joint.Joint('joint_{}'.format(i), [round(rng.uniform(-1, 1), 6) for _ in range(3)],
+                                  [0.0, 0.0, 1.0], 'link_{}'.format(i), 'link_{}'.format(i + 1),
+                                  JOINT_TYPES[i % len(JOINT_TYPES)], 1.57, -1.57))
+    return links, joints
+
+
+def element_link(link):
+    root = Element('link')
+    root.attrib = {'name': link.name}
+    inertial = SubElement(root, 'inertial')
+    SubElement(inertial, 'origin').attrib = {
+        'xyz': ' '.join([str(_) for _ in link.center_of_mass]), 'rpy': '0 0 0'}
+    SubElement(inertial, 'mass').attrib = {'value': str(link.mass)}
+    SubElement(inertial, 'inertia').attrib = dict(zip(
+        ['ixx', 'iyy', 'izz', 'ixy', 'iyz', 'ixz'], [str(_) for _ in link.inertia_tensor]))
+    for tag, mesh, scale in (('visual', link.mesh, link.mesh_scale), 
+                             ('collision', link.collision_mesh, link.collision_mesh_scale)):
+        sub = SubElement(root, tag)
+        SubElement(sub, 'origin').attrib = {'xyz': ' '.join([str(_) for _ in link.xyz]), 'rpy': '0 0 0'}
+        SubElement(SubElement(sub, 'geometry'), 'mesh').attrib = {
+            'filename': link.repo + mesh, 'scale': scale}
+        if tag == 'visual':
+            SubElement(sub, 'material').attrib = {'name': 'silver'}
+    return xml_writer.to_xml(root)
+
+
+def element_joint(joint):
+    root = Element('joint')
+    root.attrib = {'name': joint.name, 'type': joint.type}
+    SubElement(root, 'origin').attrib = {'xyz': ' '.join([str(_) for _ in joint.xyz]), 'rpy': '0 0 0'}
+    SubElement(root, 'parent').attrib = {'link': joint.parent}
+    SubElement(root, 'child').attrib = {'link': joint.child}
+    if joint.type in ('revolute', 'continuous', 'prismatic'):
+        SubElement(root, 'axis').attrib = {'xyz': ' '.join([str(_) for _ in joint.axis])}
+    if joint.type in ('revolute', 'prismatic'):
+        SubElement(root, 'limit').attrib = {'upper': str(joint.upper_limit), 'lower': str(joint.lower_limit),
+                                            'effort': '100', 'velocity': '100'}
+    tran = Element('transmission')
+    tran.attrib = {'name': joint.name + '_tran'}
+    SubElement(tran, 'type').text = 'transmission_interface/SimpleTransmission'
+    j = SubElement(tran, 'joint')
+    j.attrib = {'name': joint.name}
+    SubElement(j, 'hardwareInterface').text = 'PositionJointInterface'
+    actuator = SubElement(tran, 'actuator')
+    actuator.attrib = {'name': joint.name + '_actr'}
+    SubElement(actuator, 'hardwareInterface').text = 'PositionJointInterface'
+    SubElement(actuator, 'mechanicalReduction').text = '1'
+    return xml_writer.to_xml(root) + xml_writer.to_xml(tran)
+
+
+def template_link(link):
+    link.make_link_xml()
+    return link.link_xml
+
+
+def template_joint(joint):
+    joint.make_joint_xml()
+    joint.make_transmission_xml()
+    return joint.joint_xml + joint.tran_xml
+
+
+def best_of(func, items, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv):
+    n_joints = int(argv[0]) if argv else 10000
+    links, joints = make_robot(n_joints)
+    for link in links:
+        assert element_link(link) == template_link(link), link.name
+    for joint in joints:
+        assert element_joint(joint) == template_joint(joint), joint.name
+
+    print('{:,d} links, {:,d} joints with transmissions'.format(len(links), len(joints)))
+    rows = [('links', element_link, template_link, links),
+            ('joints', element_joint, template_joint, joints)]
+    total_before = total_after = 0.0
+    for label, before, after, items in rows:
+        t_before, t_after = best_of(before, items), best_of(after, items)
+        total_before += t_before
+        total_after += t_after
+        print('{:<8s} ElementTree {:8.1f} ms  template {:8.1f} ms  x{:.1f}'.format(
+            label, t_before * 1e3, t_after * 1e3, t_before / t_after))
+    print('{:<8s} ElementTree {:8.1f} ms  template {:8.1f} ms  x{:.1f}'.format(
+        'total', total_before * 1e3, total_after * 1e3, total_before / total_after))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
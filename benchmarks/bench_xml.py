@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Per-element cost of the xml formatting used for links, joints and transmissions.
+
+Compares the former ElementTree -> minidom -> split round-trip with the direct
+serializer in utils/xml_writer.py on a synthetic 1,000-joint robot.
+
+    python benchmarks/bench_xml.py [n_joints]
+"""
+
+import os, sys, time
+from xml.etree import ElementTree
+from xml.etree.ElementTree import Element, SubElement
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter.utils import xml_writer
+
+
+def make_link(i):
+    link = Element('link')
+    link.attrib = {'name': 'link_{}'.format(i)}
+    inertial = SubElement(link, 'inertial')
+    SubElement(inertial, 'origin').attrib = {'xyz': '0.01 0.02 {}'.format(i * 1e-3), 'rpy': '0 0 0'}
+    SubElement(inertial, 'mass').attrib = {'value': str(0.5 + i * 1e-3)}
+    SubElement(inertial, 'inertia').attrib = {
+        'ixx': '0.001', 'iyy': '0.002', 'izz': '0.003', 'ixy': '0.0', 'iyz': '0.0', 'ixz': '0.0'}
+    for tag in ('visual', 'collision'):
+        sub = SubElement(link, tag)
+        SubElement(sub, 'origin').attrib = {'xyz': '0 0 {}'.format(-i * 1e-3), 'rpy': '0 0 0'}
+        geometry = SubElement(sub, 'geometry')
+        SubElement(geometry, 'mesh').attrib = {
+            'filename': 'meshes/link_{}.stl'.format(i), 'scale': '0.001 0.001 0.001'}
+        if tag == 'visual':
+            SubElement(sub, 'material').attrib = {'name': 'silver'}
+    return link
+
+
+def make_joint(i):
+    joint = Element('joint')
+    joint.attrib = {'name': 'joint_{}'.format(i), 'type': 'revolute'}
+    SubElement(joint, 'origin').attrib = {'xyz': '0 0 0.1', 'rpy': '0 0 0'}
+    SubElement(joint, 'parent').attrib = {'link': 'link_{}'.format(i)}
+    SubElement(joint, 'child').attrib = {'link': 'link_{}'.format(i + 1)}
+    SubElement(joint, 'axis').attrib = {'xyz': '0 0 1'}
+    SubElement(joint, 'limit').attrib = {
+        'upper': '1.57', 'lower': '-1.57', 'effort': '100', 'velocity': '100'}
+    return joint
+
+
+def make_transmission(i):
+    name = 'joint_{}'.format(i)
+    return ('transmission', {'name': name + '_tran'}, [
+        ('type', None, 'transmission_interface/SimpleTransmission'),
+        ('joint', {'name': name}, [('hardwareInterface', None, 'PositionJointInterface')]),
+        ('actuator', {'name': name + '_actr'}, [
+            ('hardwareInterface', None, 'PositionJointInterface'),
+            ('mechanicalReduction', None, '1')])])
+
+
+def minidom_format(elem):
+    rough_string = ElementTree.tostring(elem, 'utf-8')
+    pretty = minidom.parseString(rough_string).toprettyxml(indent="  ")
+    return "\n".join(pretty.split("\n")[1:])
+
+
+def bench(label, func, elements, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for e in elements:
+            func(e)
+        best = min(best, time.perf_counter() - start)
+    per = best / len(elements) * 1e6
+    print('{:<34s} {:10.1f} us/element {:10.1f} ms total'.format(label, per, best * 1e3))
+    return per
+
+
+def main(n_joints=1000):
+    elements = []
+    for i in range(n_joints + 1):
+        elements.append(make_link(i))
+    for i in range(n_joints):
+        elements.append(make_joint(i))
+    tuples = [make_transmission(i) for i in range(n_joints)]
+    trans = [ElementTree.fromstring(xml_writer.to_xml(t)) for t in tuples]
+
+    for e in elements + trans:
+        assert minidom_format(e) == xml_writer.to_xml(e)
+
+    print('{} links, {} joints, {} transmissions'.format(n_joints + 1, n_joints, n_joints))
+    before = bench('minidom round-trip (Element)', minidom_format, elements + trans)
+    after = bench('xml_writer.to_xml (Element)', xml_writer.to_xml, elements + trans)
+    bench('xml_writer.to_xml (tuple)', xml_writer.to_xml, tuples)
+    print('speedup: {:.1f}x'.format(before / after))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
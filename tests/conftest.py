@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+The tests run offline: `import adsk` resolves to the stand-in of
+URDF_Exporter/offline, the designs are recorded ones (tests/data) or
+synthetic ones (offline/synthetic.py). They pass with and without NumPy.
+
+    python -m pytest -q
+"""
+
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from URDF_Exporter import offline
+offline.activate()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+@pytest.fixture
+def data_dir():
+    return DATA_DIR
+
+
+def flat(values):
+    """
+    flat list of floats of the coordinates or indices read_mesh returns
+    """
+    if hasattr(values, 'ravel'):
+        return [float(v) for v in values.ravel()]
+    return [float(v) for v in values]
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Atomic entries, eviction and locks of the disk cache, see utils/cache.py.
+"""
+
+import os, time, threading
+
+import pytest
+
+from URDF_Exporter.utils import cache
+
+
+def test_put_get(tmp_path):
+    disk = cache.DiskCache(str(tmp_path))
+    assert disk.get(['a', 1]) is None
+    path = disk.put(['a', 1], b'data')
+    assert path == disk.path(['a', 1]) and os.path.isfile(path)
+    assert disk.get(['a', 1]) == b'data'
+    assert (disk.hits, disk.misses) == (1, 1)
+    # no temporary file left next to the entry
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_json(tmp_path):
+    disk = cache.DiskCache(str(tmp_path))
+    disk.put_json('key', {'mass': 1.0})
+    disk.update_json('key', {'volume': 2.0})
+    assert disk.get_json('key') == {'mass': 1.0, 'volume': 2.0}
+    disk.put('broken', b'{')
+    assert disk.get_json('broken') is None
+
+
+def test_readers_never_see_a_partial_entry(tmp_path):
+    disk = cache.DiskCache(str(tmp_path))
+    payloads = [bytes([i]) * (1 << 20) for i in range(2)]
+    disk.put('key', payloads[0])
+    stop = threading.Event()
+    seen, failures = set(), []
+
+    def write(payload):
+        while not stop.is_set():
+            disk.put('key', payload)
+
+    def read():
+        while not stop.is_set():
+            data = disk.get('key')
+            if data not in payloads:
+                failures.append(None if data is None else len(data))
+            else:
+                seen.add(data[0])
+
+    threads = [threading.Thread(target=write, args=(payload,)) for payload in payloads] + \
+        [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.0)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert seen and not failures
+    assert disk.get('key') in payloads
+    entry = disk.path('key')
+    assert os.listdir(os.path.dirname(entry)) == [os.path.basename(entry)]
+
+
+def test_concurrent_updates_are_all_kept(tmp_path):
+    disk = cache.DiskCache(str(tmp_path))
+    threads = [threading.Thread(target=disk.update_json, args=('key', {str(i): i})) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert disk.get_json('key') == {str(i): i for i in range(8)}
+
+
+def test_evict_least_recently_used(tmp_path):
+    disk = cache.DiskCache(str(tmp_path), max_bytes=300)
+    now = disk.now()
+    for i in range(5):
+        path = disk.put(i, b'x' * 100)
+        os.utime(path, (now - 1000 + i, now - 1000 + i))
+    disk.get(0)  # the oldest becomes the most recently used
+    assert disk.evict() == 2
+    assert [disk.get(i) is not None for i in range(5)] == [True, False, False, True, True]
+    assert disk.evict() == 0
+
+
+def test_evict_removes_abandoned_files(tmp_path):
+    disk = cache.DiskCache(str(tmp_path))
+    path = disk.put('key', b'data')
+    old = disk.now() - 2 * cache.STALE_SECONDS
+    temp = os.path.join(os.path.dirname(path), cache._TEMP_PREFIX + 'crashed')
+    lock = os.path.join(str(tmp_path), cache.EVICT_LOCK)
+    for abandoned in (temp, lock):
+        with open(abandoned, 'w') as f:
+            f.write('crashed:1')
+        os.utime(abandoned, (old, old))
+    assert disk.evict() == 0
+    assert not os.path.exists(temp) and not os.path.exists(lock)
+    assert disk.get('key') == b'data'
+
+
+def test_busy_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'LOCK_WAIT', 0.1)
+    disk = cache.DiskCache(str(tmp_path))
+    with disk.lock(os.path.join(str(tmp_path), cache.EVICT_LOCK)):
+        assert disk.evict() == 0
+        with pytest.raises(cache.LockTimeout):
+            with disk.lock(os.path.join(str(tmp_path), cache.EVICT_LOCK)):
+                pass
+    assert not os.path.exists(os.path.join(str(tmp_path), cache.EVICT_LOCK))
+
+
+def test_held_lock_is_refreshed(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'REFRESH_SECONDS', 0.01)
+    disk = cache.DiskCache(str(tmp_path))
+    path = os.path.join(str(tmp_path), 'key.lock')
+    with disk.lock(path):
+        old = disk.now() - 2 * cache.STALE_SECONDS
+        os.utime(path, (old, old))
+        time.sleep(0.2)
+        assert disk.now() - os.path.getmtime(path) < cache.STALE_SECONDS
+
+
+def test_unreachable_cache_is_a_miss(tmp_path):
+    disk = cache.DiskCache(str(tmp_path / 'cache'))
+    with open(os.path.dirname(disk.path('key')), 'w') as f:
+        f.write('a file where the directory of the entry goes')
+    assert disk.put('key', b'data') is None
+    assert disk.get('key') is None
+
+def test_racing_breakers_do_not_both_hold(tmp_path):
+    """
+    two processes judge the same abandoned lock stale at once, only one of
+    them may hold it after breaking it
+    """
+    disk = cache.DiskCache(str(tmp_path))
+    path = os.path.join(str(tmp_path), 'key.lock')
+    for _ in range(20):
+        with open(path, 'w') as f:
+            f.write('crashed:1')
+        old = disk.now() - 2 * cache.STALE_SECONDS
+        os.utime(path, (old, old))
+        judged = threading.Barrier(2)
+        holders, most = [0], [0]
+        guard = threading.Lock()
+
+        def take():
+            first = [True]
+
+            def now():
+                if first[0]:
+                    # both have seen the abandoned lock before either breaks it
+                    first[0] = False
+                    judged.wait(5)
+                return disk.now()
+
+            with cache._Lock(path, threading.current_thread().name, now):
+                with guard:
+                    holders[0] += 1
+                    most[0] = max(most[0], holders[0])
+                time.sleep(0.02)
+                with guard:
+                    holders[0] -= 1
+
+        threads = [threading.Thread(target=take) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert most[0] == 1
+
+
+def test_abandoned_break_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'LOCK_WAIT', 1.0)
+    disk = cache.DiskCache(str(tmp_path))
+    path = os.path.join(str(tmp_path), 'key.lock')
+    old = disk.now() - 2 * cache.STALE_SECONDS
+    # a process crashed while breaking a lock left by another crashed process
+    for abandoned in (path, os.path.join(str(tmp_path), 'key' + cache._BREAK_SUFFIX)):
+        with open(abandoned, 'w') as f:
+            f.write('crashed:1')
+        os.utime(abandoned, (old, old))
+    with disk.lock(path):
+        pass
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.lock')] == []
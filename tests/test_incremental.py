@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+An incremental re-export, or an export from the cache, writes the same files
+as a full export of the same design, and only recalculates what changed.
+"""
+
+import copy, filecmp, os
+
+import pytest
+import adsk.fusion
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.offline import synthetic
+
+OPTIONS = {'profile': False, 'mesh_workers': 2}
+
+
+def edited(data, component='part 3'):
+    """
+    data with the material, mass and size of the body of a component changed,
+    in all its occurrences
+    """
+    data = copy.deepcopy(data)
+    for occ in data['occurrences']:
+        if occ['component'] != component:
+            continue
+        physical = occ['physicalProperties']
+        physical['mass'] *= 2
+        physical['xyzMomentsOfInertia'] = [2 * m for m in physical['xyzMomentsOfInertia']]
+        center = physical['centerOfMass']
+        for body in occ['bodies']:
+            body['material'] = 'Aluminum'
+            mesh = body['mesh']
+            mesh['nodeCoordinates'] = [center[k % 3] + 1.5 * (c - center[k % 3])
+                                       for k, c in enumerate(mesh['nodeCoordinates'])]
+    return data
+
+
+def export(data, output_dir, **options):
+    save_dir, msg = exporter.export_design(synthetic.make_design(data), output_dir, dict(OPTIONS, **options))
+    assert save_dir is not None, msg
+    return save_dir
+
+
+def assert_same_files(first, second):
+    comparison = filecmp.dircmp(first, second, ignore=['.fusion2urdf'])
+    stack = [comparison]
+    while stack:
+        comparison = stack.pop()
+        assert not comparison.left_only and not comparison.right_only, comparison.report()
+        # dircmp compares by stat, compare the content
+        for name in comparison.common_files:
+            assert filecmp.cmp(os.path.join(comparison.left, name), os.path.join(comparison.right, name),
+                               shallow=False), name
+        stack.extend(comparison.subdirs.values())
+
+
+@pytest.fixture
+def calculations(monkeypatch):
+    """
+    {'properties': calls of getPhysicalProperties, 'meshes': tessellations}
+    """
+    counts = {'properties': 0, 'meshes': 0}
+    properties = adsk.fusion.Occurrence.getPhysicalProperties
+    calculate = adsk.fusion.TriangleMeshCalculator.calculate
+
+    def counted_properties(self, *args):
+        counts['properties'] += 1
+        return properties(self, *args)
+
+    def counted_calculate(self):
+        counts['meshes'] += 1
+        return calculate(self)
+
+    monkeypatch.setattr(adsk.fusion.Occurrence, 'getPhysicalProperties', counted_properties)
+    monkeypatch.setattr(adsk.fusion.TriangleMeshCalculator, 'calculate', counted_calculate)
+    return counts
+
+
+@pytest.fixture
+def design():
+    return synthetic.synthetic_design(12, 'tree', n_triangles=60)
+
+
+@pytest.mark.parametrize('options', [{}, {'mesh_format': 'glb'}, {'dedup_meshes': True}, {'xacro': True}])
+def test_incremental_equals_full(design, tmp_path, calculations, options):
+    export(design, str(tmp_path / 'incremental'), incremental=True, **options)
+    calculations.update(properties=0, meshes=0)
+    incremental = export(edited(design), str(tmp_path / 'incremental'), incremental=True, **options)
+    assert calculations['properties'] == 1
+    if not options.get('dedup_meshes'):
+        assert calculations['meshes'] == 1
+    # a full export over the same first export, the files the edit orphans are left in both
+    export(design, str(tmp_path / 'full'), **options)
+    assert_same_files(incremental, export(edited(design), str(tmp_path / 'full'), **options))
+
+
+def test_unchanged_incremental_recalculates_nothing(design, tmp_path, calculations):
+    export(design, str(tmp_path / 'out'), incremental=True)
+    calculations.update(properties=0, meshes=0)
+    export(design, str(tmp_path / 'out'), incremental=True)
+    assert calculations == {'properties': 0, 'meshes': 0}
+
+
+def test_mesh_options_change_reexports(design, tmp_path):
+    export(design, str(tmp_path / 'incremental'), incremental=True)
+    incremental = export(design, str(tmp_path / 'incremental'), incremental=True, meshes_in_meters=True)
+    assert_same_files(incremental, export(design, str(tmp_path / 'full'), meshes_in_meters=True))
+
+
+
+def test_cached_equals_full(design, tmp_path, calculations):
+    cache_dir = str(tmp_path / 'cache')
+    export(design, str(tmp_path / 'first'), cache_dir=cache_dir)
+    calculations.update(properties=0, meshes=0)
+    cached = export(edited(design), str(tmp_path / 'cached'), cache_dir=cache_dir)
+    assert calculations == {'properties': 1, 'meshes': 1}
+    assert_same_files(cached, export(edited(design), str(tmp_path / 'full')))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Physically invalid inertias are reported, valid ones are not, see
+Link.validate_inertial_dict and utils/inertia.py.
+"""
+
+import copy
+
+import pytest
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.core import Link
+from URDF_Exporter.core.Records import InertialRecord
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import inertia
+
+
+def box(mass, x, y, z):
+    return [mass * (y * y + z * z) / 12, mass * (x * x + z * z) / 12, mass * (x * x + y * y) / 12,
+            0.0, 0.0, 0.0]
+
+
+def invalid(moments):
+    return Link.validate_inertial_dict({name: InertialRecord(1.0, [0.0, 0.0, 0.0], m)
+                                        for name, m in moments.items()})
+
+
+def test_valid_inertias():
+    assert invalid({
+        'box': box(2.0, 0.1, 0.2, 0.3),
+        'cube': box(1.0, 0.1, 0.1, 0.1),
+        # the principal moments of a plate meet the triangle inequality exactly
+        'plate': box(1.0, 0.2, 0.3, 0.0),
+        # principal moments 1.5, 2, 2.5 in a rotated frame
+        'rotated': [2.0, 2.0, 2.0, 0.5, 0.0, 0.0],
+    }) == {}
+
+
+@pytest.mark.parametrize('moments', [
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    [1.0, 1.0, -1.0, 0.0, 0.0, 0.0],
+    # principal moments 0, 1, 2
+    [1.0, 1.0, 1.0, 1.0, 0.0, 0.0],
+])
+def test_not_positive_definite(moments):
+    reasons = invalid({'link': moments, 'box': box(1.0, 0.1, 0.2, 0.3)})
+    assert list(reasons) == ['link']
+    assert 'not positive definite' in reasons['link']
+
+
+@pytest.mark.parametrize('moments', [
+    [1.0, 1.0, 3.0, 0.0, 0.0, 0.0],
+    # principal moments 1, 1, 3 in a rotated frame
+    [2.0, 2.0, 1.0, -1.0, 0.0, 0.0],
+])
+def test_triangle_inequality(moments):
+    reasons = invalid({'box': box(1.0, 0.1, 0.2, 0.3), 'link': moments})
+    assert list(reasons) == ['link']
+    assert 'triangle inequality' in reasons['link']
+
+
+def test_parallel_axis_round_trip():
+    moments = [box(2.0, 0.1, 0.2, 0.3), [2.0, 2.0, 2.0, 0.5, 0.0, 0.0]]
+    centers, masses = [[0.1, -0.2, 0.3], [1.0, 2.0, 0.0]], [2.0, 0.5]
+    shifted = inertia.center_of_mass_inertia(inertia.origin_inertia(moments, centers, masses),
+                                             centers, masses)
+    for expected, actual in zip(moments, shifted):
+        assert actual == pytest.approx(expected, abs=1e-12)
+
+
+def test_export_reports_invalid_inertia(tmp_path):
+    design = copy.deepcopy(synthetic.synthetic_design(3, 'chain'))
+    # a point mass: no inertia about its center of mass
+    physical = design['occurrences'][1]['physicalProperties']
+    physical['xyzMomentsOfInertia'] = inertia.origin_inertia(
+        [[0.0] * 6], [physical['centerOfMass']], [physical['mass']])[0]
+    save_dir, msg = exporter.export_design(synthetic.make_design(design), str(tmp_path), {'profile': False})
+    assert save_dir is not None
+    report = msg.split('Physically invalid inertia:\n', 1)[1].split('\n\n')[0].splitlines()
+    assert len(report) == 1 and 'not positive definite' in report[0]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+A mesh that fails is reported in the message of the export, the other meshes
+and the urdf are still written, see utils/mesh_export.py.
+"""
+
+import os
+
+import pytest
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import mesh_formats
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_failed_mesh_is_reported(tmp_path, monkeypatch, capsys, workers):
+    write_mesh = mesh_formats.write_mesh
+
+    def full_disk(file_name, *args):
+        if os.path.basename(file_name).startswith('part_2_3.'):
+            raise OSError(28, 'No space left on device')
+        return write_mesh(file_name, *args)
+
+    monkeypatch.setattr(mesh_formats, 'write_mesh', full_disk)
+    save_dir, msg = exporter.export_design(synthetic.make_design(synthetic.synthetic_design(4, 'chain')),
+                                           str(tmp_path), {'profile': False, 'mesh_workers': workers})
+    assert save_dir is not None
+    report = msg.split('Mesh export failed:\n', 1)[1].split('\n\n')[0].splitlines()
+    assert report == ['part_2_3: writing part_2_3.stl failed: [Errno 28] No space left on device']
+    assert sorted(os.listdir(save_dir + '/meshes')) == ['base_link.stl', 'part_1_2.stl', 'part_3_4.stl']
+    assert os.path.isfile(save_dir + '/' + os.path.basename(save_dir) + '.urdf')
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Round trips of the mesh formats through write_mesh and read_mesh.
+"""
+
+import json, struct
+
+import pytest
+
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import mesh_formats
+
+from conftest import flat
+
+SCALE = 10.0  # mm per cm
+
+
+def triangles(coordinates, indices):
+    """
+    corners of each triangle, [[x, y, z] * 3] per triangle
+    """
+    coordinates, indices = flat(coordinates), [int(i) for i in flat(indices)]
+    return [[coordinates[3 * i:3 * i + 3] for i in indices[k:k + 3]] for k in range(0, len(indices), 3)]
+
+
+def scaled(corners_of_triangles):
+    return [[[c * SCALE for c in corner] for corner in corners] for corners in corners_of_triangles]
+
+
+def assert_same_triangles(expected, actual, tolerance):
+    assert len(expected) == len(actual)
+    for corners, read_corners in zip(expected, actual):
+        for corner, read_corner in zip(corners, read_corners):
+            assert read_corner == pytest.approx(corner, abs=tolerance)
+
+
+@pytest.fixture
+def sphere():
+    return synthetic.sphere(200, 2.0, (1.0, -2.0, 3.0))
+
+
+@pytest.mark.parametrize('extension', ['stl', 'glb', 'dae', 'stl.gz', 'glb.gz', 'dae.gz'])
+def test_round_trip(sphere, tmp_path, extension):
+    coordinates, indices = sphere
+    file_name = str(tmp_path / ('mesh.' + extension))
+    size = mesh_formats.write_mesh(file_name, coordinates, indices, SCALE)
+    assert size == (tmp_path / ('mesh.' + extension)).stat().st_size
+    expected = scaled(triangles(coordinates, indices))
+    # float32 coordinates in stl and glb
+    assert_same_triangles(expected, triangles(*mesh_formats.read_mesh(file_name)), 1e-4)
+
+
+def test_quantized_glb(sphere, tmp_path):
+    coordinates, indices = sphere
+    file_name = str(tmp_path / 'mesh.glb')
+    mesh_formats.write_mesh(file_name, coordinates, indices, SCALE, quantize=True)
+    expected = scaled(triangles(coordinates, indices))
+    # a step of the 16-bit grid over the 40 mm of the sphere
+    assert_same_triangles(expected, triangles(*mesh_formats.read_mesh(file_name)), 40.0 / 65535)
+    plain = str(tmp_path / 'plain.glb')
+    assert mesh_formats.write_mesh(file_name, coordinates, indices, SCALE, quantize=True) < \
+        mesh_formats.write_mesh(plain, coordinates, indices, SCALE)
+
+
+def test_indexed_formats_are_welded(sphere, tmp_path):
+    coordinates, indices = sphere
+    for extension in ('glb', 'dae'):
+        file_name = str(tmp_path / ('mesh.' + extension))
+        mesh_formats.write_mesh(file_name, coordinates, indices, SCALE)
+        read_coordinates, _ = mesh_formats.read_mesh(file_name)
+        assert len(flat(read_coordinates)) < len(coordinates)
+
+
+def test_glb_is_y_up(tmp_path):
+    file_name = str(tmp_path / 'mesh.glb')
+    mesh_formats.write_mesh(file_name, [0.0, 0.0, 1.0, 1.0, 0.0, 1.0, 0.0, 1.0, 1.0], [0, 1, 2])
+    data = (tmp_path / 'mesh.glb').read_bytes()
+    text_length, _ = struct.unpack_from('<II', data, 12)
+    position = json.loads(data[20:20 + text_length].decode('utf-8'))['accessors'][0]
+    # z up is +Y up in the file
+    assert position['min'][1] == pytest.approx(1.0) and position['max'][1] == pytest.approx(1.0)
+
+
+def test_compression_is_deterministic(sphere, tmp_path):
+    coordinates, indices = sphere
+    first, second = str(tmp_path / 'a.dae.gz'), str(tmp_path / 'b.dae.gz')
+    mesh_formats.write_mesh(first, coordinates, indices, SCALE)
+    mesh_formats.write_mesh(second, coordinates, indices, SCALE)
+    assert (tmp_path / 'a.dae.gz').read_bytes() == (tmp_path / 'b.dae.gz').read_bytes()
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        mesh_formats.write_mesh(str(tmp_path / 'mesh.obj'), [0.0] * 9, [0, 1, 2])
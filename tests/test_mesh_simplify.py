@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+The convex hulls contain their mesh and the decimated meshes keep to their
+triangle budget, see utils/mesh_simplify.py.
+"""
+
+import random
+
+import pytest
+
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import mesh_simplify
+
+from conftest import flat
+
+TOLERANCE = 1e-9
+
+
+def points(coordinates):
+    coordinates = flat(coordinates)
+    return [tuple(coordinates[k:k + 3]) for k in range(0, len(coordinates), 3)]
+
+
+def assert_contains(hull, coordinates):
+    """
+    the hull is closed, made of input points and every input point is on or
+    below the plane of each of its faces
+    """
+    corners, indices = points(hull[0]), [int(i) for i in hull[1]]
+    faces = [indices[k:k + 3] for k in range(0, len(indices), 3)]
+    edges = set((f[k], f[(k + 1) % 3]) for f in faces for k in range(3))
+    assert len(edges) == 3 * len(faces)
+    assert all((b, a) in edges for a, b in edges)
+    inputs = points(coordinates)
+    assert set(corners) <= set(inputs)
+    for face in faces:
+        n, d = mesh_simplify._plane(corners, *face)
+        assert max(n[0] * x + n[1] * y + n[2] * z for x, y, z in inputs) - d <= TOLERANCE
+
+
+def test_hull_of_a_cube_and_its_inside():
+    rng = random.Random(1)
+    coordinates = [float(c) for x in (0, 2) for y in (0, 2) for z in (0, 2) for c in (x, y, z)]
+    coordinates += [rng.uniform(0.1, 1.9) for _ in range(3 * 200)]
+    hull = mesh_simplify.convex_hull(coordinates)
+    assert_contains(hull, coordinates)
+    assert sorted(points(hull[0])) == sorted(points(coordinates[:24]))
+    assert len(hull[1]) == 3 * 12
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_hull_of_a_point_cloud(seed):
+    rng = random.Random(seed)
+    coordinates = [rng.gauss(0.0, 1.0) for _ in range(3 * 500)]
+    assert_contains(mesh_simplify.convex_hull(coordinates), coordinates)
+
+
+def test_hull_of_flat_points():
+    assert mesh_simplify.convex_hull([float(x) for i in range(10) for x in (i, i % 3, 0.0)]) is None
+
+
+def test_hull_vertices_are_extreme_vertices():
+    coordinates, indices = synthetic.sphere(4000, 2.0, (1.0, -2.0, 3.0))
+    vertices = mesh_simplify.hull_vertices(coordinates, n_directions=100)
+    chosen, inputs = points(vertices), points(coordinates)
+    assert len(chosen) <= 100 + 6
+    assert set(chosen) <= set(inputs)
+    # the hull spans the bounding box of the mesh
+    for k in range(3):
+        assert min(v[k] for v in chosen) == min(v[k] for v in inputs)
+        assert max(v[k] for v in chosen) == max(v[k] for v in inputs)
+    assert_contains(mesh_simplify.convex_hull(vertices), vertices)
+
+
+@pytest.mark.parametrize('budget', [20, 100, 500])
+def test_decimate_keeps_to_the_budget(budget):
+    coordinates, indices = synthetic.sphere(2000, 2.0, (1.0, -2.0, 3.0))
+    c, i = mesh_simplify.decimate(coordinates, indices, budget)
+    vertices, i = points(c), [int(x) for x in flat(i)]
+    assert 0 < len(i) // 3 <= budget
+    assert all(0 <= x < len(vertices) for x in i)
+    # the clustered vertices are averages of the input ones
+    inputs = points(coordinates)
+    for k in range(3):
+        assert min(v[k] for v in inputs) - TOLERANCE <= min(v[k] for v in vertices)
+        assert max(v[k] for v in vertices) <= max(v[k] for v in inputs) + TOLERANCE
+
+
+def test_decimate_within_the_budget_is_unchanged():
+    coordinates, indices = synthetic.sphere(200, 2.0)
+    assert mesh_simplify.decimate(coordinates, indices, len(indices) // 3) == (coordinates, indices)
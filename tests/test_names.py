@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+urdf names of the Fusion occurrences, see utils/names.py.
+"""
+
+from URDF_Exporter.utils.names import NameRegistry, sanitize
+
+
+def test_sanitize():
+    assert sanitize('arm link (1):2') == 'arm_link__1__2'
+
+
+def test_collisions_get_a_suffix():
+    names = NameRegistry(['a b:1', 'a_b:1', 'a(b:1'])
+    # the sorted Fusion names claim the sanitized name in turn
+    assert [names['a b:1'], names['a(b:1'], names['a_b:1']] == ['a_b_1', 'a_b_1_2', 'a_b_1_3']
+    assert names.renamed == {'a(b:1': 'a_b_1_2', 'a_b:1': 'a_b_1_3'}
+
+
+def test_suffix_never_takes_a_sanitized_name():
+    names = NameRegistry(['x:1', 'x 1', 'x_1_2'])
+    assert names['x_1_2'] == 'x_1_2'
+    assert len({names['x:1'], names['x 1'], names['x_1_2']}) == 3
+
+
+def test_order_does_not_matter():
+    fusion_names = ['b:1', 'b 1', 'a:1', 'a 1', 'c(1)']
+    first, second = NameRegistry(fusion_names), NameRegistry(reversed(fusion_names))
+    assert [first[name] for name in fusion_names] == [second[name] for name in fusion_names]
+
+
+def test_fixed_names_first():
+    names = NameRegistry(['base_link', 'base:1'], fixed={'base:1': 'base_link'})
+    assert names['base:1'] == 'base_link'
+    assert names['base_link'] == 'base_link_2'
+
+
+def test_late_names_are_registered():
+    names = NameRegistry(['a:1'])
+    assert 'a 1' not in names
+    assert names['a 1'] == 'a_1_2'
+    assert 'a 1' in names and len(names) == 2
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+The physical properties of an edited body reach the urdf, whatever the
+previous exports into the same directory calculated.
+"""
+
+import copy, re
+
+import pytest
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.offline import synthetic
+
+OPTIONS = {'profile': False}
+
+
+def export(data, output_dir, **options):
+    save_dir, msg = exporter.export_design(synthetic.make_design(data), output_dir, dict(OPTIONS, **options))
+    assert save_dir is not None, msg
+    return save_dir
+
+
+def masses(save_dir):
+    """
+    {link: mass} of the urdf
+    """
+    with open(save_dir + '/' + save_dir.rsplit('/', 1)[1] + '.urdf') as f:
+        urdf = f.read()
+    return {link: float(mass) for link, mass in
+            re.findall(r'<link name="([^"]+)">\s*<inertial>\s*<origin[^>]*>\s*<mass value="([^"]+)"', urdf)}
+
+
+def heavier(data, occurrence='part 1:2', factor=3.0):
+    """
+    data with the mass of the body of occurrence multiplied by factor, its
+    shape, and so its fingerprint, unchanged. Fusion gives the component a
+    new revision.
+    """
+    data = copy.deepcopy(data)
+    for occ in data['occurrences']:
+        if occ['name'] == occurrence:
+            physical = occ['physicalProperties']
+            physical['mass'] *= factor
+            physical['xyzMomentsOfInertia'] = [factor * m for m in physical['xyzMomentsOfInertia']]
+            occ['revisionId'] = occ.get('revisionId', 'r1') + '+1'
+    return data
+
+
+def test_full_export_reads_the_edited_body(tmp_path):
+    design = synthetic.synthetic_design(5, 'chain', n_components=5)
+    before = masses(export(design, str(tmp_path / 'out')))
+    after = masses(export(heavier(design), str(tmp_path / 'out')))
+    assert after['part_1_2'] == pytest.approx(3.0 * before['part_1_2'])
+    assert after == masses(export(heavier(design), str(tmp_path / 'fresh')))
+
+
+def test_broken_cache_files_are_ignored(tmp_path):
+    design = synthetic.synthetic_design(5, 'chain', n_components=5)
+    save_dir = export(design, str(tmp_path / 'out'))
+    before = masses(save_dir)
+    for name in ('snapshot.json', 'properties.json'):
+        with open(save_dir + '/.fusion2urdf/' + name, 'w') as f:
+            f.write('{"truncated')
+    assert masses(export(design, str(tmp_path / 'out'), incremental=True)) == before
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_new_revision_is_calculated_again(tmp_path, cached):
+    """
+    the reuse by incremental exports and the cache_dir see the new revision
+    """
+    options = {'cache_dir': str(tmp_path / 'cache')} if cached else {'incremental': True}
+    design = synthetic.synthetic_design(5, 'chain', n_components=5)
+    before = masses(export(design, str(tmp_path / 'out'), **options))
+    after = masses(export(heavier(design), str(tmp_path / 'out'), **options))
+    assert after['part_1_2'] == pytest.approx(3.0 * before['part_1_2'])
+    assert masses(export(heavier(design), str(tmp_path / 'out'), **options)) == after
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Step generators driven by run_steps and by FusionTask from the custom events
+of the offline stand-in, see utils/tasks.py.
+"""
+
+import threading, time
+
+import pytest
+import adsk, adsk.core
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.offline import synthetic
+from URDF_Exporter.utils import tasks
+
+from test_incremental import assert_same_files
+
+
+def background_thread():
+    return threading.current_thread().name
+
+
+def fail():
+    raise ValueError('in the background')
+
+
+def steps(n, log):
+    """
+    n progress steps around a background call and a failed one, whose
+    exception is caught at its yield
+    """
+    try:
+        for i in range(n):
+            yield 'links', i + 1, n
+        log['thread'] = yield tasks.in_background(background_thread)
+        try:
+            yield tasks.in_background(fail)
+        except ValueError as e:
+            log['error'] = str(e)
+        for i in range(n):
+            yield 'meshes', i + 1, n
+        return 'result'
+    finally:
+        log['closed'] = True
+
+
+def drive(task, timeout=10.0):
+    """
+    handle the custom events like the main thread of Fusion until on_done,
+    the number of rounds
+    """
+    task.start()
+    rounds, deadline = 0, time.perf_counter() + timeout
+    while task.dialog.isShowing:
+        assert time.perf_counter() < deadline
+        adsk.doEvents()
+        rounds += 1
+        time.sleep(0.001)
+    return rounds
+
+
+@pytest.fixture
+def done():
+    calls = []
+    return calls, lambda result, error: calls.append((result, error))
+
+
+def test_run_steps():
+    log, progress = {}, []
+    assert tasks.run_steps(steps(3, log), lambda *item: progress.append(item)) == 'result'
+    assert progress == [('links', 1, 3), ('links', 2, 3), ('links', 3, 3),
+                        ('meshes', 1, 3), ('meshes', 2, 3), ('meshes', 3, 3)]
+    assert log == {'thread': log['thread'], 'error': 'in the background', 'closed': True}
+    assert log['thread'].startswith('fusion2urdf') and log['thread'] != background_thread()
+
+
+def test_fusion_task(monkeypatch, done):
+    calls, on_done = done
+    monkeypatch.setattr(tasks.FusionTask, 'SLICE', 0.0)
+    app, log = adsk.core.Application.get(), {}
+    task = tasks.FusionTask(app, steps(5, log), 'Export', on_done)
+    # one step per round: the UI gets the main thread back between two steps
+    assert drive(task) >= 10
+    assert calls == [('result', None)]
+    assert log['error'] == 'in the background' and log['closed']
+    assert task.dialog.message == 'meshes %v/%m' and task.dialog.progressValue == 5
+    assert tasks.FusionTask.EVENT_ID not in app._events and task.handler not in tasks._handlers
+
+
+def test_cancel_closes_the_steps(done):
+    calls, on_done = done
+    log = {}
+    task = tasks.FusionTask(adsk.core.Application.get(), steps(5, log), 'Export', on_done)
+    progress = task._progress
+
+    def cancel(stage, step, total):
+        # Cancel clicked at the second link
+        progress(stage, step, total)
+        task.dialog.wasCancelled = step == 2
+
+    task._progress = cancel
+    drive(task)
+    assert calls == [(None, 'Canceled')]
+    assert log == {'closed': True} and task.dialog.progressValue == 2
+
+
+def test_failed_steps(done):
+    calls, on_done = done
+
+    def failing():
+        yield 'links', 1, 1
+        yield tasks.in_background(fail)
+
+    drive(tasks.FusionTask(adsk.core.Application.get(), failing(), 'Export', on_done))
+    (result, error), = calls
+    assert result is None and error.startswith('Failed:') and 'in the background' in error
+
+
+def test_export_as_fusion_task(tmp_path, monkeypatch, done):
+    calls, on_done = done
+    monkeypatch.setattr(tasks.FusionTask, 'SLICE', 0.0)
+    design = synthetic.synthetic_design(8, 'tree', n_triangles=60)
+    options = {'profile': False, 'xacro': True}
+    steps = exporter.iter_export(synthetic.make_design(design), str(tmp_path / 'task'), options)
+    drive(tasks.FusionTask(adsk.core.Application.get(), steps, 'Export', on_done))
+    (save_dir, msg), error = calls[0]
+    assert error is None and save_dir is not None, msg
+    expected, _ = exporter.export_design(synthetic.make_design(design), str(tmp_path / 'steps'), options)
+    assert_same_files(save_dir, expected)
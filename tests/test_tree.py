@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the joint tree, see core/Tree.py, and how the export reacts to them.
+"""
+
+import json, os
+
+from URDF_Exporter import offline
+from URDF_Exporter.core import Tree
+from URDF_Exporter.core.Records import JointRecord
+from URDF_Exporter.utils.names import sanitize
+
+
+def joints(*edges):
+    return {'{}_to_{}'.format(parent, child): JointRecord('fixed', parent, child, [0.0, 0.0, 0.0])
+            for parent, child in edges}
+
+
+def test_tree_breadth_first():
+    tree = Tree.JointTree(joints(('base_link', 'a'), ('a', 'c'), ('base_link', 'b')),
+                          ['base_link', 'a', 'b', 'c'])
+    assert not tree.errors and not tree.warnings
+    assert tree.link_order == ['base_link', 'a', 'b', 'c']
+    assert tree.depth == {'base_link': 0, 'a': 1, 'b': 1, 'c': 2}
+
+
+def test_tree_cycle():
+    tree = Tree.JointTree(joints(('base_link', 'a'), ('b', 'c'), ('c', 'b')),
+                          ['base_link', 'a', 'b', 'c'])
+    assert any(error.startswith('cycle: ') for error in tree.errors)
+    assert tree.link_order == ['base_link', 'a']
+
+
+def test_tree_multiple_parents():
+    tree = Tree.JointTree(joints(('base_link', 'a'), ('base_link', 'b'), ('a', 'c'), ('b', 'c')),
+                          ['base_link', 'a', 'b', 'c'])
+    assert tree.errors == ['c has multiple parents: a_to_c and b_to_c']
+
+
+def test_tree_root_as_child_and_unknown_link():
+    tree = Tree.JointTree(joints(('a', 'base_link'), ('base_link', 'x')), ['base_link', 'a'])
+    assert 'base_link is the child of a_to_base_link, it can not have a parent' in tree.errors
+    assert 'child of base_link_to_x is x, which is not a link' in tree.errors
+
+
+def test_tree_disconnected_links_are_warnings():
+    tree = Tree.JointTree(joints(('base_link', 'a'), ('b', 'c')), ['base_link', 'a', 'b', 'c', 'd'])
+    assert not tree.errors
+    assert sorted(tree.warnings) == ['b is not connected to base_link', 'c is not connected to base_link',
+                                     'd is not connected to base_link']
+    assert tree.link_order == ['base_link', 'a']
+
+
+def test_disconnected_links_are_left_out(data_dir, tmp_path):
+    with open(os.path.join(data_dir, 'design.json')) as f:
+        design = json.load(f)
+    dropped = design['joints'].pop()
+    path = str(tmp_path / 'design.json')
+    with open(path, 'w') as f:
+        json.dump(design, f)
+    save_dir, msg = offline.export(path, str(tmp_path / 'out'))
+    assert save_dir is not None, msg
+    link = sanitize(dropped['occurrenceOne'])
+    assert '{} is not connected to base_link'.format(link) in msg
+    with open(os.path.join(save_dir, 'demo.urdf')) as f:
+        assert '"{}"'.format(link) not in f.read()
+
+
+def test_multiple_parents_abort(data_dir, tmp_path):
+    with open(os.path.join(data_dir, 'design.json')) as f:
+        design = json.load(f)
+    joint = design['joints'][-1]
+    design['joints'].append(dict(joint, name='back', occurrenceOne=joint['occurrenceTwo'],
+                                 occurrenceTwo=joint['occurrenceOne']))
+    path = str(tmp_path / 'design.json')
+    with open(path, 'w') as f:
+        json.dump(design, f)
+    save_dir, msg = offline.export(path, str(tmp_path / 'out'))
+    assert save_dir is None
+    assert 'multiple parents' in msg
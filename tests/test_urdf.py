@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+The urdf of a recorded design, byte for byte.
+
+data/demo.urdf was written by the Write.write_urdf of the first version of the
+exporter, from the joints of data/design.json in breadth-first order.
+"""
+
+import os
+
+from URDF_Exporter import offline
+
+
+def read(file_name, mode='rb'):
+    with open(file_name, mode=mode) as f:
+        return f.read()
+
+
+def test_urdf_is_byte_identical(data_dir, tmp_path):
+    save_dir, msg = offline.export(os.path.join(data_dir, 'design.json'), str(tmp_path))
+    assert save_dir is not None, msg
+    assert read(os.path.join(save_dir, 'demo.urdf')) == read(os.path.join(data_dir, 'demo.urdf'))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+The xacro of a robot with repeated legs expands to the links, joints and
+transmissions of its urdf, see core/Xacro.py.
+"""
+
+import copy, re
+from xml.etree import ElementTree
+
+import pytest
+
+from URDF_Exporter import URDF_Exporter as exporter
+from URDF_Exporter.core import Joint, Link, Xacro
+from URDF_Exporter.offline import synthetic
+
+XACRO = '{' + Xacro.XACRO_NAMESPACE + '}'
+LEGS = [(17.3, 8.1), (-17.3, 8.1), (17.3, -8.1), (-17.3, -8.1)]
+
+
+def quadruped():
+    """
+    recorded design of a body with four legs, hip, knee and foot, each foot
+    with two toes
+    """
+    occurrences, joints = [], []
+
+    def link(name, component, position, mass, size):
+        coordinates, indices = synthetic.sphere(60, min(size) / 2, position)
+        x, y, z = position
+        occurrences.append({
+            'name': name, 'component': component, 'bodyCount': 1,
+            'transform': [1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z, 0, 0, 0, 1],
+            'physicalProperties': {'mass': mass, 'volume': 1.0, 'area': 1.0, 'centerOfMass': [x, y, z],
+                                   'xyzMomentsOfInertia': synthetic._moments(mass, size, position)},
+            'bodies': [{'volume': 1.0, 'area': 1.0, 'material': 'Steel',
+                        'mesh': {'nodeCoordinates': coordinates, 'nodeIndices': indices}}]})
+
+    def joint(name, child, parent, origin, revolute=True):
+        data = {'name': name, 'occurrenceOne': child, 'occurrenceTwo': parent,
+                'geometryOrOriginOne': {'origin': origin}, 'jointType': 0}
+        if revolute:
+            data.update(jointType=1, rotationAxisVector=[0, 1, 0], rotationLimits={
+                'isMaximumValueEnabled': True, 'isMinimumValueEnabled': True,
+                'maximumValue': 1.0, 'minimumValue': -1.0})
+        joints.append(data)
+
+    link('base_link:1', 'base_link', (0.0, 0.0, 0.0), 5.0, (40, 20, 5))
+    for k, (x, y) in enumerate(LEGS, 1):
+        link('hip:%d' % k, 'hip', (x, y, -3.0), 0.7, (3, 3, 4))
+        joint('hip %d' % k, 'hip:%d' % k, 'base_link:1', [x, y, -1.0])
+        link('knee:%d' % k, 'knee', (x, y, -10.0), 0.5, (2, 2, 8))
+        joint('knee %d' % k, 'knee:%d' % k, 'hip:%d' % k, [x, y, -6.0])
+        link('foot:%d' % k, 'foot', (x, y, -16.0), 0.2, (4, 3, 1))
+        joint('foot %d' % k, 'foot:%d' % k, 'knee:%d' % k, [x, y, -15.0], revolute=False)
+        for t, dx in enumerate((-1.0, 1.0), 2 * k - 1):
+            link('toe:%d' % t, 'toe', (x + dx, y + 2.0, -16.5), 0.05, (1, 1, 1))
+            joint('toe %d' % t, 'toe:%d' % t, 'foot:%d' % k, [x + dx, y + 1.5, -16.5])
+    return {'rootComponent': {'name': 'quad v1'}, 'occurrences': occurrences, 'joints': joints}
+
+
+def expand(root):
+    """
+    elements of a xacro document with its macros expanded, enough of xacro
+    for the output of Xacro.iter_xacro: macro calls with string parameters
+    """
+    macros = {}
+    for element in root.findall(XACRO + 'macro'):
+        macros[element.get('name')] = element
+
+    def substitute(element, values):
+        element = copy.deepcopy(element)
+        for e in element.iter():
+            for key, value in e.attrib.items():
+                e.set(key, re.sub(r'\$\{(\w+)\}', lambda m: values[m.group(1)], value))
+        return element
+
+    def walk(elements, values):
+        for element in elements:
+            if element.tag == XACRO + 'macro':
+                continue
+            if element.tag.startswith(XACRO):
+                call = substitute(element, values)
+                yield from walk(macros[element.tag[len(XACRO):]], dict(call.attrib))
+            else:
+                yield substitute(element, values)
+
+    return list(walk(root, {}))
+
+
+def canonical(element):
+    """
+    comparable form of an element, the numbers to 1e-9 since a macro writes
+    the values of its first sub-chain
+    """
+    def value(text):
+        try:
+            return tuple(round(float(v), 9) + 0.0 for v in text.split())
+        except ValueError:
+            return text
+
+    return (element.tag, sorted((key, value(text)) for key, text in element.attrib.items()),
+            (element.text or '').strip(), [canonical(child) for child in element])
+
+
+def items(elements):
+    return {(e.tag, e.get('name')): canonical(e) for e in elements}
+
+
+@pytest.fixture(scope='module')
+def exported(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp('xacro'))
+    save_dir, msg = exporter.export_design(synthetic.make_design(quadruped()), output_dir,
+                                           {'profile': False, 'xacro': True, 'dedup_meshes': True})
+    assert save_dir is not None, msg
+    return ElementTree.parse(save_dir + '/quad.urdf').getroot(), \
+        ElementTree.parse(save_dir + '/quad.urdf.xacro').getroot()
+
+
+def test_legs_are_macros(exported):
+    urdf, xacro = exported
+    macros = xacro.findall(XACRO + 'macro')
+    # the sub-chains from the hip, knee, foot and toe, each calls the next
+    assert len(macros) == 4
+    assert len([e for e in xacro if e.tag.startswith(XACRO) and e.tag != XACRO + 'macro']) == len(LEGS)
+
+
+def test_xacro_expands_to_the_urdf(exported):
+    urdf, xacro = exported
+    expanded = items(expand(xacro))
+    assert expanded == items(urdf)
+    assert len([key for key in expanded if key[0] == 'link']) == 1 + 5 * len(LEGS)
+
+
+def test_rendering_leaves_the_link_and_joint_unchanged():
+    link = Link.Link('toe_1', [0.1, 0.2, 0.0], [0.0, 0.0, 0.01], 'meshes/', 0.05, [1e-6, 0, 0, 1e-6, 0, 1e-6],
+                     mesh='toe_1')
+    joint = Joint.Joint('toe 1', [0.1, 0.2, 0.0], [0, 1, 0], 'foot_1', 'toe_1', 'revolute', 1.0, -1.0)
+    link.make_link_xml()
+    joint.make_joint_xml()
+    before = dict(vars(link)), dict(vars(joint))
+    assert '${link1}' in Xacro._link_xml(link, '${link1}')
+    assert '${joint1}' in Xacro._joint_xml(joint, '${joint1}', '${link0}', '${link1}', '${xyz}')
+    assert (vars(link), vars(joint)) == before